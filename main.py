@@ -25,10 +25,20 @@ from src import nbs_logic
 from src import visualization
 from src import reporting
 from src import utils
+from src import tiling
+from src import nbs_rules
+from src import raster_morphology
+from src import stage_cache
+from src import profiling
+from src import spatial_index as spatial_index_module
+from src.spatial_index import SpatialIndex
 
 
 def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None, 
-         no_cache=False, quick_mode=False):
+         no_cache=False, quick_mode=False, engine='vector', workers=1,
+         drop_empty_cells=config.GRID_DROP_EMPTY_CELLS, rules=None,
+         provider=config.DATA_PROVIDER, timings=None,
+         use_stage_cache=config.STAGE_CACHE_ENABLED, profile=None):
     """
     Main execution function
     
@@ -40,6 +50,17 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
         output_dir: Output directory (default from config)
         no_cache: Disable caching
         quick_mode: Skip detailed visualizations and reports
+        engine: Morphology engine, 'vector' or 'raster'
+        workers: Worker processes for tiled morphology/planning (1 = single process)
+        drop_empty_cells: Drop grid cells that contain no buildings
+        rules: NbS rule table path (default: config.NBS_RULES_PATH if present)
+        provider: OSM data provider, 'osmnx' (live), 'replay' (offline) or a
+            DataProvider instance (e.g. a batch SharedStoreProvider)
+        timings (dict): Optional dict filled with per-stage durations in seconds
+        use_stage_cache: Reuse stage results whose inputs are unchanged
+            (see src/stage_cache.py)
+        profile: Profile the run: 'spans' (nested stage spans only),
+            'cprofile' or 'pyinstrument' (spans plus a call profile); None disables
     """
     # Setup
     utils.print_banner()
@@ -59,6 +80,8 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
     radius = radius or config.ANALYSIS_RADIUS_METERS
     grid_size = grid_size or config.GRID_SIZE_METERS
     output_dir = Path(output_dir) if output_dir else Path(config.OUTPUT_DIR)
+    if rules is None and Path(config.NBS_RULES_PATH).exists():
+        rules = config.NBS_RULES_PATH
     
     # Validate coordinates
     is_valid, message = utils.validate_coordinates(lat, lon)
@@ -69,9 +92,16 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
     logger.info(f"Analysis Location: ({lat}, {lon})")
     logger.info(f"Analysis Radius: {radius}m")
     logger.info(f"Grid Cell Size: {grid_size}m")
+    logger.info(f"Morphology Engine: {engine}")
+    logger.info(f"Worker Processes: {workers}")
+    logger.info(f"NbS Rules: {rules or 'built-in'}")
+    logger.info(f"Data Provider: {provider}")
     logger.info(f"Output Directory: {output_dir}")
     logger.info("="*70)
     
+    if profile:
+        profiling.start_profiling(hook=None if profile == 'spans' else profile)
+    
     try:
         # ================================================================
         # STEP 1: DATA COLLECTION
@@ -80,27 +110,90 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
         logger.info("STEP 1/6: FETCHING LIVE DATA")
         logger.info("="*70)
         
-        with utils.Timer("Data fetching"):
-            buildings, streets, green_blue = data_loader.fetch_live_infrastructure(
+        with utils.Timer("Data fetching", timings):
+            # Buildings, streets, green/blue, wind and AQI are independent.
+            # Offline replay skips the live weather and AQI APIs.
+            sources = (config.FETCH_SOURCES if provider != 'replay'
+                       else ('buildings', 'streets', 'green_blue'))
+            data = data_loader.fetch_all_data(
                 lat=lat,
                 lon=lon,
                 dist=radius,
-                use_cache=not no_cache
+                use_cache=not no_cache,
+                sources=sources,
+                provider=provider
             )
+            buildings = data['buildings']
+            streets = data['streets']
+            green_blue = data['green_blue']
+            wind_dir = data.get('wind', config.DEFAULT_WIND_DIRECTION)
+            aqi_data = data.get('air_quality', {'aqi': 'N/A', 'pm25': 'N/A'})
+            
+            # A failed OSM layer is empty or was missing tiles; planning on it
+            # would record a successful run built on incomplete data
+            osm_errors = {name: error for name, error in data['errors'].items()
+                          if name in ('buildings', 'streets', 'green_blue')}
+            if osm_errors:
+                for name, error in osm_errors.items():
+                    logger.error(f"CRITICAL: Could not load {name}: {error}")
+                logger.error("Cannot proceed with incomplete OSM data. Re-run to fetch "
+                             "the missing tiles (fetched tiles are cached).")
+                return False
             
             if buildings.empty:
                 logger.error("CRITICAL: No building data retrieved. Cannot proceed.")
                 logger.error("Try increasing the analysis radius or check your internet connection.")
                 return False
             
-            wind_dir = data_loader.fetch_prevailing_wind_direction(lat=lat, lon=lon)
-            
-            # Optional: Fetch air quality
-            try:
-                aqi_data = data_loader.fetch_air_quality(lat=lat, lon=lon)
-                logger.info(f"Current AQI: {aqi_data.get('aqi', 'N/A')}")
-            except Exception as e:
-                logger.warning(f"Could not fetch AQI data: {e}")
+            logger.info(f"Current AQI: {aqi_data.get('aqi', 'N/A')}")
+        
+        with utils.Timer("Spatial index construction", timings):
+            spatial_index = SpatialIndex(buildings, streets, green_blue)
+        
+        # Content-addressed stage keys: data fingerprints, config subset and
+        # code version of each stage, chained through upstream keys
+        stages = stage_cache.StageCache(enabled=use_stage_cache)
+        if stages.enabled:
+            with utils.Timer("Stage cache keys", timings):
+                data_fp = {
+                    'buildings': stage_cache.frame_fingerprint(buildings),
+                    'streets': stage_cache.frame_fingerprint(streets),
+                    'green_blue': stage_cache.frame_fingerprint(green_blue),
+                }
+                rule_table = nbs_rules.resolve_rule_table(rules)
+                rules_hash = rule_table.content_hash if rule_table is not None else None
+                planning_modules = [nbs_logic, nbs_rules]
+                
+                # data_loader builds the study area the grid is clipped to
+                morphology_key = stage_cache.stage_key(
+                    'morphology',
+                    [morphology, raster_morphology, spatial_index_module, tiling, data_loader] +
+                    (planning_modules if workers > 1 else []),
+                    buildings=data_fp['buildings'],
+                    lat=lat, lon=lon, radius=radius, grid_size=grid_size, engine=engine,
+                    drop_empty=drop_empty_cells, tiled=workers > 1,
+                    clip_to_study_area=config.GRID_CLIP_TO_STUDY_AREA,
+                    # Tiled mode assigns NbS per tile during morphology
+                    wind_dir=wind_dir if workers > 1 else None,
+                    rules=rules_hash if workers > 1 else None
+                )
+                planning_key = stage_cache.stage_key(
+                    'planning', planning_modules,
+                    morphology=morphology_key, green_blue=data_fp['green_blue'],
+                    wind_dir=wind_dir, rules=rules_hash
+                )
+                visualization_key = stage_cache.stage_key(
+                    'visualization', [visualization],
+                    planning=planning_key, streets=data_fp['streets'],
+                    green_blue=data_fp['green_blue'], wind_dir=wind_dir,
+                    quick_mode=quick_mode, city_name=config.CITY_NAME,
+                    output_dir=str(output_dir.absolute())
+                )
+                report_key = stage_cache.stage_key(
+                    'reports', [reporting],
+                    planning=planning_key, data=data_fp, wind_dir=wind_dir,
+                    output_dir=str(output_dir.absolute())
+                )
         
         # ================================================================
         # STEP 2: URBAN MORPHOLOGY ANALYSIS
@@ -109,18 +202,56 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
         logger.info("STEP 2/6: URBAN MORPHOLOGY ANALYSIS")
         logger.info("="*70)
         
-        with utils.Timer("Morphology analysis"):
-            # Create analysis grid
-            grid = morphology.create_analysis_grid(buildings, grid_size=grid_size)
-            logger.info(f"Created analysis grid: {len(grid)} cells")
+        with utils.Timer("Morphology analysis", timings):
+            analyzed_grid = stages.get('morphology', morphology_key) if stages.enabled else None
             
-            # Calculate morphology metrics
-            analyzed_grid = morphology.calculate_roughness_and_density(grid, buildings)
+            if analyzed_grid is None:
+                # Create analysis grid
+                study_area = (data_loader.get_study_area(lat, lon, radius)
+                              if config.GRID_CLIP_TO_STUDY_AREA else None)
+                grid = morphology.create_analysis_grid(
+                    buildings,
+                    grid_size=grid_size,
+                    study_area=study_area,
+                    drop_empty=drop_empty_cells,
+                    spatial_index=spatial_index
+                )
+                logger.info(f"Created analysis grid: {len(grid)} cells")
+                
+                # Calculate morphology metrics
+                if workers > 1:
+                    # Tiled mode: each tile runs morphology + NbS assignment in its own process
+                    analyzed_grid = tiling.run_tiled_analysis(
+                        grid,
+                        spatial_index,
+                        wind_dir,
+                        engine=engine,
+                        workers=workers,
+                        calculate_benefits=True,
+                        calculate_costs=True,
+                        rules=rules
+                    )
+                else:
+                    analyzed_grid = morphology.calculate_roughness_and_density(
+                        grid, buildings, spatial_index=spatial_index, engine=engine
+                    )
+                
+                # Print statistics
+                building_stats = morphology.calculate_building_statistics(
+                    buildings, spatial_index=spatial_index
+                )
+                logger.info(f"Building Statistics: {building_stats['total_buildings']} buildings")
+                logger.info(f"Mean Building Height: {building_stats['mean_height']:.1f}m")
+                
+                if stages.enabled:
+                    stages.put('morphology', morphology_key, analyzed_grid)
             
-            # Print statistics
-            building_stats = morphology.calculate_building_statistics(buildings)
-            logger.info(f"Building Statistics: {building_stats['total_buildings']} buildings")
-            logger.info(f"Mean Building Height: {building_stats['mean_height']:.1f}m")
+            # Snapshot morphology so rule-table tweaks can be replanned offline
+            utils.save_pickle(
+                {'grid': analyzed_grid, 'wind_dir': wind_dir, 'lat': lat, 'lon': lon,
+                 'radius': radius, 'grid_size': grid_size, 'engine': engine},
+                output_dir / 'reports' / config.MORPHOLOGY_SNAPSHOT_NAME
+            )
         
         # ================================================================
         # STEP 3: NbS PLANNING
@@ -129,17 +260,31 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
         logger.info("STEP 3/6: APPLYING NbS DECISION LOGIC")
         logger.info("="*70)
         
-        with utils.Timer("NbS planning"):
-            nbs_plan = nbs_logic.run_nbs_planning(
-                analyzed_grid,
-                wind_dir,
-                green_blue_gdf=green_blue,
-                calculate_benefits=True,
-                calculate_costs=True
-            )
+        with utils.Timer("NbS planning", timings):
+            planned = stages.get('planning', planning_key) if stages.enabled else None
             
-            # Generate summary
-            summary_df = nbs_logic.generate_intervention_summary(nbs_plan)
+            if planned is not None:
+                nbs_plan, summary_df = planned
+            else:
+                if workers > 1:
+                    # Already assigned per tile during morphology
+                    nbs_plan = analyzed_grid
+                else:
+                    nbs_plan = nbs_logic.run_nbs_planning(
+                        analyzed_grid,
+                        wind_dir,
+                        green_blue_gdf=green_blue,
+                        calculate_benefits=True,
+                        calculate_costs=True,
+                        spatial_index=spatial_index,
+                        rules=rules
+                    )
+                
+                # Generate summary
+                summary_df = nbs_logic.generate_intervention_summary(nbs_plan)
+                
+                if stages.enabled:
+                    stages.put('planning', planning_key, (nbs_plan, summary_df))
             
             logger.info(f"\nIntervention Summary:")
             for _, row in summary_df.iterrows():
@@ -157,55 +302,71 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
         maps_dir = output_dir / 'maps'
         maps_dir.mkdir(parents=True, exist_ok=True)
         
-        with utils.Timer("Visualization generation"):
-            # Main NbS map
-            timestamp = utils.get_timestamp()
-            main_map_path = maps_dir / f'nbs_plan_{timestamp}.png'
-            
-            visualization.plot_nbs_map(
-                nbs_plan,
-                streets,
-                green_blue,
-                wind_dir,
-                output_path=main_map_path,
-                title=f"Nature-based Solutions Plan - {config.CITY_NAME}"
-            )
+        with utils.Timer("Visualization generation", timings):
+            rendered = stages.get('visualization', visualization_key) if stages.enabled else None
             
-            if not quick_mode:
-                # Morphology maps
-                morph_map_path = maps_dir / f'morphology_{timestamp}.png'
-                visualization.plot_morphology_maps(
-                    nbs_plan,
-                    streets,
-                    output_dir=maps_dir
-                )
+            if rendered is not None and all(Path(path).exists() for path in rendered):
+                logger.info(f"Maps unchanged, reusing {len(rendered)} existing files.")
+            else:
+                # Main NbS map
+                timestamp = utils.get_timestamp()
+                main_map_path = maps_dir / f'nbs_plan_{timestamp}.png'
                 
-                # Statistics charts
-                stats_chart_path = maps_dir / f'statistics_{timestamp}.png'
-                visualization.plot_intervention_statistics(
-                    summary_df,
-                    output_path=stats_chart_path
-                )
-                
-                # Cost-benefit analysis
-                costbenefit_path = maps_dir / f'cost_benefit_{timestamp}.png'
-                visualization.plot_cost_benefit_analysis(
-                    summary_df,
-                    output_path=costbenefit_path
-                )
-                
-                # Dashboard
-                dashboard_path = maps_dir / f'dashboard_{timestamp}.png'
-                visualization.create_dashboard(
+                visualization.plot_nbs_map(
                     nbs_plan,
                     streets,
                     green_blue,
-                    summary_df,
                     wind_dir,
-                    output_path=dashboard_path
+                    output_path=main_map_path,
+                    title=f"Nature-based Solutions Plan - {config.CITY_NAME}",
+                    spatial_index=spatial_index
                 )
+                written = [main_map_path]
+                
+                if not quick_mode:
+                    # Morphology maps (fixed file name, see plot_morphology_maps)
+                    morph_map_path = maps_dir / 'morphology_maps.png'
+                    visualization.plot_morphology_maps(
+                        nbs_plan,
+                        streets,
+                        output_dir=maps_dir,
+                        spatial_index=spatial_index
+                    )
+                
+                    # Statistics charts
+                    stats_chart_path = maps_dir / f'statistics_{timestamp}.png'
+                    visualization.plot_intervention_statistics(
+                        summary_df,
+                        output_path=stats_chart_path
+                    )
                 
-                logger.info("All visualizations generated successfully.")
+                    # Cost-benefit analysis
+                    costbenefit_path = maps_dir / f'cost_benefit_{timestamp}.png'
+                    visualization.plot_cost_benefit_analysis(
+                        summary_df,
+                        output_path=costbenefit_path
+                    )
+                
+                    # Dashboard
+                    dashboard_path = maps_dir / f'dashboard_{timestamp}.png'
+                    visualization.create_dashboard(
+                        nbs_plan,
+                        streets,
+                        green_blue,
+                        summary_df,
+                        wind_dir,
+                        output_path=dashboard_path,
+                        spatial_index=spatial_index
+                    )
+                
+                    written += [morph_map_path, stats_chart_path, costbenefit_path, dashboard_path]
+                    
+                    logger.info("All visualizations generated successfully.")
+                
+                if stages.enabled:
+                    # The cost-benefit chart is skipped when cost data is missing
+                    rendered = sorted(str(path) for path in written if path.exists())
+                    stages.put('visualization', visualization_key, rendered)
         
         # ================================================================
         # STEP 5: REPORT GENERATION
@@ -216,16 +377,26 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
         
         reports_dir = output_dir / 'reports'
         
-        with utils.Timer("Report generation"):
-            report_files, stats = reporting.generate_full_report(
-                nbs_plan,
-                summary_df,
-                buildings,
-                streets,
-                green_blue,
-                wind_dir,
-                output_dir=reports_dir
-            )
+        with utils.Timer("Report generation", timings):
+            reused = stages.get('reports', report_key) if stages.enabled else None
+            
+            if reused is not None and all(Path(path).exists() for name, path in reused[0].items()
+                                          if name != 'timestamp'):
+                report_files, stats = reused
+                logger.info(f"Reports unchanged, reusing package from {report_files['timestamp']}")
+            else:
+                report_files, stats = reporting.generate_full_report(
+                    nbs_plan,
+                    summary_df,
+                    buildings,
+                    streets,
+                    green_blue,
+                    wind_dir,
+                    output_dir=reports_dir
+                )
+                
+                if stages.enabled:
+                    stages.put('reports', report_key, (report_files, stats))
             
             logger.info("\nGenerated Reports:")
             for report_type, filepath in report_files.items():
@@ -258,6 +429,16 @@ def main(lat=None, lon=None, radius=None, grid_size=None, output_dir=None,
     except Exception as e:
         logger.error(f"\n\nERROR during analysis: {e}", exc_info=True)
         return False
+    
+    finally:
+        profiler = profiling.stop_profiling()
+        if profiler is not None:
+            profile_files = profiler.write(output_dir / 'reports')
+            logger.info("Slowest spans:")
+            for entry in profiler.summary()[:10]:
+                logger.info(f"  {entry['name']:30s}: {entry['wall_s']:8.2f}s wall, "
+                           f"{entry['cpu_s']:8.2f}s CPU ({entry['count']}x)")
+            logger.info(f"Chrome trace: {profile_files['trace']}")
 
 
 def parse_arguments():
@@ -279,8 +460,24 @@ Examples:
   # Quick mode (skip detailed visualizations)
   python main.py --quick
   
+  # City-scale run with the raster morphology engine
+  python main.py --radius 10000 --engine raster
+  
+  # Whole-city run split into tiles across 32 processes
+  python main.py --radius 10000 --engine raster --workers 32
+  
   # Disable caching
   python main.py --no-cache
+  
+  # Offline, deterministic rerun from saved Overpass responses
+  python main.py --provider replay
+  
+  # Recompute all stages (ignore the stage cache)
+  python main.py --no-stage-cache
+  
+  # Profile the run (JSON + Chrome trace; add cProfile call stats)
+  python main.py --profile
+  python main.py --profile cprofile
         """
     )
     
@@ -302,6 +499,35 @@ Examples:
     parser.add_argument('--no-cache', action='store_true',
                        help='Disable caching (fetch fresh data)')
     
+    parser.add_argument('--no-stage-cache', action='store_true',
+                       help='Recompute every stage instead of reusing results whose '
+                            f'inputs are unchanged (stage cache: {config.STAGE_CACHE_DIR})')
+    
+    parser.add_argument('--provider', choices=['osmnx', 'replay'], default=config.DATA_PROVIDER,
+                       help='OSM data provider: live Overpass via osmnx, or offline replay '
+                            f'of saved responses in {config.OVERPASS_REPLAY_DIR} '
+                            f'(default: {config.DATA_PROVIDER})')
+    
+    parser.add_argument('--engine', choices=['vector', 'raster'], default='vector',
+                       help='Morphology engine: exact polygon overlay or rasterized '
+                            'footprints for city-scale runs (default: vector)')
+    
+    parser.add_argument('--drop-empty-cells', action='store_true',
+                       help='Drop grid cells that contain no buildings')
+    
+    parser.add_argument('--rules', type=str, default=None,
+                       help=f'NbS rule table JSON/YAML (default: {config.NBS_RULES_PATH})')
+    
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Worker processes for tiled morphology and NbS planning (default: 1)')
+    
+    parser.add_argument('--profile', nargs='?', const='spans', default=None,
+                       choices=['spans', 'cprofile', 'pyinstrument'],
+                       help='Profile the run: nested stage spans (wall/CPU time, peak RSS, '
+                            'tracemalloc) written as JSON and a Chrome trace to '
+                            '<output>/reports; optionally add a cProfile or pyinstrument '
+                            'call profile (default when given: spans)')
+    
     parser.add_argument('--quick', action='store_true',
                        help='Quick mode (skip detailed visualizations)')
     
@@ -331,7 +557,14 @@ if __name__ == "__main__":
         grid_size=args.grid_size,
         output_dir=args.output_dir,
         no_cache=args.no_cache,
-        quick_mode=args.quick
+        quick_mode=args.quick,
+        engine=args.engine,
+        workers=args.workers,
+        drop_empty_cells=args.drop_empty_cells or config.GRID_DROP_EMPTY_CELLS,
+        rules=args.rules,
+        provider=args.provider,
+        use_stage_cache=not args.no_stage_cache,
+        profile=args.profile
     )
     
     sys.exit(0 if success else 1)
@@ -4,9 +4,17 @@ A comprehensive tool for urban climate resilience planning
 
 Modules:
     - config: Configuration and constants
+    - providers: Pluggable OSM data providers (incl. offline Overpass replay)
+    - footprint_store: Spatially indexed GeoParquet store for building footprints
     - data_loader: Data fetching from OSM, weather APIs
     - morphology: Urban morphology calculations
+    - raster_morphology: Rasterized morphology engine for city-scale runs
+    - spatial_index: Shared STRtree index over the run's vector layers
     - nbs_logic: NbS decision engine
+    - nbs_rules: Declarative NbS rule tables
+    - tiling: Tiled multi-process morphology and planning
+    - stage_cache: Content-addressed memoization of pipeline stages
+    - profiling: Hierarchical run profiler (JSON and Chrome trace output)
     - visualization: Map and plot generation
     - reporting: Statistics and report generation
     - utils: Helper functions and utilities
@@ -16,18 +24,34 @@ __version__ = "1.0.0"
 __author__ = "Hyderabad NbS Project"
 
 from . import config
+from . import providers
+from . import footprint_store
 from . import data_loader
 from . import morphology
+from . import spatial_index
+from . import raster_morphology
+from . import nbs_rules
 from . import nbs_logic
+from . import tiling
+from . import stage_cache
+from . import profiling
 from . import visualization
 from . import reporting
 from . import utils
 
 __all__ = [
     'config',
+    'providers',
+    'footprint_store',
     'data_loader',
     'morphology',
+    'spatial_index',
+    'raster_morphology',
+    'nbs_rules',
     'nbs_logic',
+    'tiling',
+    'stage_cache',
+    'profiling',
     'visualization',
     'reporting',
     'utils'
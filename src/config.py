@@ -22,6 +22,8 @@ CITY_NAME = "Hyderabad"
 # Analysis Parameters
 ANALYSIS_RADIUS_METERS = 1500  # 1.5km radius for analysis
 GRID_SIZE_METERS = 150  # Grid cell size for morphology analysis
+GRID_CLIP_TO_STUDY_AREA = True  # Drop grid cells outside the circular query radius
+GRID_DROP_EMPTY_CELLS = False  # Drop grid cells containing no buildings
 
 # Coordinate Reference System
 CRS_WGS84 = "EPSG:4326"  # WGS84 for lat/lon
@@ -46,15 +48,45 @@ WAQI_TOKEN = ""  # Add your token if available (optional for basic use)
 # OpenStreetMap via osmnx
 OSM_TIMEOUT = 180  # Timeout in seconds for OSM queries
 
+# OSM tags per feature layer (streets come from the 'drive' network)
+OSM_LAYER_TAGS = {
+    'buildings': {'building': True},
+    'green_blue': {
+        'leisure': ['park', 'garden', 'playground'],
+        'landuse': ['grass', 'forest', 'meadow', 'recreation_ground'],
+        'natural': ['water', 'wetland', 'wood', 'scrub']
+    },
+}
+
+# Fallback prevailing wind direction (degrees) when no wind data is available
+DEFAULT_WIND_DIRECTION = 270.0
+
+# Concurrent Data Fetching
+# Independent sources are fetched on a thread pool; each has its own deadline
+# and falls back to an empty layer / default value on timeout or error.
+# OSM layer deadlines are per tile: fetch_all_data multiplies them by the
+# number of uncached tiles, which are fetched one after another.
+FETCH_SOURCES = ('buildings', 'streets', 'green_blue', 'wind', 'air_quality')
+FETCH_TIMEOUTS = {
+    'buildings': OSM_TIMEOUT,
+    'streets': OSM_TIMEOUT,
+    'green_blue': OSM_TIMEOUT,
+    'wind': 30,
+    'air_quality': 10,
+}
+
 # ============================================================================
 # URBAN MORPHOLOGY THRESHOLDS
 # ============================================================================
+# Single owner of the classification and NbS thresholds: data/nbs_rules.json
+# references these constants by name rather than repeating the values.
 
 # Density Thresholds (Plan Area Fraction - λp)
 DENSITY_VERY_HIGH = 0.7  # Very dense urban core (>70% built)
 DENSITY_HIGH = 0.6  # Dense residential/commercial
 DENSITY_MEDIUM = 0.3  # Suburban density
 DENSITY_LOW = 0.15  # Low-density residential
+DENSITY_OPEN = 0.05  # Below this a cell is treated as already green/open
 # Below DENSITY_LOW = Open/undeveloped
 
 # Roughness Length (z0) Thresholds in meters
@@ -69,6 +101,24 @@ ROUGHNESS_LOW = 0.1  # Open fields, grassland
 DEFAULT_BUILDING_HEIGHT = 6.0  # meters (approx 2 floors)
 FLOOR_HEIGHT = 3.0  # meters per floor
 
+# Raster Morphology Engine (--engine raster)
+# Footprints are rasterized once onto a fine sub-grid; grid metrics are block
+# reductions on that array. Validated against the vector engine as the mean
+# absolute per-cell difference at the default 2 m resolution.
+RASTER_RESOLUTION_METERS = 2.0  # Sub-grid pixel size
+RASTER_MAX_STRIP_PIXELS = 16_000_000  # Pixels rasterized/reduced per strip (bounds memory)
+RASTER_MEMMAP_THRESHOLD_PIXELS = 100_000_000  # Spill the ID raster to disk above this size
+RASTER_VALIDATION_TOLERANCE = {
+    'density': 0.02,  # λp (fraction)
+    'avg_height': 1.0,  # meters
+    'roughness': 0.1,  # meters
+    'svf': 0.02,  # fraction
+}
+
+# Tiled Multi-process Execution (--workers N)
+TILE_SIZE_CELLS = 32  # Tile edge length in grid cells
+TILE_HALO_METERS = 500  # Context buffer around each tile (>= GREEN_BLUE_SEARCH_RADIUS_METERS)
+
 # Sky View Factor (SVF) Thresholds
 SVF_OPEN = 0.8  # Open sky, minimal obstruction
 SVF_MODERATE = 0.5  # Moderate tree/building cover
@@ -135,6 +185,10 @@ NBS_TYPES = {
 WIND_SPEED_THRESHOLD = 2.0  # m/s - Minimum for significant ventilation
 WIND_ALIGNMENT_TOLERANCE = 30  # degrees - Tolerance for corridor alignment
 
+# Green/Blue Proximity Parameters (requires the run's SpatialIndex)
+GREEN_BLUE_PROXIMITY_METERS = 100  # Cells within this distance are "near" existing green/blue
+GREEN_BLUE_SEARCH_RADIUS_METERS = 500  # Max search radius for nearest green/blue feature
+
 # Green Roof Parameters
 GREEN_ROOF_MIN_BUILDING_HEIGHT = 2  # floors
 GREEN_ROOF_SUBSTRATE_DEPTH = 0.15  # meters (extensive green roof)
@@ -208,6 +262,32 @@ CACHE_ENABLED = True
 CACHE_DIR = os.path.join(PROJECT_ROOT, 'data', 'cache')
 CACHE_EXPIRY_DAYS = 30  # Re-fetch data after 30 days
 
+# Cache Storage Format
+# 'parquet': GeoParquet (Arrow), compressed and column-projectable (requires pyarrow)
+# 'geojson': Legacy format; existing GeoJSON entries are migrated on first load
+CACHE_FORMAT = 'parquet'
+CACHE_PARQUET_COMPRESSION = 'zstd'
+
+# Columns read back for the buildings layer (geometry is always included);
+# everything is stored, only these are decoded on a warm-cache run
+CACHE_BUILDING_COLUMNS = ['building', 'height', 'building:levels', 'name']
+
+# Pipeline Stage Cache (see src/stage_cache.py)
+# main.py stage results keyed by a hash of their inputs, config subset and code
+STAGE_CACHE_ENABLED = True
+STAGE_CACHE_DIR = os.path.join(CACHE_DIR, 'stages')
+
+# OSM Tile Cache
+# OSM layers are fetched and cached per fixed UTM tile; a query is served by
+# unioning the tiles covering its bounding box and fetching only missing tiles
+OSM_TILE_SIZE_METERS = 2000
+
+# Data Provider for OSM layers
+# 'osmnx': live Overpass API via osmnx, cached per tile
+# 'replay': offline replay of saved Overpass responses in OVERPASS_REPLAY_DIR
+DATA_PROVIDER = 'osmnx'
+OVERPASS_REPLAY_DIR = os.path.join(PROJECT_ROOT, 'cache')
+
 # Output Directories
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'outputs')
 MAPS_DIR = os.path.join(OUTPUT_DIR, 'maps')
@@ -217,6 +297,27 @@ EXPORTS_DIR = os.path.join(OUTPUT_DIR, 'exports')
 # Reference Data
 REFERENCE_DIR = os.path.join(PROJECT_ROOT, 'data', 'references')
 
+# NbS Rule Table (condition → NbS type → priority, see src/nbs_rules.py)
+NBS_RULES_PATH = os.path.join(PROJECT_ROOT, 'data', 'nbs_rules.json')
+
+# Morphology snapshot written by main.py so rule changes can be replanned
+# without re-fetching or re-running morphology (see tools/replan.py)
+MORPHOLOGY_SNAPSHOT_NAME = 'morphology_snapshot.pkl'
+
+# ============================================================================
+# BATCH PROCESSING SETTINGS
+# ============================================================================
+
+# Separate concurrency limits (tools/batch_process.py): network-bound OSM
+# fetches run in threads, CPU-bound morphology/planning in processes
+BATCH_FETCH_WORKERS = 4
+BATCH_ANALYSIS_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+BATCH_LEDGER_NAME = 'batch_ledger.json'
+
+# Shared infrastructure store for batch runs (--shared-store): OSM layers
+# loaded once for all locations and sliced per location
+BATCH_SHARED_STORE_NAME = 'shared_store'
+
 # ============================================================================
 # LOGGING SETTINGS
 # ============================================================================
@@ -283,6 +384,35 @@ UHI_INTENSITY_HYDERABAD = 4.5  # °C difference between urban core and rural are
 MS_BUILDINGS_PATH = os.path.join(REFERENCE_DIR, 'hyderabad_buildings_ms.geojson')
 USE_MS_BUILDINGS = False  # Set to True if MS Buildings data is available
 
+# Prepared footprint store (Hilbert-sorted GeoParquet with bbox columns, see
+# src/footprint_store.py); preferred over MS_BUILDINGS_PATH when present
+MS_BUILDINGS_STORE_PATH = os.path.join(REFERENCE_DIR, 'hyderabad_buildings_ms.parquet')
+FOOTPRINT_STORE_EXTENT = (78.3, 17.3, 78.6, 17.5)  # Hyderabad bbox in WGS84 (lon/lat)
+FOOTPRINT_ROW_GROUP_SIZE = 20000
+
+# ============================================================================
+# 3D DATA EXPORT
+# ============================================================================
+
+# CityJSON vertices are stored as integers with a "transform" (scale +
+# translate); the precision is in metres (converted to degrees for
+# geographic CRSs). Set to None to write float vertices without a transform.
+CITYJSON_PRECISION_M = 0.001  # 1 mm
+METRES_PER_DEGREE = 111320  # Length of one degree of latitude (approx.)
+CITYJSON_GZIP = False  # Write *.json.gz instead of *.json
+
+# Streaming CityJSONSeq (*.city.jsonl) export for city-scale footprints
+CITYJSONSEQ_CHUNK_SIZE = 5000  # Features encoded per chunk
+CITYJSONSEQ_WORKERS = 1  # Encoding processes (>1 encodes chunks in parallel)
+
+# OGC 3D Tiles (tileset.json + per-tile GLB): quadtree over the UTM extent.
+# Leaf tiles hold individual buildings; coarser tiles hold block extrusions
+# aggregated from the grid's density and avg_height.
+TILES_MAX_BUILDINGS = 2000  # Split a tile holding more buildings than this
+TILES_MAX_DEPTH = 8  # Quadtree depth limit
+TILES_BLOCK_DIVISIONS = 16  # Blocks per coarse tile edge (sets its geometric error)
+TILES_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # Tile-writing processes
+
 # ============================================================================
 # REPORT TEMPLATES
 # ============================================================================
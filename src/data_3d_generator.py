@@ -5,14 +5,411 @@ Converts 2D geospatial data to 3D formats for 4D visualization
 
 import logging
 import json
+import gzip
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import pandas as pd
+import shapely
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 import geopandas as gpd
 from shapely.geometry import Polygon, Point, MultiPolygon, mapping
 
+from .config import (CITYJSON_PRECISION_M, CITYJSON_GZIP, CITYJSONSEQ_CHUNK_SIZE,
+                     CITYJSONSEQ_WORKERS, METRES_PER_DEGREE, CRS_UTM, CRS_WGS84,
+                     NBS_TYPES, NBS_COLORS, TILES_MAX_BUILDINGS, TILES_MAX_DEPTH,
+                     TILES_BLOCK_DIVISIONS, TILES_WORKERS)
+
+try:
+    import orjson
+except ImportError:  # optional, faster JSON encoder
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Vertex deduplication grid (CRS units); fine enough that only coordinates
+# equal up to float noise are merged
+VERTEX_RESOLUTION = 1e-9
+
+
+def ring_vertex_arrays(rings):
+    """
+    Flat vertex coordinates of a set of rings, without closing points
+    
+    Args:
+        rings: Array of LinearRings
+    
+    Returns:
+        tuple: (N x 2 coordinates in ring order, vertex count per ring)
+    """
+    coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+    counts = np.bincount(ring_index, minlength=len(rings))
+    
+    keep = np.ones(len(coords), dtype=bool)
+    keep[(np.cumsum(counts) - 1)[counts > 0]] = False
+    return coords[keep], np.maximum(counts - 1, 0)
+
+
+def deduplicate_vertices(coords, resolution=VERTEX_RESOLUTION):
+    """
+    Deduplicate 3D vertices on quantized integer coordinates
+    
+    Unique vertices are numbered in order of first appearance, matching
+    the indices add_vertex assigns when called in the same order.
+    
+    Args:
+        coords: N x 3 vertex sequence
+        resolution (float): Quantization step in CRS units
+    
+    Returns:
+        tuple: (unique vertices as M x 3 array, index into them for each input row)
+    """
+    if len(coords) == 0:
+        return np.empty((0, 3)), np.empty(0, dtype=np.int64)
+    
+    quantized = np.round(coords / resolution).astype(np.int64)
+    _, first, inverse = np.unique(quantized, axis=0, return_index=True, return_inverse=True)
+    
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return coords[first[order]], rank[inverse.ravel()]
+
+
+def vertex_transform(crs, bounds, precision=CITYJSON_PRECISION_M):
+    """
+    CityJSON "transform" for quantizing vertices
+    
+    Args:
+        crs: CRS of the x/y coordinates (geographic CRSs get a degree scale)
+        bounds: (minx, miny, maxx, maxy); the minimum corner is the translation
+        precision (float): Vertex precision in metres
+    
+    Returns:
+        dict: {"scale": [sx, sy, sz], "translate": [tx, ty, tz]}
+    """
+    scale_xy = precision
+    if crs is not None and crs.is_geographic:
+        # Round down to a power of ten so no axis is coarser than requested
+        scale_xy = float(10.0 ** np.floor(np.log10(precision / METRES_PER_DEGREE)))
+    
+    return {
+        "scale": [scale_xy, scale_xy, precision],
+        "translate": [float(bounds[0]), float(bounds[1]), 0.0]
+    }
+
+
+def quantize_vertices(coords, transform):
+    """
+    Convert vertices to CityJSON integer coordinates
+    
+    Args:
+        coords: N x 3 vertex array
+        transform (dict): CityJSON transform (see vertex_transform)
+    
+    Returns:
+        np.ndarray: N x 3 int64 array, coords = ints * scale + translate
+    """
+    scale = np.asarray(transform["scale"])
+    translate = np.asarray(transform["translate"])
+    return np.round((np.asarray(coords) - translate) / scale).astype(np.int64)
+
+
+def _dumps(data):
+    """Compact JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def feature_vertices(coords, feature, n_features, transform):
+    """
+    Feature-local integer vertices for CityJSONFeatures
+    
+    Vertices are quantized and deduplicated within each feature; features
+    must be contiguous in coords (as the *_vertex_arrays sequences are).
+    
+    Args:
+        coords: N x 3 vertex sequence
+        feature: Feature number of each row
+        n_features (int): Number of features
+        transform (dict): CityJSON transform
+    
+    Returns:
+        tuple: (M x 3 int vertices grouped by feature, per-feature offset and
+        count into them, feature-local vertex index of each input row)
+    """
+    keyed = np.column_stack([feature, quantize_vertices(coords, transform)])
+    unique, vertex_ids = deduplicate_vertices(keyed, resolution=1)
+    
+    counts = np.bincount(unique[:, 0], minlength=n_features) if len(unique) else \
+        np.zeros(n_features, dtype=np.int64)
+    offsets = np.cumsum(counts) - counts
+    return unique[:, 1:], offsets, counts, vertex_ids - offsets[feature]
+
+
+def _cityjsonseq_lines(task):
+    """
+    Encode one chunk of buildings or NbS surfaces as CityJSONFeature lines
+    
+    Args:
+        task (dict): 'kind' ('buildings' or 'nbs'), 'gdf', 'state', 'transform'
+    
+    Returns:
+        tuple: (encoded lines as bytes, number of features)
+    """
+    generator = Data3DGenerator()
+    if task['kind'] == 'buildings':
+        arrays = generator._building_vertex_arrays(task['gdf'])
+        ring_features = np.arange(len(arrays['ring_size']))
+        feature = np.repeat(ring_features, 2 * arrays['ring_size'])
+        objects = generator._building_objects
+    else:
+        arrays = generator._nbs_vertex_arrays(task['gdf'])
+        ring_features = np.repeat(np.arange(len(arrays['ring_count'])), arrays['ring_count'])
+        feature = np.repeat(ring_features, arrays['ring_size'])
+        objects = generator._nbs_objects
+    
+    n_features = len(arrays['labels'])
+    vertices, offsets, counts, vertex_ids = feature_vertices(
+        arrays['coords'], feature, n_features, task['transform'])
+    vertices = vertices.tolist()
+    
+    lines = []
+    for k, (object_id, obj) in enumerate(objects(arrays, vertex_ids, task['state'])):
+        lines.append(_dumps({
+            "type": "CityJSONFeature",
+            "id": object_id,
+            "CityObjects": {object_id: obj},
+            "vertices": vertices[offsets[k]:offsets[k] + counts[k]]
+        }))
+    
+    return b'\n'.join(lines) + b'\n' if lines else b'', n_features
+
+
+def write_json(data, output_path):
+    """
+    Write JSON compactly (orjson when installed), gzipped for *.gz paths
+    
+    Args:
+        data: JSON-serializable object
+        output_path: Output file path
+    
+    Returns:
+        Path: Written file
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    payload = _dumps(data)
+    if output_path.suffix == '.gz':
+        with gzip.open(output_path, 'wb', compresslevel=6) as f:
+            f.write(payload)
+    else:
+        output_path.write_bytes(payload)
+    
+    return output_path
+
+
+def triangulate_polygons(geoms):
+    """
+    Triangulate polygons (holes respected), counter-clockwise in XY
+    
+    Uses shapely's constrained Delaunay triangulation (shapely >= 2.1),
+    falling back to the triangle package per polygon.
+    
+    Args:
+        geoms: Array of Polygons
+    
+    Returns:
+        tuple: (T x 3 x 2 triangle corners, source polygon index per triangle)
+    """
+    if hasattr(shapely, 'constrained_delaunay_triangles'):
+        parts, polygon = shapely.get_parts(shapely.constrained_delaunay_triangles(geoms),
+                                           return_index=True)
+        triangles = shapely.get_coordinates(shapely.get_exterior_ring(parts)).reshape(-1, 4, 2)[:, :3]
+    else:
+        import triangle
+        
+        triangles, polygon = [np.empty((0, 3, 2))], [np.empty(0, dtype=np.int64)]
+        for i, geom in enumerate(geoms):
+            vertices, segments = [], []
+            for ring in [geom.exterior, *geom.interiors]:
+                points = np.asarray(ring.coords)[:-1]
+                start = sum(len(v) for v in vertices)
+                segments.append(start + np.column_stack([np.arange(len(points)),
+                                                         (np.arange(len(points)) + 1) % len(points)]))
+                vertices.append(points)
+            data = {'vertices': np.concatenate(vertices), 'segments': np.concatenate(segments)}
+            if geom.interiors:
+                data['holes'] = [Polygon(ring).representative_point().coords[0] for ring in geom.interiors]
+            result = triangle.triangulate(data, 'p')
+            if 'triangles' in result:
+                triangles.append(result['vertices'][result['triangles']])
+                polygon.append(np.full(len(result['triangles']), i))
+        triangles, polygon = np.concatenate(triangles), np.concatenate(polygon)
+    
+    # Counter-clockwise winding, so faces point up
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    clockwise = ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+                 (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])) < 0
+    triangles[clockwise] = triangles[clockwise][:, [0, 2, 1]]
+    return triangles, polygon
+
+
+def write_glb(meshes, output_path, extras=None):
+    """
+    Write triangle meshes as a binary glTF 2.0 (GLB) file
+    
+    Every attribute becomes a tightly packed, 4-byte aligned buffer view
+    in a single binary chunk; a viewer uploads them to the GPU as-is.
+    
+    Args:
+        meshes (list): Dicts with 'name', 'indices' (uint32 array), 'attributes'
+            ({semantic: typed array}, POSITION required) and optional 'extras'
+        output_path: Output .glb path
+        extras (dict): Scene-level extras (e.g. georeferencing)
+    
+    Returns:
+        Path: Written file
+    """
+    accessor_types = {1: 'SCALAR', 2: 'VEC2', 3: 'VEC3', 4: 'VEC4'}
+    component_types = {np.dtype(np.uint8): 5121, np.dtype(np.uint16): 5123,
+                       np.dtype(np.uint32): 5125, np.dtype(np.float32): 5126}
+    
+    gltf = {
+        "asset": {"version": "2.0", "generator": "Hyderabad NbS Planner"},
+        "scene": 0,
+        "scenes": [{"nodes": list(range(len(meshes)))}],
+        "nodes": [],
+        "meshes": [],
+        "materials": [{
+            "name": "vertex_color",
+            "pbrMetallicRoughness": {"baseColorFactor": [1, 1, 1, 1],
+                                     "metallicFactor": 0.0, "roughnessFactor": 1.0},
+            "doubleSided": False
+        }],
+        "accessors": [],
+        "bufferViews": [],
+        "buffers": []
+    }
+    if extras:
+        gltf["scenes"][0]["extras"] = extras
+    
+    chunks, offset = [], 0
+    
+    def add_accessor(array, target, normalized=False):
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        data = array.tobytes()
+        gltf["bufferViews"].append({"buffer": 0, "byteOffset": offset,
+                                    "byteLength": len(data), "target": target})
+        padding = -len(data) % 4
+        chunks.append(data + b'\x00' * padding)
+        offset += len(data) + padding
+        
+        accessor = {
+            "bufferView": len(gltf["bufferViews"]) - 1,
+            "componentType": component_types[array.dtype],
+            "count": len(array),
+            "type": accessor_types[1 if array.ndim == 1 else array.shape[1]]
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if target == 34962 and array.dtype == np.float32 and len(array):
+            accessor["min"] = np.atleast_1d(array.min(axis=0)).tolist()
+            accessor["max"] = np.atleast_1d(array.max(axis=0)).tolist()
+        gltf["accessors"].append(accessor)
+        return len(gltf["accessors"]) - 1
+    
+    for mesh in meshes:
+        attributes = {semantic: add_accessor(array, 34962, normalized=array.dtype == np.uint8)
+                      for semantic, array in mesh['attributes'].items()}
+        primitive = {"attributes": attributes, "material": 0, "mode": 4,
+                     "indices": add_accessor(mesh['indices'].astype(np.uint32), 34963)}
+        gltf["meshes"].append({"name": mesh['name'], "primitives": [primitive]})
+        if mesh.get('extras'):
+            gltf["meshes"][-1]["extras"] = mesh['extras']
+        gltf["nodes"].append({"name": mesh['name'], "mesh": len(gltf["meshes"]) - 1})
+    
+    binary = b''.join(chunks)
+    gltf["buffers"].append({"byteLength": len(binary)})
+    
+    json_chunk = _dumps(gltf)
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(np.array([0x46546C67, 2, 12 + 8 + len(json_chunk) + 8 + len(binary)],
+                         dtype='<u4').tobytes())
+        f.write(np.array([len(json_chunk), 0x4E4F534A], dtype='<u4').tobytes())
+        f.write(json_chunk)
+        f.write(np.array([len(binary), 0x004E4942], dtype='<u4').tobytes())
+        f.write(binary)
+    
+    return output_path
+
+
+def _hex_rgba(color):
+    """'#rrggbb' as an RGBA byte list"""
+    return [int(color[i:i + 2], 16) for i in (1, 3, 5)] + [255]
+
+
+def _nbs_palette():
+    """NbS type codes (NBS_TYPES order) and their RGBA colors"""
+    type_codes = {name: i for i, name in enumerate(NBS_TYPES)}
+    palette = np.array([_hex_rgba(NBS_COLORS.get(name, NBS_COLORS['None'])) for name in NBS_TYPES],
+                       dtype=np.uint8)
+    return type_codes, palette
+
+
+def enu_to_ecef_transform(lon, lat, height=0.0):
+    """
+    4x4 east-north-up to ECEF transform (column-major, as 3D Tiles expects)
+    
+    Args:
+        lon, lat (float): Frame origin in degrees (WGS84)
+        height (float): Ellipsoidal height of the origin in meters
+    
+    Returns:
+        list: 16 floats
+    """
+    a, f = 6378137.0, 1 / 298.257223563
+    e2 = f * (2 - f)
+    lon, lat = np.radians(lon), np.radians(lat)
+    n = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    
+    origin = [(n + height) * np.cos(lat) * np.cos(lon),
+              (n + height) * np.cos(lat) * np.sin(lon),
+              (n * (1 - e2) + height) * np.sin(lat)]
+    east = [-np.sin(lon), np.cos(lon), 0.0]
+    north = [-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)]
+    up = [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+    
+    return [float(v) for v in [*east, 0.0, *north, 0.0, *up, 0.0, *origin, 1.0]]
+
+
+def _write_tile(task):
+    """
+    Write one 3D Tiles content file (GLB of buildings or blocks)
+    
+    Args:
+        task (dict): 'gdf' (valid Polygons with avg_height), 'types' (NbS type
+            code per row), 'kind' ('buildings' or 'blocks'), 'origin', 'path'
+    
+    Returns:
+        str: Tile content path
+    """
+    generator = Data3DGenerator()
+    _, palette = _nbs_palette()
+    solids = generator._building_vertex_arrays(task['gdf'])
+    mesh = generator._building_mesh(solids, task['types'], task['origin'], palette,
+                                    name=task['kind'], id_prefix=task['kind'][:-1])
+    write_glb([mesh], task['path'])
+    return task['path']
+
 
 class Data3DGenerator:
     """
@@ -130,16 +527,27 @@ class Data3DGenerator:
                           nbs_gdf: Optional[gpd.GeoDataFrame] = None,
                           state: str = 'BEFORE',
                           output_path: Path = None,
-                          project_name: str = "Hyderabad NbS") -> Dict:
+                          project_name: str = "Hyderabad NbS",
+                          precision: Optional[float] = CITYJSON_PRECISION_M) -> Dict:
         """
         Export data to CityJSON format
         
+        Solids and surfaces are built from flat coordinate arrays: rings are
+        extracted with shapely, vertices deduplicated on quantized integer
+        coordinates (in first-appearance order, as add_vertex numbers them)
+        and ground, roof and wall index lists sliced from index arrays.
+        
+        With a precision, vertices are stored as integers under a CityJSON
+        "transform" (deduplicated at that precision); the file is written
+        compactly, and gzipped when output_path ends in .gz.
+        
         Args:
             buildings_gdf: Buildings GeoDataFrame with heights
             nbs_gdf: NbS interventions GeoDataFrame (optional)
             state: 'BEFORE' or 'AFTER'
             output_path: Output file path
             project_name: Project name for metadata
+            precision: Vertex precision in metres (None: float vertices, no transform)
         
         Returns:
             dict: CityJSON data structure
@@ -152,124 +560,48 @@ class Data3DGenerator:
         
         # Get bounds for reference point
         bounds = buildings_gdf.total_bounds
-        ref_x, ref_y = bounds[0], bounds[1]
         
         # Initialize CityJSON structure
         cityjson = {
             "type": "CityJSON",
             "version": "1.1",
-            "metadata": {
-                "referenceSystem": "urn:ogc:def:crs:EPSG::4326",
-                "geographicalExtent": bounds.tolist(),
-                "referencePoint": [ref_x, ref_y, 0],
-                "temporalState": state,
-                "title": f"{project_name} - {state} State",
-                "dataSource": "Hyderabad NbS Planner"
-            },
+            "metadata": self._metadata(bounds, state, project_name),
             "CityObjects": {},
             "vertices": []
         }
         
+        # Vertex sequences in add_vertex order: each building's ground ring
+        # then roof ring, followed by the NbS surface rings
+        solids = self._building_vertex_arrays(buildings_gdf)
+        surfaces = None
+        if state == 'AFTER' and nbs_gdf is not None:
+            logger.info(f"Processing {len(nbs_gdf)} NbS interventions...")
+            surfaces = self._nbs_vertex_arrays(nbs_gdf)
+        
+        sequence = solids['coords'] if surfaces is None else \
+            np.concatenate([solids['coords'], surfaces['coords']])
+        if precision is not None:
+            transform = vertex_transform(buildings_gdf.crs, bounds, precision)
+            cityjson["transform"] = transform
+            vertices, vertex_ids = deduplicate_vertices(quantize_vertices(sequence, transform),
+                                                        resolution=1)
+        else:
+            vertices, vertex_ids = deduplicate_vertices(sequence)
+        
         # Add buildings as 3D solids
         logger.info(f"Processing {len(buildings_gdf)} buildings...")
-        for idx, building in buildings_gdf.iterrows():
-            building_id = f"building_{idx}"
-            
-            try:
-                # Get building geometry
-                geom = building.geometry
-                if geom.is_empty or not isinstance(geom, Polygon):
-                    continue
-                
-                # Get building height
-                height = building.get('avg_height', 6.0)
-                if pd.isna(height) or height <= 0:
-                    height = 6.0
-                
-                # Get footprint coordinates (convert to list)
-                coords = list(geom.exterior.coords)
-                
-                # Create 3D solid
-                solid_boundaries = self.create_building_solid(coords, height)
-                
-                # Add to CityJSON
-                cityjson["CityObjects"][building_id] = {
-                    "type": "Building",
-                    "geometry": [{
-                        "type": "Solid",
-                        "lod": "1",
-                        "boundaries": solid_boundaries
-                    }],
-                    "attributes": {
-                        "measuredHeight": float(height),
-                        "roofType": "flat",
-                        "function": building.get('building', 'residential'),
-                        "temporalState": state
-                    }
-                }
-                
-            except Exception as e:
-                logger.warning(f"Failed to process building {idx}: {e}")
-                continue
+        n_solid = len(solids['coords'])
+        for building_id, obj in self._building_objects(solids, vertex_ids[:n_solid], state):
+            cityjson["CityObjects"][building_id] = obj
         
         # Add NbS interventions (if AFTER state)
-        if state == 'AFTER' and nbs_gdf is not None:
-            logger.info(f"Processing {len(nbs_gdf)} NbS interventions...")
-            
-            for idx, nbs in nbs_gdf.iterrows():
-                nbs_id = f"nbs_{idx}"
-                
-                try:
-                    # Get NbS geometry
-                    geom = nbs.geometry
-                    if geom.is_empty:
-                        continue
-                    
-                    nbs_type = nbs.get('Proposed_NbS', 'None')
-                    if nbs_type == 'None':
-                        continue
-                    
-                    # Determine height based on NbS type
-                    if nbs_type == 'Green Roof':
-                        z_height = nbs.get('avg_height', 6.0) + 0.5  # On top of building
-                    elif nbs_type == 'Urban Forest':
-                        z_height = 8.0  # Average tree height
-                    else:
-                        z_height = 0.2  # Ground level (permeable pavement, rain gardens)
-                    
-                    # Create surface
-                    if isinstance(geom, Polygon):
-                        surface_boundaries = self.create_surface_from_polygon(geom, z_height)
-                        
-                        # Determine CityObject type
-                        if 'Forest' in nbs_type or 'Tree' in nbs_type:
-                            city_object_type = "PlantCover"
-                        elif 'Wetland' in nbs_type or 'Water' in nbs_type:
-                            city_object_type = "WaterBody"
-                        else:
-                            city_object_type = "LandUse"
-                        
-                        # Add to CityJSON
-                        cityjson["CityObjects"][nbs_id] = {
-                            "type": city_object_type,
-                            "geometry": [{
-                                "type": "MultiSurface",
-                                "lod": "1",
-                                "boundaries": surface_boundaries
-                            }],
-                            "attributes": {
-                                "nbs_type": nbs_type,
-                                "area_sqm": float(geom.area),
-                                "cost_inr": float(nbs.get('cost_per_sqm', 0) * geom.area),
-                                "temporalState": state
-                            }
-                        }
-                        
-                except Exception as e:
-                    logger.warning(f"Failed to process NbS {idx}: {e}")
-                    continue
+        if surfaces is not None:
+            for nbs_id, obj in self._nbs_objects(surfaces, vertex_ids[n_solid:], state):
+                cityjson["CityObjects"][nbs_id] = obj
         
         # Add vertices to CityJSON
+        self.vertices = vertices.tolist()
+        self.vertex_index = {}
         cityjson["vertices"] = self.vertices
         
         logger.info(f"CityJSON generated: {len(cityjson['CityObjects'])} objects, "
@@ -277,16 +609,762 @@ class Data3DGenerator:
         
         # Save to file if output path provided
         if output_path:
-            output_path = Path(output_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(output_path, 'w') as f:
-                json.dump(cityjson, f, indent=2)
-            
+            output_path = write_json(cityjson, output_path)
             logger.info(f"✓ CityJSON saved to: {output_path}")
         
         return cityjson
     
+    def export_to_cityjsonseq(self, buildings_gdf: gpd.GeoDataFrame,
+                              nbs_gdf: Optional[gpd.GeoDataFrame] = None,
+                              state: str = 'BEFORE',
+                              output_path: Path = None,
+                              project_name: str = "Hyderabad NbS",
+                              precision: float = CITYJSON_PRECISION_M,
+                              chunk_size: int = CITYJSONSEQ_CHUNK_SIZE,
+                              workers: int = CITYJSONSEQ_WORKERS) -> Path:
+        """
+        Stream data to a CityJSON Text Sequence (CityJSONL) file
+        
+        The first line is a CityJSON header (metadata and transform, no
+        objects); every following line is a self-contained CityJSONFeature
+        with its own integer vertices, so viewers can read the file
+        incrementally. Features are encoded chunk by chunk (in worker
+        processes when workers > 1) and written as they complete, keeping
+        the output side of memory bounded by a few chunks.
+        
+        Args:
+            buildings_gdf: Buildings GeoDataFrame with heights
+            nbs_gdf: NbS interventions GeoDataFrame (optional)
+            state: 'BEFORE' or 'AFTER'
+            output_path: Output file path (*.gz is gzipped)
+            project_name: Project name for metadata
+            precision: Vertex precision in metres (required by CityJSONSeq)
+            chunk_size: Features per chunk
+            workers: Encoding processes
+        
+        Returns:
+            Path: Written file
+        """
+        if precision is None:
+            raise ValueError("CityJSONSeq requires a transform; precision cannot be None")
+        
+        logger.info(f"Streaming CityJSONSeq for {state} state...")
+        
+        bounds = buildings_gdf.total_bounds
+        header = {
+            "type": "CityJSON",
+            "version": "1.1",
+            "transform": vertex_transform(buildings_gdf.crs, bounds, precision),
+            "metadata": self._metadata(bounds, state, project_name),
+            "CityObjects": {},
+            "vertices": []
+        }
+        
+        chunks = [('buildings', buildings_gdf)]
+        if state == 'AFTER' and nbs_gdf is not None:
+            chunks.append(('nbs', nbs_gdf))
+        tasks = ({'kind': kind, 'gdf': gdf.iloc[start:start + chunk_size], 'state': state,
+                  'transform': header['transform']}
+                 for kind, gdf in chunks for start in range(0, len(gdf), chunk_size))
+        
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        opener = gzip.open if output_path.suffix == '.gz' else open
+        
+        n_features = 0
+        with opener(output_path, 'wb') as f:
+            f.write(_dumps(header) + b'\n')
+            
+            if workers == 1:
+                for task in tasks:
+                    lines, count = _cityjsonseq_lines(task)
+                    f.write(lines)
+                    n_features += count
+            else:
+                # Bounded window of in-flight chunks, written in submission order
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    pending = deque()
+                    for task in tasks:
+                        pending.append(executor.submit(_cityjsonseq_lines, task))
+                        if len(pending) >= 2 * workers:
+                            lines, count = pending.popleft().result()
+                            f.write(lines)
+                            n_features += count
+                    while pending:
+                        lines, count = pending.popleft().result()
+                        f.write(lines)
+                        n_features += count
+        
+        logger.info(f"✓ CityJSONSeq saved to: {output_path} ({n_features} features)")
+        return output_path
+    
+    def export_to_glb(self, buildings_gdf: gpd.GeoDataFrame,
+                      nbs_gdf: Optional[gpd.GeoDataFrame] = None,
+                      state: str = 'BEFORE',
+                      output_path: Path = None,
+                      project_name: str = "Hyderabad NbS") -> Path:
+        """
+        Export data as a binary glTF (GLB) mesh file
+        
+        Buildings are batched into one mesh (triangulated roofs plus wall
+        quads) and, in the AFTER state, NbS surfaces into a second one, so a
+        viewer draws the scene in two calls from GPU-ready buffers. Every
+        vertex carries NORMAL, COLOR_0 (NBS_COLORS), _FEATURE_ID (position in
+        the mesh's extras.featureIds) and _NBS_TYPE (index into the scene's
+        extras.nbsTypes); in the AFTER state buildings take the NbS type of
+        the intervention they sit in.
+        
+        Coordinates are metres in CRS_UTM (or the input's projected CRS),
+        relative to the origin stored in the scene extras, with Y up.
+        
+        Args:
+            buildings_gdf: Buildings GeoDataFrame with heights
+            nbs_gdf: NbS interventions GeoDataFrame (optional)
+            state: 'BEFORE' or 'AFTER'
+            output_path: Output .glb path
+            project_name: Project name for metadata
+        
+        Returns:
+            Path: Written file
+        """
+        logger.info(f"Generating GLB for {state} state...")
+        
+        if buildings_gdf.crs is not None and buildings_gdf.crs.is_geographic:
+            buildings_gdf = buildings_gdf.to_crs(CRS_UTM)
+        if nbs_gdf is not None and nbs_gdf.crs != buildings_gdf.crs:
+            nbs_gdf = nbs_gdf.to_crs(buildings_gdf.crs)
+        
+        bounds = buildings_gdf.total_bounds
+        origin = np.array([(bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2])
+        
+        type_codes, palette = _nbs_palette()
+        
+        solids = self._building_vertex_arrays(buildings_gdf)
+        building_types = np.full(len(solids['labels']), type_codes['None'])
+        
+        surfaces = None
+        if state == 'AFTER' and nbs_gdf is not None:
+            surfaces = self._nbs_vertex_arrays(nbs_gdf)
+            surface_types = np.array([type_codes.get(t, type_codes['None']) for t in surfaces['types']],
+                                     dtype=np.int64)
+            building_types = self._building_nbs_types(solids['geometries'], surfaces, surface_types)
+        
+        meshes = [self._building_mesh(solids, building_types, origin, palette)]
+        if surfaces is not None and len(surfaces['labels']):
+            meshes.append(self._nbs_mesh(surfaces, surface_types, origin, palette))
+        
+        origin_lonlat = gpd.GeoSeries([Point(origin)], crs=buildings_gdf.crs).to_crs(CRS_WGS84).iloc[0]
+        extras = {
+            "title": f"{project_name} - {state} State",
+            "temporalState": state,
+            "crs": str(buildings_gdf.crs),
+            "origin": origin.tolist(),
+            "originLonLat": [origin_lonlat.x, origin_lonlat.y],
+            "upAxis": "Y",
+            "nbsTypes": list(NBS_TYPES)
+        }
+        
+        output_path = write_glb(meshes, output_path, extras)
+        logger.info(f"✓ GLB saved to: {output_path} "
+                   f"({sum(len(m['attributes']['POSITION']) for m in meshes)} vertices)")
+        return output_path
+    
+    def export_to_3d_tiles(self, buildings_gdf: gpd.GeoDataFrame,
+                           grid_gdf: Optional[gpd.GeoDataFrame] = None,
+                           output_dir: Path = None,
+                           state: str = 'BEFORE',
+                           project_name: str = "Hyderabad NbS",
+                           max_buildings: int = TILES_MAX_BUILDINGS,
+                           max_depth: int = TILES_MAX_DEPTH,
+                           workers: int = TILES_WORKERS) -> Path:
+        """
+        Export data as an OGC 3D Tiles 1.1 tileset with GLB tile content
+        
+        A quadtree over the square UTM extent splits until a tile holds at
+        most max_buildings buildings (by representative point). Leaf tiles
+        hold the individual buildings (geometric error 0); coarser tiles
+        hold block extrusions aggregated from the grid on a
+        TILES_BLOCK_DIVISIONS lattice, each block keeping its cells' built
+        volume (density x cell area x avg_height), with the block spacing
+        as the tile's geometric error. Refinement is REPLACE, so a viewer
+        swaps blocks for buildings as it zooms in and only fetches visible
+        tiles. In the AFTER state, buildings and blocks are colored by the
+        grid's Proposed_NbS, as in export_to_glb.
+        
+        Tile content is written by a process pool. The root carries an
+        east-north-up to ECEF transform at the extent's center; UTM offsets
+        from that center are used as the local east/north plane.
+        
+        Args:
+            buildings_gdf: Buildings GeoDataFrame with heights
+            grid_gdf: Analysis grid / NbS plan with density and avg_height
+                (optional; without it coarse tiles have no content)
+            output_dir: Tileset directory (tileset.json and tiles/)
+            state: 'BEFORE' or 'AFTER'
+            project_name: Project name for metadata
+            max_buildings: Buildings per leaf tile
+            max_depth: Quadtree depth limit
+            workers: Tile-writing processes
+        
+        Returns:
+            Path: tileset.json
+        """
+        logger.info(f"Generating 3D Tiles for {state} state...")
+        
+        output_dir = Path(output_dir)
+        (output_dir / 'tiles').mkdir(parents=True, exist_ok=True)
+        
+        if buildings_gdf.crs is not None and buildings_gdf.crs.is_geographic:
+            buildings_gdf = buildings_gdf.to_crs(CRS_UTM)
+        if grid_gdf is not None and grid_gdf.crs != buildings_gdf.crs:
+            grid_gdf = grid_gdf.to_crs(buildings_gdf.crs)
+        
+        geoms = np.asarray(buildings_gdf.geometry.values, dtype=object)
+        valid = (shapely.get_type_id(geoms) == 3) & ~shapely.is_empty(geoms)
+        buildings_gdf, geoms = buildings_gdf[valid], geoms[valid]
+        heights = self._building_heights(buildings_gdf)
+        building_bounds = shapely.bounds(geoms)
+        points = shapely.get_coordinates(shapely.point_on_surface(geoms))
+        
+        type_codes, _ = _nbs_palette()
+        building_types = np.full(len(geoms), type_codes['None'])
+        cells = None
+        if grid_gdf is not None and len(grid_gdf):
+            cells = self._grid_cells(grid_gdf, type_codes, state)
+            if state == 'AFTER' and 'Proposed_NbS' in grid_gdf.columns:
+                surfaces = self._nbs_vertex_arrays(grid_gdf)
+                surface_types = np.array([type_codes.get(t, type_codes['None'])
+                                          for t in surfaces['types']], dtype=np.int64)
+                building_types = self._building_nbs_types(geoms, surfaces, surface_types)
+        
+        minx, miny, maxx, maxy = buildings_gdf.total_bounds
+        side = max(maxx - minx, maxy - miny, 1.0)
+        origin = np.array([minx + side / 2, miny + side / 2])
+        
+        tasks = []
+        
+        def build(depth, x, y, square, rows):
+            """Tile dict and (minx, miny, maxx, maxy, maxz) of its content"""
+            size = square[2] - square[0]
+            name = f"{depth}_{x}_{y}"
+            tile = {}
+            extent = [np.inf, np.inf, -np.inf, -np.inf, 0.0]
+            
+            def grow(bounds, top):
+                extent[:4] = [min(extent[0], bounds[0]), min(extent[1], bounds[1]),
+                              max(extent[2], bounds[2]), max(extent[3], bounds[3])]
+                extent[4] = max(extent[4], top)
+            
+            if len(rows) <= max_buildings or depth == max_depth:
+                tile["geometricError"] = 0.0
+                if len(rows):
+                    grow([*building_bounds[rows, :2].min(axis=0), *building_bounds[rows, 2:].max(axis=0)],
+                         heights[rows].max())
+                    tasks.append({'gdf': buildings_gdf.iloc[rows], 'types': building_types[rows],
+                                  'kind': 'buildings', 'origin': origin,
+                                  'path': output_dir / 'tiles' / f"{name}.glb"})
+                    tile["content"] = {"uri": f"tiles/{name}.glb"}
+            else:
+                spacing = size / TILES_BLOCK_DIVISIONS
+                tile["geometricError"] = spacing
+                blocks = self._tile_blocks(cells, square, spacing) if cells is not None else None
+                if blocks is not None and len(blocks):
+                    grow(blocks.total_bounds, blocks['avg_height'].max())
+                    tasks.append({'gdf': blocks, 'types': blocks['nbs_type'].to_numpy(),
+                                  'kind': 'blocks', 'origin': origin,
+                                  'path': output_dir / 'tiles' / f"{name}.glb"})
+                    tile["content"] = {"uri": f"tiles/{name}.glb"}
+                
+                half = size / 2
+                east = points[rows, 0] >= square[0] + half
+                north = points[rows, 1] >= square[1] + half
+                children = []
+                for dx in (0, 1):
+                    for dy in (0, 1):
+                        subset = rows[(east == dx) & (north == dy)]
+                        if not len(subset):
+                            continue
+                        child_square = (square[0] + dx * half, square[1] + dy * half,
+                                        square[0] + (dx + 1) * half, square[1] + (dy + 1) * half)
+                        child, child_extent = build(depth + 1, 2 * x + dx, 2 * y + dy,
+                                                    child_square, subset)
+                        children.append(child)
+                        grow(child_extent[:4], child_extent[4])
+                tile["children"] = children
+            
+            if not np.isfinite(extent[0]):
+                extent[:4] = list(square)
+            
+            # Box in the root's local frame: center, then x/y/z half-axes
+            center = [(extent[0] + extent[2]) / 2 - origin[0],
+                      (extent[1] + extent[3]) / 2 - origin[1], extent[4] / 2]
+            half_axes = [(extent[2] - extent[0]) / 2, (extent[3] - extent[1]) / 2, extent[4] / 2]
+            tile["boundingVolume"] = {"box": [float(v) for v in [
+                *center, half_axes[0], 0, 0, 0, half_axes[1], 0, 0, 0, half_axes[2]]]}
+            return tile, extent
+        
+        root, _ = build(0, 0, 0, (minx, miny, minx + side, miny + side), np.arange(len(geoms)))
+        
+        origin_lonlat = gpd.GeoSeries([Point(origin)], crs=buildings_gdf.crs).to_crs(CRS_WGS84).iloc[0]
+        root["transform"] = enu_to_ecef_transform(origin_lonlat.x, origin_lonlat.y)
+        root["refine"] = "REPLACE"
+        
+        tileset = {
+            "asset": {"version": "1.1", "generator": "Hyderabad NbS Planner"},
+            "extras": {
+                "title": f"{project_name} - {state} State",
+                "temporalState": state,
+                "crs": str(buildings_gdf.crs),
+                "origin": origin.tolist(),
+                "originLonLat": [origin_lonlat.x, origin_lonlat.y],
+                "nbsTypes": list(NBS_TYPES)
+            },
+            "geometricError": float(side),
+            "root": root
+        }
+        
+        if workers == 1:
+            for task in tasks:
+                _write_tile(task)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_write_tile, tasks))
+        
+        tileset_path = write_json(tileset, output_dir / 'tileset.json')
+        logger.info(f"✓ 3D Tiles saved to: {tileset_path} ({len(tasks)} tiles)")
+        return tileset_path
+    
+    def _grid_cells(self, grid_gdf: gpd.GeoDataFrame, type_codes: Dict, state: str) -> Dict:
+        """
+        Built area, volume and NbS type of the grid cells containing buildings
+        
+        Args:
+            grid_gdf: Grid with density and avg_height
+            type_codes: NbS type codes
+            state: 'BEFORE' or 'AFTER' (NbS types only in AFTER)
+        
+        Returns:
+            dict: Per-cell 'x', 'y' (centroid), 'built_area', 'height' and 'type'
+        """
+        geoms = np.asarray(grid_gdf.geometry.values, dtype=object)
+        density = pd.to_numeric(grid_gdf.get('density', 0.0), errors='coerce')
+        height = pd.to_numeric(grid_gdf.get('avg_height', 0.0), errors='coerce')
+        built_area = np.nan_to_num(np.asarray(density, dtype=float) * shapely.area(geoms))
+        height = np.nan_to_num(np.asarray(height, dtype=float))
+        
+        if state == 'AFTER' and 'Proposed_NbS' in grid_gdf.columns:
+            types = np.array([type_codes.get(t, type_codes['None']) for t in grid_gdf['Proposed_NbS']])
+        else:
+            types = np.full(len(geoms), type_codes['None'])
+        
+        keep = (built_area > 0) & (height > 0)
+        centroids = shapely.get_coordinates(shapely.centroid(geoms[keep]))
+        return {'x': centroids[:, 0], 'y': centroids[:, 1], 'built_area': built_area[keep],
+                'height': height[keep], 'type': types[keep]}
+    
+    def _tile_blocks(self, cells: Dict, square: Tuple, spacing: float) -> gpd.GeoDataFrame:
+        """
+        Block extrusions of the grid cells within a tile
+        
+        Cells are binned on a lattice of the given spacing; each block is a
+        square of the bin's built area (capped at the lattice spacing),
+        centered on its built-area centroid, tall enough to keep the bin's
+        built volume, with the NbS type covering the most built area.
+        
+        Args:
+            cells: Result of _grid_cells
+            square: Tile (minx, miny, maxx, maxy)
+            spacing: Lattice spacing in meters
+        
+        Returns:
+            GeoDataFrame: Blocks with avg_height and nbs_type
+        """
+        inside = ((cells['x'] >= square[0]) & (cells['x'] < square[2]) &
+                  (cells['y'] >= square[1]) & (cells['y'] < square[3]))
+        x, y = cells['x'][inside], cells['y'][inside]
+        area, height, types = cells['built_area'][inside], cells['height'][inside], cells['type'][inside]
+        
+        divisions = int(np.ceil((square[2] - square[0]) / spacing))
+        column = np.clip(((x - square[0]) // spacing).astype(np.int64), 0, divisions - 1)
+        row = np.clip(((y - square[1]) // spacing).astype(np.int64), 0, divisions - 1)
+        _, block = np.unique(column * divisions + row, return_inverse=True)
+        block = block.ravel()
+        n_blocks = block.max() + 1 if len(block) else 0
+        
+        built = np.bincount(block, weights=area, minlength=n_blocks)
+        center_x = np.bincount(block, weights=area * x, minlength=n_blocks) / built
+        center_y = np.bincount(block, weights=area * y, minlength=n_blocks) / built
+        volume = np.bincount(block, weights=area * height, minlength=n_blocks)
+        half = np.minimum(np.sqrt(built), spacing) / 2
+        block_height = volume / (2 * half) ** 2
+        
+        n_types = len(NBS_TYPES)
+        type_area = np.bincount(block * n_types + types, weights=area,
+                                minlength=n_blocks * n_types).reshape(n_blocks, n_types)
+        
+        return gpd.GeoDataFrame({'avg_height': block_height, 'nbs_type': type_area.argmax(axis=1)},
+                                geometry=shapely.box(center_x - half, center_y - half,
+                                                     center_x + half, center_y + half))
+    
+    def _building_nbs_types(self, building_geoms: np.ndarray, surfaces: Dict,
+                            surface_types: np.ndarray) -> np.ndarray:
+        """
+        NbS type code of the intervention each building sits in
+        
+        Args:
+            building_geoms: Building Polygons
+            surfaces: Result of _nbs_vertex_arrays
+            surface_types: NbS type code per surface
+        
+        Returns:
+            np.ndarray: Type code per building ('None' outside all interventions)
+        """
+        types = np.full(len(building_geoms), list(NBS_TYPES).index('None'))
+        if len(surfaces['geometries']) and len(building_geoms):
+            tree = shapely.STRtree(surfaces['geometries'])
+            building, surface = tree.query(shapely.point_on_surface(building_geoms), predicate='within')
+            types[building] = surface_types[surface]
+        return types
+    
+    def _building_mesh(self, solids: Dict, types: np.ndarray, origin: np.ndarray,
+                       palette: np.ndarray, name: str = 'buildings',
+                       id_prefix: str = 'building') -> Dict:
+        """
+        Batched building mesh: triangulated roofs and wall quads
+        
+        Args:
+            solids: Result of _building_vertex_arrays
+            types: NbS type code per building
+            origin: Local origin (x, y)
+            palette: RGBA color per NbS type code
+            name: Mesh name
+            id_prefix: Feature id prefix
+        
+        Returns:
+            dict: Mesh for write_glb
+        """
+        ring_start, ring_size = solids['ring_start'], solids['ring_size']
+        xy = solids['coords'][solids['ground_pos'], :2] - origin
+        z = solids['coords'][solids['roof_pos'], 2]
+        
+        position = np.arange(len(xy))
+        ring = np.repeat(np.arange(len(ring_size)), ring_size)
+        following = np.where(position + 1 == ring_start[ring] + ring_size[ring],
+                             ring_start[ring], position + 1)
+        
+        # Ring orientation (shoelace sign) decides wall winding and normals
+        x, y = xy[:, 0], xy[:, 1]
+        area = np.bincount(ring, weights=x * y[following] - x[following] * y, minlength=len(ring_size))
+        sign = np.where(area[ring] >= 0, 1.0, -1.0)
+        
+        edge = xy[following] - xy
+        length = np.hypot(edge[:, 0], edge[:, 1])
+        keep = length > 0
+        
+        # Wall quads [g_i, g_i+1, r_i+1, r_i], two triangles each
+        walls = np.empty((keep.sum(), 4, 3))
+        walls[:, [0, 3], :2] = xy[keep][:, None]
+        walls[:, [1, 2], :2] = xy[following][keep][:, None]
+        walls[:, :2, 2] = 0.0
+        walls[:, 2:, 2] = z[keep][:, None]
+        wall_normals = np.zeros((keep.sum(), 3))
+        wall_normals[:, :2] = (sign[keep] / length[keep])[:, None] * np.column_stack([edge[keep, 1],
+                                                                                       -edge[keep, 0]])
+        corners = np.where(sign[keep][:, None] > 0, [0, 1, 2, 0, 2, 3], [0, 2, 1, 0, 3, 2])
+        wall_indices = corners + 4 * np.arange(keep.sum())[:, None]
+        
+        # Roofs, vertices shared within each building
+        footprints = shapely.polygons(shapely.get_exterior_ring(solids['geometries']))
+        triangles, polygon = triangulate_polygons(footprints)
+        roof, roof_indices = deduplicate_vertices(
+            np.column_stack([np.repeat(polygon, 3), triangles.reshape(-1, 2) - origin]))
+        roof_feature = roof[:, 0].astype(np.int64)
+        roof_positions = np.column_stack([roof[:, 1:], solids['heights'][roof_feature]])
+        roof_normals = np.tile([0.0, 0.0, 1.0], (len(roof), 1))
+        
+        return self._mesh(
+            name,
+            positions=np.concatenate([roof_positions, walls.reshape(-1, 3)]),
+            normals=np.concatenate([roof_normals, np.repeat(wall_normals, 4, axis=0)]),
+            feature=np.concatenate([roof_feature, np.repeat(ring[keep], 4)]),
+            indices=np.concatenate([roof_indices, wall_indices.ravel() + len(roof)]),
+            types=types, palette=palette,
+            feature_ids=[f"{id_prefix}_{label}" for label in solids['labels']]
+        )
+    
+    def _nbs_mesh(self, surfaces: Dict, types: np.ndarray, origin: np.ndarray,
+                  palette: np.ndarray) -> Dict:
+        """
+        Batched NbS surface mesh at each intervention's surface height
+        
+        Args:
+            surfaces: Result of _nbs_vertex_arrays
+            types: NbS type code per intervention
+            origin: Local origin (x, y)
+            palette: RGBA color per NbS type code
+        
+        Returns:
+            dict: Mesh for write_glb
+        """
+        triangles, polygon = triangulate_polygons(surfaces['geometries'])
+        vertices, indices = deduplicate_vertices(
+            np.column_stack([np.repeat(polygon, 3), triangles.reshape(-1, 2) - origin]))
+        feature = vertices[:, 0].astype(np.int64)
+        
+        return self._mesh(
+            'nbs',
+            positions=np.column_stack([vertices[:, 1:], surfaces['z'][feature]]),
+            normals=np.tile([0.0, 0.0, 1.0], (len(vertices), 1)),
+            feature=feature, indices=indices, types=types, palette=palette,
+            feature_ids=[f"nbs_{label}" for label in surfaces['labels']]
+        )
+    
+    def _mesh(self, name: str, positions: np.ndarray, normals: np.ndarray, feature: np.ndarray,
+              indices: np.ndarray, types: np.ndarray, palette: np.ndarray, feature_ids: List) -> Dict:
+        """
+        Assemble glTF vertex attributes from Z-up local arrays
+        
+        Args:
+            name: Mesh name
+            positions, normals: V x 3 arrays (x east, y north, z up)
+            feature: Feature number per vertex
+            indices: Triangle vertex indices
+            types: NbS type code per feature
+            palette: RGBA color per NbS type code
+            feature_ids: CityObject-style id per feature
+        
+        Returns:
+            dict: Mesh for write_glb
+        """
+        # glTF is Y-up: (east, up, south)
+        y_up = [0, 2, 1]
+        flip = np.array([1.0, 1.0, -1.0])
+        vertex_types = types[feature]
+        
+        return {
+            'name': name,
+            'indices': indices,
+            'attributes': {
+                'POSITION': (positions[:, y_up] * flip).astype(np.float32),
+                'NORMAL': (normals[:, y_up] * flip).astype(np.float32),
+                'COLOR_0': palette[vertex_types],
+                '_FEATURE_ID': feature.astype(np.float32),
+                '_NBS_TYPE': vertex_types.astype(np.float32),
+            },
+            'extras': {'featureIds': feature_ids}
+        }
+    
+    def _metadata(self, bounds, state: str, project_name: str) -> Dict:
+        """CityJSON metadata for an export"""
+        return {
+            "referenceSystem": "urn:ogc:def:crs:EPSG::4326",
+            "geographicalExtent": bounds.tolist(),
+            "referencePoint": [bounds[0], bounds[1], 0],
+            "temporalState": state,
+            "title": f"{project_name} - {state} State",
+            "dataSource": "Hyderabad NbS Planner"
+        }
+    
+    def _building_vertex_arrays(self, buildings_gdf: gpd.GeoDataFrame) -> Dict:
+        """
+        Ground and roof vertex sequence of every Polygon building
+        
+        Args:
+            buildings_gdf: Buildings GeoDataFrame (avg_height in meters, optional)
+        
+        Returns:
+            dict: 'coords' (2N x 3, per building: ground ring then roof ring),
+            'geometries', 'labels', 'functions', 'heights', 'ring_start' and 'ring_size'
+            (offset and length of each footprint ring in the flat ring arrays)
+        """
+        geoms = np.asarray(buildings_gdf.geometry.values, dtype=object)
+        valid = (shapely.get_type_id(geoms) == 3) & ~shapely.is_empty(geoms)
+        
+        heights = self._building_heights(buildings_gdf)[valid]
+        
+        if 'building' in buildings_gdf.columns:
+            functions = buildings_gdf['building'].to_numpy(dtype=object)[valid]
+        else:
+            functions = np.full(valid.sum(), 'residential', dtype=object)
+        
+        xy, ring_size = ring_vertex_arrays(shapely.get_exterior_ring(geoms[valid]))
+        ring_start = np.cumsum(ring_size) - ring_size
+        ring = np.repeat(np.arange(len(ring_size)), ring_size)
+        
+        # Ground vertex j of building b sits at 2 * ring_start[b] + j,
+        # its roof vertex ring_size[b] positions later
+        ground_pos = ring_start[ring] + np.arange(len(xy))
+        roof_pos = ground_pos + ring_size[ring]
+        
+        coords = np.empty((2 * len(xy), 3))
+        coords[ground_pos, :2] = xy
+        coords[ground_pos, 2] = 0.0
+        coords[roof_pos, :2] = xy
+        coords[roof_pos, 2] = heights[ring]
+        
+        return {
+            'coords': coords,
+            'ground_pos': ground_pos,
+            'roof_pos': roof_pos,
+            'geometries': geoms[valid],
+            'labels': buildings_gdf.index[valid],
+            'functions': functions,
+            'heights': heights,
+            'ring_start': ring_start,
+            'ring_size': ring_size,
+        }
+    
+    def _building_heights(self, buildings_gdf: gpd.GeoDataFrame) -> np.ndarray:
+        """Building heights in meters (6 m where avg_height is missing or not positive)"""
+        if 'avg_height' not in buildings_gdf.columns:
+            return np.full(len(buildings_gdf), 6.0)
+        heights = pd.to_numeric(buildings_gdf['avg_height'], errors='coerce').to_numpy(dtype=float)
+        return np.where(np.isnan(heights) | (heights <= 0), 6.0, heights)
+    
+    def _building_objects(self, solids: Dict, vertex_ids: np.ndarray, state: str):
+        """
+        Yield (id, CityObject) for every building solid
+        
+        Args:
+            solids: Result of _building_vertex_arrays
+            vertex_ids: Deduplicated vertex index of each entry in solids['coords']
+            state: 'BEFORE' or 'AFTER'
+        """
+        ring_start, ring_size = solids['ring_start'], solids['ring_size']
+        ground = vertex_ids[solids['ground_pos']]
+        roof = vertex_ids[solids['roof_pos']]
+        
+        # Walls [g_i, g_i+1, r_i+1, r_i], wrapping at the end of each ring
+        position = np.arange(len(ground))
+        ring = np.repeat(np.arange(len(ring_size)), ring_size)
+        following = np.where(position + 1 == ring_start[ring] + ring_size[ring],
+                             ring_start[ring], position + 1)
+        walls = np.column_stack([ground, ground[following], roof[following], roof])[:, None, :].tolist()
+        ground = ground.tolist()
+        roof = roof.tolist()
+        
+        for k, label in enumerate(solids['labels']):
+            start, end = ring_start[k], ring_start[k] + ring_size[k]
+            boundaries = [[ground[start:end][::-1]], [roof[start:end]]] + walls[start:end]
+            
+            yield f"building_{label}", {
+                "type": "Building",
+                "geometry": [{
+                    "type": "Solid",
+                    "lod": "1",
+                    "boundaries": [boundaries]
+                }],
+                "attributes": {
+                    "measuredHeight": float(solids['heights'][k]),
+                    "roofType": "flat",
+                    "function": solids['functions'][k],
+                    "temporalState": state
+                }
+            }
+    
+    def _nbs_vertex_arrays(self, nbs_gdf: gpd.GeoDataFrame) -> Dict:
+        """
+        Surface vertex sequence of every Polygon NbS intervention
+        
+        Args:
+            nbs_gdf: NbS interventions GeoDataFrame
+        
+        Returns:
+            dict: 'coords' (N x 3, per intervention: exterior then hole rings),
+            per-intervention 'geometries', 'z', 'labels', 'types', 'areas', 'costs', 'ring_first'
+            and 'ring_count', and per-ring 'ring_start' and 'ring_size'
+        """
+        geoms = np.asarray(nbs_gdf.geometry.values, dtype=object)
+        nbs_types = (nbs_gdf['Proposed_NbS'].to_numpy(dtype=object)
+                     if 'Proposed_NbS' in nbs_gdf.columns
+                     else np.full(len(nbs_gdf), 'None', dtype=object))
+        valid = ((shapely.get_type_id(geoms) == 3) & ~shapely.is_empty(geoms) &
+                 np.array([isinstance(t, str) and t != 'None' for t in nbs_types], dtype=bool))
+        
+        geoms = geoms[valid]
+        nbs_types = nbs_types[valid]
+        
+        # Surface height by NbS type
+        if 'avg_height' in nbs_gdf.columns:
+            roof_height = pd.to_numeric(nbs_gdf['avg_height'], errors='coerce').to_numpy(dtype=float)[valid]
+            roof_height = np.where(np.isnan(roof_height), 6.0, roof_height)
+        else:
+            roof_height = np.full(len(geoms), 6.0)
+        z = np.where(nbs_types == 'Green Roof', roof_height + 0.5,   # On top of building
+                     np.where(nbs_types == 'Urban Forest', 8.0,     # Average tree height
+                              0.2))                                  # Ground level
+        
+        areas = shapely.area(geoms)
+        if 'cost_per_sqm' in nbs_gdf.columns:
+            cost_per_sqm = pd.to_numeric(nbs_gdf['cost_per_sqm'], errors='coerce').to_numpy(dtype=float)[valid]
+        else:
+            cost_per_sqm = np.zeros(len(geoms))
+        
+        # Exterior ring followed by holes, polygon by polygon
+        rings, ring_polygon = shapely.get_rings(geoms, return_index=True)
+        xy, ring_size = ring_vertex_arrays(rings)
+        ring_start = np.cumsum(ring_size) - ring_size
+        ring_count = np.bincount(ring_polygon, minlength=len(geoms))
+        
+        coords = np.empty((len(xy), 3))
+        coords[:, :2] = xy
+        coords[:, 2] = z[np.repeat(ring_polygon, ring_size)]
+        
+        return {
+            'coords': coords,
+            'geometries': geoms,
+            'z': z,
+            'labels': nbs_gdf.index[valid],
+            'types': nbs_types,
+            'areas': areas,
+            'costs': cost_per_sqm * areas,
+            'ring_first': np.cumsum(ring_count) - ring_count,
+            'ring_count': ring_count,
+            'ring_start': ring_start,
+            'ring_size': ring_size,
+        }
+    
+    def _nbs_objects(self, surfaces: Dict, vertex_ids: np.ndarray, state: str):
+        """
+        Yield (id, CityObject) for every NbS surface
+        
+        Args:
+            surfaces: Result of _nbs_vertex_arrays
+            vertex_ids: Deduplicated vertex index of each entry in surfaces['coords']
+            state: 'BEFORE' or 'AFTER'
+        """
+        vertex_ids = vertex_ids.tolist()
+        ring_start, ring_size = surfaces['ring_start'], surfaces['ring_size']
+        
+        for k, label in enumerate(surfaces['labels']):
+            nbs_type = surfaces['types'][k]
+            first = surfaces['ring_first'][k]
+            rings = [vertex_ids[ring_start[i]:ring_start[i] + ring_size[i]]
+                     for i in range(first, first + surfaces['ring_count'][k])]
+            
+            # Determine CityObject type
+            if 'Forest' in nbs_type or 'Tree' in nbs_type:
+                city_object_type = "PlantCover"
+            elif 'Wetland' in nbs_type or 'Water' in nbs_type:
+                city_object_type = "WaterBody"
+            else:
+                city_object_type = "LandUse"
+            
+            yield f"nbs_{label}", {
+                "type": city_object_type,
+                "geometry": [{
+                    "type": "MultiSurface",
+                    "lod": "1",
+                    "boundaries": [rings]
+                }],
+                "attributes": {
+                    "nbs_type": nbs_type,
+                    "area_sqm": float(surfaces['areas'][k]),
+                    "cost_inr": float(surfaces['costs'][k]),
+                    "temporalState": state
+                }
+            }
+    
     def export_to_geojson_3d(self, gdf: gpd.GeoDataFrame, 
                              height_column: str = 'avg_height',
                              output_path: Path = None) -> Dict:
@@ -353,16 +1431,64 @@ class Data3DGenerator:
         
         # Save to file if output path provided
         if output_path:
-            output_path = Path(output_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(output_path, 'w') as f:
-                json.dump(geojson, f, indent=2)
-            
+            output_path = write_json(geojson, output_path)
             logger.info(f"✓ 3D GeoJSON saved to: {output_path}")
         
         return geojson
     
+    def export_to_geojsonseq_3d(self, gdf: gpd.GeoDataFrame,
+                                height_column: str = 'avg_height',
+                                output_path: Path = None,
+                                chunk_size: int = CITYJSONSEQ_CHUNK_SIZE) -> Path:
+        """
+        Stream 3D features to a GeoJSON Text Sequence (GeoJSONSeq) file
+        
+        Streaming counterpart of export_to_geojson_3d: one Feature per line,
+        with height as the Z coordinate, encoded and written chunk by chunk
+        so the whole FeatureCollection is never held in memory.
+        
+        Args:
+            gdf: GeoDataFrame
+            height_column: Column name containing height values
+            output_path: Output file path (*.gz is gzipped)
+            chunk_size: Features per chunk
+        
+        Returns:
+            Path: Written file
+        """
+        logger.info("Streaming 3D GeoJSONSeq...")
+        
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        opener = gzip.open if output_path.suffix == '.gz' else open
+        geometry_column = gdf.geometry.name
+        
+        n_features = 0
+        with opener(output_path, 'wb') as f:
+            for start in range(0, len(gdf), chunk_size):
+                chunk = gdf.iloc[start:start + chunk_size]
+                geoms = chunk.geometry.values
+                keep = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+                chunk = chunk[keep]
+                
+                if height_column in chunk.columns:
+                    heights = chunk[height_column].fillna(0).to_numpy(dtype=float)
+                else:
+                    heights = np.zeros(len(chunk))
+                geometries = shapely.to_geojson(shapely.force_3d(chunk.geometry.values, heights))
+                
+                properties = chunk.drop(columns=geometry_column)
+                properties = properties.astype(object).where(properties.notna(), None)
+                
+                lines = [b'{"type":"Feature","geometry":' + geometry.encode('utf-8') +
+                         b',"properties":' + _dumps(record) + b'}\n'
+                         for geometry, record in zip(geometries, properties.to_dict('records'))]
+                f.write(b''.join(lines))
+                n_features += len(lines)
+        
+        logger.info(f"✓ 3D GeoJSONSeq saved to: {output_path} ({n_features} features)")
+        return output_path
+    
     def create_tree_3d_object(self, location: Point, height: float = 8.0, 
                              crown_radius: float = 3.0) -> Dict:
         """
@@ -407,7 +1533,13 @@ def generate_3d_data_for_project(buildings_gdf: gpd.GeoDataFrame,
                                  nbs_gdf: gpd.GeoDataFrame,
                                  green_blue_gdf: gpd.GeoDataFrame,
                                  output_dir: Path,
-                                 project_name: str = "Hyderabad NbS") -> Dict[str, Path]:
+                                 project_name: str = "Hyderabad NbS",
+                                 precision: Optional[float] = CITYJSON_PRECISION_M,
+                                 compress: bool = CITYJSON_GZIP,
+                                 stream: bool = False,
+                                 workers: int = CITYJSONSEQ_WORKERS,
+                                 glb: bool = False,
+                                 tiles: bool = False) -> Dict[str, Path]:
     """
     Generate all 3D data files for a project
     
@@ -417,6 +1549,15 @@ def generate_3d_data_for_project(buildings_gdf: gpd.GeoDataFrame,
         green_blue_gdf: Existing green/blue spaces
         output_dir: Output directory
         project_name: Project name
+        precision: CityJSON vertex precision in metres (None: float vertices)
+        compress: Write gzipped CityJSON (*.json.gz)
+        stream: Stream BEFORE/AFTER as CityJSONSeq (*.city.jsonl) and the 3D
+            GeoJSON as GeoJSONSeq (*.geojsonl) instead of building whole
+            documents in memory
+        workers: Encoding processes for streamed exports
+        glb: Also write BEFORE/AFTER binary glTF meshes (*.glb)
+        tiles: Also write BEFORE/AFTER 3D Tiles tilesets (*_tiles/tileset.json);
+            nbs_gdf serves as the grid for the coarse block tiles
     
     Returns:
         dict: Dictionary of generated file paths
@@ -431,48 +1572,101 @@ def generate_3d_data_for_project(buildings_gdf: gpd.GeoDataFrame,
     generator = Data3DGenerator()
     
     generated_files = {}
+    cityjson_suffix = '.city.jsonl' if stream else '.json'
+    if compress:
+        cityjson_suffix += '.gz'
+    file_key = 'cityjsonseq' if stream else 'cityjson'
     
     # 1. BEFORE state (current buildings + existing green spaces)
     logger.info("\n1. Generating BEFORE state...")
-    before_cityjson_path = output_dir / f"{project_name.replace(' ', '_')}_BEFORE.json"
+    before_cityjson_path = output_dir / f"{project_name.replace(' ', '_')}_BEFORE{cityjson_suffix}"
     
     # Combine buildings and existing green spaces
     buildings_before = buildings_gdf.copy()
     
-    generator.export_to_cityjson(
-        buildings_before,
-        green_blue_gdf,  # Include existing green spaces
-        state='BEFORE',
-        output_path=before_cityjson_path,
-        project_name=project_name
-    )
+    if stream:
+        generator.export_to_cityjsonseq(
+            buildings_before,
+            green_blue_gdf,
+            state='BEFORE',
+            output_path=before_cityjson_path,
+            project_name=project_name,
+            precision=precision,
+            workers=workers
+        )
+    else:
+        generator.export_to_cityjson(
+            buildings_before,
+            green_blue_gdf,  # Include existing green spaces
+            state='BEFORE',
+            output_path=before_cityjson_path,
+            project_name=project_name,
+            precision=precision
+        )
     
-    generated_files['before_cityjson'] = before_cityjson_path
+    generated_files[f'before_{file_key}'] = before_cityjson_path
     
     # 2. AFTER state (buildings + NbS interventions)
     logger.info("\n2. Generating AFTER state...")
-    after_cityjson_path = output_dir / f"{project_name.replace(' ', '_')}_AFTER.json"
+    after_cityjson_path = output_dir / f"{project_name.replace(' ', '_')}_AFTER{cityjson_suffix}"
     
-    generator.export_to_cityjson(
-        buildings_gdf,
-        nbs_gdf,  # Include NbS interventions
-        state='AFTER',
-        output_path=after_cityjson_path,
-        project_name=project_name
-    )
+    if stream:
+        generator.export_to_cityjsonseq(
+            buildings_gdf,
+            nbs_gdf,
+            state='AFTER',
+            output_path=after_cityjson_path,
+            project_name=project_name,
+            precision=precision,
+            workers=workers
+        )
+    else:
+        generator.export_to_cityjson(
+            buildings_gdf,
+            nbs_gdf,  # Include NbS interventions
+            state='AFTER',
+            output_path=after_cityjson_path,
+            project_name=project_name,
+            precision=precision
+        )
     
-    generated_files['after_cityjson'] = after_cityjson_path
+    generated_files[f'after_{file_key}'] = after_cityjson_path
     
-    # 3. 3D GeoJSON exports
-    logger.info("\n3. Generating 3D GeoJSON files...")
+    if glb:
+        before_glb_path = output_dir / f"{project_name.replace(' ', '_')}_BEFORE.glb"
+        generated_files['before_glb'] = generator.export_to_glb(
+            buildings_before, state='BEFORE', output_path=before_glb_path,
+            project_name=project_name
+        )
+        
+        after_glb_path = output_dir / f"{project_name.replace(' ', '_')}_AFTER.glb"
+        generated_files['after_glb'] = generator.export_to_glb(
+            buildings_gdf, nbs_gdf, state='AFTER', output_path=after_glb_path,
+            project_name=project_name
+        )
     
-    buildings_3d_path = output_dir / f"{project_name.replace(' ', '_')}_buildings_3d.geojson"
-    generator.export_to_geojson_3d(buildings_gdf, 'avg_height', buildings_3d_path)
-    generated_files['buildings_3d_geojson'] = buildings_3d_path
+    if tiles:
+        for state in ('BEFORE', 'AFTER'):
+            tileset_dir = output_dir / f"{project_name.replace(' ', '_')}_{state}_tiles"
+            generated_files[f'{state.lower()}_tileset'] = generator.export_to_3d_tiles(
+                buildings_gdf, nbs_gdf, output_dir=tileset_dir, state=state,
+                project_name=project_name
+            )
     
-    nbs_3d_path = output_dir / f"{project_name.replace(' ', '_')}_nbs_3d.geojson"
-    generator.export_to_geojson_3d(nbs_gdf, 'avg_height', nbs_3d_path)
-    generated_files['nbs_3d_geojson'] = nbs_3d_path
+    # 3. 3D GeoJSON exports (line-delimited GeoJSONSeq when streaming)
+    logger.info("\n3. Generating 3D GeoJSON files...")
+    
+    for name, gdf in (('buildings', buildings_gdf), ('nbs', nbs_gdf)):
+        if stream:
+            geojson_3d_path = output_dir / f"{project_name.replace(' ', '_')}_{name}_3d.geojsonl"
+            if compress:
+                geojson_3d_path = geojson_3d_path.with_name(geojson_3d_path.name + '.gz')
+            generator.export_to_geojsonseq_3d(gdf, 'avg_height', geojson_3d_path)
+            generated_files[f'{name}_3d_geojsonseq'] = geojson_3d_path
+        else:
+            geojson_3d_path = output_dir / f"{project_name.replace(' ', '_')}_{name}_3d.geojson"
+            generator.export_to_geojson_3d(gdf, 'avg_height', geojson_3d_path)
+            generated_files[f'{name}_3d_geojson'] = geojson_3d_path
     
     logger.info("\n" + "="*70)
     logger.info("3D DATA GENERATION COMPLETE")
@@ -484,10 +1678,6 @@ def generate_3d_data_for_project(buildings_gdf: gpd.GeoDataFrame,
     return generated_files
 
 
-# Import pandas at module level for type checking
-import pandas as pd
-
-
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     print("3D Data Generator module loaded successfully.")
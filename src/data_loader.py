@@ -4,40 +4,68 @@ Handles fetching data from OpenStreetMap, weather APIs, and air quality sources
 Implements caching to avoid repeated API calls
 """
 
-import osmnx as ox
 import geopandas as gpd
 import pandas as pd
 import requests
 import json
 import os
+import time
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
 from pathlib import Path
-from shapely.geometry import Point
+import numpy as np
+import shapely
+from shapely.geometry import Point, box
 import logging
 
 from .config import (
     CITY_LAT, CITY_LON, ANALYSIS_RADIUS_METERS,
     OPEN_METEO_URL, OPEN_METEO_PARAMS, WAQI_URL,
-    CRS_WGS84, CRS_UTM, OSM_TIMEOUT,
+    CRS_WGS84, CRS_UTM, OSM_TIMEOUT, FETCH_SOURCES, FETCH_TIMEOUTS, DEFAULT_WIND_DIRECTION,
     CACHE_ENABLED, CACHE_DIR, CACHE_EXPIRY_DAYS,
-    WIND_SPEED_THRESHOLD, MS_BUILDINGS_PATH, USE_MS_BUILDINGS
+    CACHE_FORMAT, CACHE_PARQUET_COMPRESSION, CACHE_BUILDING_COLUMNS,
+    OSM_TILE_SIZE_METERS, OSM_LAYER_TAGS, DATA_PROVIDER,
+    WIND_SPEED_THRESHOLD, MS_BUILDINGS_PATH, MS_BUILDINGS_STORE_PATH, USE_MS_BUILDINGS
 )
+from .footprint_store import read_footprints, write_footprint_part
+from .providers import DataProvider, OverpassReplayProvider
+from . import profiling
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
 
 class DataCache:
-    """Simple file-based cache for OSM data"""
+    """
+    Simple file-based cache for OSM data
+
+    Layers are stored as GeoParquet (compressed, column-projectable) when
+    pyarrow is available, otherwise as GeoJSON. Legacy GeoJSON entries are
+    converted to GeoParquet the first time they are loaded.
+    """
     
-    def __init__(self, cache_dir=CACHE_DIR, expiry_days=CACHE_EXPIRY_DAYS):
+    FORMATS = {'parquet': '.parquet', 'geojson': '.geojson'}
+    
+    def __init__(self, cache_dir=CACHE_DIR, expiry_days=CACHE_EXPIRY_DAYS,
+                 cache_format=CACHE_FORMAT, compression=CACHE_PARQUET_COMPRESSION):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.expiry_days = expiry_days
+        self.compression = compression
+        
+        if cache_format not in self.FORMATS:
+            raise ValueError(f"Unknown cache format '{cache_format}'. "
+                             f"Use one of {sorted(self.FORMATS)}.")
+        if cache_format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+            logger.warning("pyarrow not installed; falling back to GeoJSON cache.")
+            cache_format = 'geojson'
+        self.format = cache_format
     
-    def _get_cache_path(self, key):
+    def _get_cache_path(self, key, cache_format=None):
         """Generate cache file path for a given key"""
-        return self.cache_dir / f"{key}.geojson"
+        return self.cache_dir / f"{key}{self.FORMATS[cache_format or self.format]}"
     
     def _get_metadata_path(self, key):
         """Generate metadata file path"""
@@ -58,169 +86,729 @@ class DataCache:
         
         return datetime.now() < expiry_date
     
-    def save(self, key, gdf):
-        """Save GeoDataFrame to cache"""
-        cache_path = self._get_cache_path(key)
-        meta_path = self._get_metadata_path(key)
+    @staticmethod
+    def _prepare_for_parquet(gdf):
+        """
+        Make an OSM GeoDataFrame Arrow-serializable
+
+        The (element_type, osmid) index becomes regular columns, as it does
+        in GeoJSON, and mixed-type object columns (lists, dicts, numbers
+        among strings) are stored as strings.
+        """
+        if any(name is not None for name in gdf.index.names):
+            gdf = gdf.reset_index()
+        else:
+            gdf = gdf.reset_index(drop=True)
         
-        # Save data
-        if not gdf.empty:
-            gdf.to_file(cache_path, driver='GeoJSON')
+        geometry_name = gdf.geometry.name
+        for col in gdf.columns:
+            if col == geometry_name or gdf[col].dtype != object:
+                continue
+            gdf[col] = gdf[col].map(
+                lambda v: v if v is None or isinstance(v, str) or
+                (isinstance(v, float) and v != v) else str(v)
+            )
+        return gdf
+    
+    @staticmethod
+    def _temp_path(path):
+        """Per-writer temporary path next to the final file"""
+        return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    
+    def _write(self, key, gdf):
+        """
+        Write layer data in the configured format
+
+        Entries are written to a temporary file and renamed into place, so
+        concurrent writers (batch fetch threads/processes sharing tiles)
+        never leave or read a partial file.
+        """
+        cache_path = self._get_cache_path(key)
+        tmp_path = self._temp_path(cache_path)
         
-        # Save metadata
+        if self.format == 'parquet':
+            self._prepare_for_parquet(gdf).to_parquet(
+                tmp_path, compression=self.compression, index=False
+            )
+        else:
+            gdf.to_file(tmp_path, driver='GeoJSON')
+        os.replace(tmp_path, cache_path)
+    
+    def _write_metadata(self, key, num_features, timestamp=None):
+        """Write the metadata sidecar"""
         metadata = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp or datetime.now().isoformat(),
             'key': key,
-            'num_features': len(gdf)
+            'num_features': num_features,
+            'format': self.format
         }
-        with open(meta_path, 'w') as f:
+        meta_path = self._get_metadata_path(key)
+        tmp_path = self._temp_path(meta_path)
+        with open(tmp_path, 'w') as f:
             json.dump(metadata, f)
+        os.replace(tmp_path, meta_path)
+    
+    def save(self, key, gdf):
+        """Save GeoDataFrame to cache"""
+        # Save data
+        if not gdf.empty:
+            self._write(key, gdf)
+        
+        # Save metadata
+        self._write_metadata(key, len(gdf))
         
-        logger.debug(f"Saved {len(gdf)} features to cache: {key}")
+        logger.debug(f"Saved {len(gdf)} features to cache: {key} ({self.format})")
     
-    def load(self, key):
-        """Load GeoDataFrame from cache"""
-        cache_path = self._get_cache_path(key)
+    def _migrate(self, key, gdf):
+        """Rewrite a legacy GeoJSON entry as GeoParquet, keeping its timestamp"""
+        legacy_path = self._get_cache_path(key, 'geojson')
+        meta_path = self._get_metadata_path(key)
+        
+        timestamp = None
+        if meta_path.exists():
+            with open(meta_path, 'r') as f:
+                timestamp = json.load(f).get('timestamp')
+        
+        try:
+            self._write(key, gdf)
+        except Exception as e:
+            logger.warning(f"Could not migrate cache entry {key} to GeoParquet: {e}")
+            return
+        
+        self._write_metadata(key, len(gdf), timestamp=timestamp)
+        legacy_path.unlink()
+        logger.info(f"Migrated cache entry {key} from GeoJSON to GeoParquet.")
+    
+    def load(self, key, columns=None):
+        """
+        Load GeoDataFrame from cache
+        
+        Args:
+            key (str): Cache key
+            columns (list): Attribute columns to read (geometry is always
+                included; columns absent from the entry are ignored)
         
-        if not cache_path.exists():
+        Returns:
+            GeoDataFrame or None if the entry does not exist
+        """
+        cache_path = self._get_cache_path(key, 'parquet')
+        
+        if self.format == 'parquet' and cache_path.exists():
+            if columns is not None:
+                import pyarrow.parquet as pq
+                schema = pq.read_schema(cache_path)
+                geometry_column = json.loads(schema.metadata[b'geo'])['primary_column']
+                columns = [c for c in columns if c in schema.names] + [geometry_column]
+            gdf = gpd.read_parquet(cache_path, columns=columns)
+            logger.debug(f"Loaded {len(gdf)} features from cache: {key} (parquet)")
+            return gdf
+        
+        legacy_path = self._get_cache_path(key, 'geojson')
+        if not legacy_path.exists():
             return None
         
-        gdf = gpd.read_file(cache_path)
-        logger.debug(f"Loaded {len(gdf)} features from cache: {key}")
+        gdf = gpd.read_file(legacy_path)
+        logger.debug(f"Loaded {len(gdf)} features from cache: {key} (geojson)")
+        
+        if self.format == 'parquet' and not gdf.empty:
+            self._migrate(key, gdf)
+        
+        if columns is not None:
+            gdf = project_columns(gdf, columns)
         return gdf
 
 
-def fetch_live_infrastructure(lat=CITY_LAT, lon=CITY_LON, dist=ANALYSIS_RADIUS_METERS, use_cache=CACHE_ENABLED):
+def project_columns(gdf, columns):
+    """
+    Keep only the requested attribute columns (and geometry) of a layer
+
+    Args:
+        gdf (GeoDataFrame): Layer
+        columns (list): Attribute columns to keep; absent columns are ignored
+
+    Returns:
+        GeoDataFrame: Projected layer
+    """
+    return gdf[[c for c in columns if c in gdf.columns] + [gdf.geometry.name]]
+
+
+# Columns identifying the same OSM feature across neighbouring tiles
+OSM_FEATURE_KEYS = {
+    'buildings': ['element_type', 'osmid'],
+    'streets': ['u', 'v', 'key'],
+    'green_blue': ['element_type', 'osmid'],
+}
+
+# Street tiles are cached unsimplified (see union_tiles); the distinct layer
+# key keeps simplified tiles cached by earlier versions from being mixed in
+TILE_CACHE_LAYER_KEYS = {
+    'streets': 'streets_unsimplified',
+}
+
+
+def tiles_for_bounds(bounds, tile_size=OSM_TILE_SIZE_METERS):
+    """
+    UTM tiles of a fixed lattice covering a bounding box
+
+    Args:
+        bounds (tuple): (minx, miny, maxx, maxy) in CRS_UTM
+        tile_size (float): Tile edge length in meters
+
+    Returns:
+        list: (tile_x, tile_y) integer tile indices
+    """
+    minx, miny, maxx, maxy = bounds
+    tx0, ty0 = int(minx // tile_size), int(miny // tile_size)
+    tx1, ty1 = int(maxx // tile_size), int(maxy // tile_size)
+    return [(tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1)]
+
+
+def tile_polygon(tile, tile_size=OSM_TILE_SIZE_METERS, crs=CRS_UTM):
+    """
+    Footprint of a tile
+
+    Args:
+        tile (tuple): (tile_x, tile_y)
+        tile_size (float): Tile edge length in meters
+        crs: Output CRS (default: CRS_UTM)
+
+    Returns:
+        Polygon: Tile footprint in the requested CRS
+    """
+    tx, ty = tile
+    footprint = box(tx * tile_size, ty * tile_size, (tx + 1) * tile_size, (ty + 1) * tile_size)
+    if crs == CRS_UTM:
+        return footprint
+    return gpd.GeoSeries([footprint], crs=CRS_UTM).to_crs(crs).iloc[0]
+
+
+def tile_cache_key(tile, layer, tile_size=OSM_TILE_SIZE_METERS):
+    """Cache key of one layer of one tile"""
+    layer = TILE_CACHE_LAYER_KEYS.get(layer, layer)
+    return f"osm_tile_{int(tile_size)}_{tile[0]}_{tile[1]}_{layer}"
+
+
+def fetch_osm_tile(layer, tile, tile_size=OSM_TILE_SIZE_METERS):
+    """
+    Fetch one layer of one tile from OpenStreetMap
+
+    Streets are fetched unsimplified: every edge is a single OSM way segment
+    between two OSM nodes, so an edge crossing a tile border has the same
+    (u, v, key) in both tiles. They are simplified once after the union.
+
+    Args:
+        layer (str): 'buildings', 'streets' or 'green_blue'
+        tile (tuple): (tile_x, tile_y)
+        tile_size (float): Tile edge length in meters
+
+    Returns:
+        GeoDataFrame: Features in CRS_UTM with OSM ids as columns (empty if
+        the tile has none), or None if the request failed
+    """
+    import osmnx as ox
+    from osmnx._errors import InsufficientResponseError
+
+    polygon = tile_polygon(tile, tile_size, crs=CRS_WGS84)
+    empty = gpd.GeoDataFrame(geometry=[], crs=CRS_UTM)
+
+    try:
+        if layer == 'streets':
+            G = ox.graph_from_polygon(
+                polygon,
+                network_type='drive',
+                simplify=False,
+                truncate_by_edge=True
+            )
+            gdf = ox.graph_to_gdfs(G, nodes=False, edges=True)
+        else:
+            gdf = ox.features_from_polygon(polygon, tags=OSM_LAYER_TAGS[layer])
+    except InsufficientResponseError:
+        # Nothing of this layer in the tile; cacheable as empty
+        return empty
+    except ValueError as e:
+        # osmnx reports "no graph nodes within the polygon" (streets only in
+        # the query buffer it truncates away) as a bare ValueError; its
+        # request and response errors are ValueError subclasses
+        if layer == 'streets' and type(e) is ValueError:
+            return empty
+        logger.error(f"Error fetching {layer} for tile {tile}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching {layer} for tile {tile}: {e}")
+        return None
+
+    if gdf.empty:
+        return empty
+
+    return gdf.to_crs(CRS_UTM).reset_index()
+
+
+def union_tiles(frames, layer, bounds=None):
+    """
+    Union per-tile layers into one GeoDataFrame
+
+    Features crossing tile edges are fetched with every tile they touch;
+    duplicates are dropped by OSM identity. Unsimplified street edges are
+    then simplified once over the whole union (simplify_street_edges).
+
+    Args:
+        frames (list): Per-tile GeoDataFrames
+        layer (str): Layer name
+        bounds (tuple): Keep only features intersecting this box (optional)
+
+    Returns:
+        GeoDataFrame: Unioned layer in CRS_UTM
+    """
+    frames = [gdf for gdf in frames if gdf is not None and not gdf.empty]
+    if not frames:
+        return gpd.GeoDataFrame(geometry=[], crs=CRS_UTM)
+
+    gdf = gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=CRS_UTM)
+
+    keys = [col for col in OSM_FEATURE_KEYS[layer] if col in gdf.columns]
+    if keys:
+        gdf = gdf.drop_duplicates(subset=keys, ignore_index=True)
+    else:
+        gdf = gdf[~gdf.geometry.to_wkb().duplicated()].reset_index(drop=True)
+
+    if layer == 'streets':
+        gdf = simplify_street_edges(gdf)
+
+    if bounds is not None:
+        positions = gdf.sindex.query(box(*bounds), predicate='intersects')
+        gdf = gdf.iloc[np.sort(positions)].reset_index(drop=True)
+
+    return gdf
+
+
+def simplify_street_edges(gdf):
+    """
+    Simplify an unsimplified street edge layer with osmnx
+
+    The node layer is rebuilt from the edge end points, so this works on
+    edges unioned from cached tiles.
+
+    Args:
+        gdf (GeoDataFrame): Street edges with u, v and key columns
+
+    Returns:
+        GeoDataFrame: Simplified edges with u, v and key columns
+    """
+    if gdf.empty or not {'u', 'v', 'key'}.issubset(gdf.columns):
+        return gdf
+
+    import osmnx as ox
+
+    edges = gdf.set_index(['u', 'v', 'key'])
+    node_ids = np.concatenate([edges.index.get_level_values('u'), edges.index.get_level_values('v')])
+    points = np.concatenate([shapely.get_point(edges.geometry.values, 0),
+                             shapely.get_point(edges.geometry.values, -1)])
+    node_ids, first = np.unique(node_ids, return_index=True)
+    points = points[first]
+
+    nodes = gpd.GeoDataFrame(
+        {'x': shapely.get_x(points), 'y': shapely.get_y(points)},
+        geometry=points,
+        index=pd.Index(node_ids, name='osmid'),
+        crs=gdf.crs
+    )
+
+    G = ox.simplify_graph(ox.graph_from_gdfs(nodes, edges))
+    return ox.graph_to_gdfs(G, nodes=False, edges=True).reset_index()
+
+
+def fetch_layer_tiled(layer, bounds, cache=None, tile_size=OSM_TILE_SIZE_METERS, columns=None):
+    """
+    Fetch a layer for a query box from the tile cache, fetching only missing tiles
+
+    Args:
+        layer (str): 'buildings', 'streets' or 'green_blue'
+        bounds (tuple): Query box (minx, miny, maxx, maxy) in CRS_UTM
+        cache (DataCache): Tile cache (None disables caching)
+        tile_size (float): Tile edge length in meters
+        columns (list): Attribute columns to keep (optional)
+
+    Returns:
+        GeoDataFrame: Features intersecting the query box
+    """
+    tiles = tiles_for_bounds(bounds, tile_size)
+    frames, fetched = load_tiles(layer, tiles, cache, tile_size, columns=columns)
+
+    gdf = union_tiles(frames, layer, bounds)
+    logger.info(f"Retrieved {len(gdf)} {layer} features "
+                f"({len(tiles) - fetched}/{len(tiles)} tiles from cache).")
+    return gdf
+
+
+def load_tiles(layer, tiles, cache=None, tile_size=OSM_TILE_SIZE_METERS, columns=None):
+    """
+    Load one layer of a set of tiles from the tile cache, fetching missing tiles
+
+    Args:
+        layer (str): 'buildings', 'streets' or 'green_blue'
+        tiles (list): (tile_x, tile_y) tile indices
+        cache (DataCache): Tile cache (None disables caching)
+        tile_size (float): Tile edge length in meters
+        columns (list): Attribute columns to keep (optional). Fetched tiles
+            are cached in full but projected like cache hits, so cold, warm
+            and mixed runs return the same columns.
+
+    Returns:
+        tuple: (list of per-tile GeoDataFrames, number of tiles fetched)
+
+    Raises:
+        RuntimeError: If any tile could not be fetched. The other tiles are
+            still fetched and cached first, so a rerun only requests the
+            failed ones; a partial layer is never returned.
+    """
+    if columns is not None:
+        columns = list(columns) + OSM_FEATURE_KEYS[layer]
+
+    frames = []
+    fetched = 0
+    failed = []
+    for tile in tiles:
+        key = tile_cache_key(tile, layer, tile_size)
+
+        if cache is not None and cache.is_valid(key):
+            frames.append(cache.load(key, columns=columns))
+            continue
+
+        gdf = fetch_osm_tile(layer, tile, tile_size)
+        if gdf is None:
+            failed.append(tile)
+            continue
+        fetched += 1
+
+        if cache is not None:
+            cache.save(key, gdf)
+        frames.append(gdf if columns is None else project_columns(gdf, columns))
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(tiles)} {layer} tiles could not be "
+                           f"fetched: {failed}")
+
+    return frames, fetched
+
+
+class OSMnxProvider(DataProvider):
+    """
+    Live OSM provider: Overpass API via osmnx, cached per UTM tile
+    (see fetch_layer_tiled)
+    """
+
+    name = 'osmnx'
+
+    def __init__(self, cache=None, tile_size=OSM_TILE_SIZE_METERS):
+        """
+        Args:
+            cache (DataCache): Tile cache (None disables caching)
+            tile_size (float): Tile edge length in meters
+        """
+        self.cache = cache
+        self.tile_size = tile_size
+
+    def fetch_layer(self, layer, bounds, columns=None):
+        """Fetch one layer for a query box from the tile cache / Overpass"""
+        return fetch_layer_tiled(layer, bounds, self.cache, self.tile_size, columns=columns)
+
+    def missing_tiles(self, layer, bounds):
+        """Tiles of a query box that are not in the tile cache and must be fetched"""
+        tiles = tiles_for_bounds(bounds, self.tile_size)
+        if self.cache is None:
+            return tiles
+        return [tile for tile in tiles
+                if not self.cache.is_valid(tile_cache_key(tile, layer, self.tile_size))]
+
+
+def get_provider(provider=DATA_PROVIDER, use_cache=CACHE_ENABLED):
+    """
+    Resolve a data provider
+
+    Args:
+        provider: DataProvider instance or name ('osmnx' or 'replay')
+        use_cache (bool): Whether the osmnx provider uses the tile cache
+
+    Returns:
+        DataProvider: Provider instance
+    """
+    if isinstance(provider, DataProvider):
+        return provider
+    if provider == 'osmnx':
+        return OSMnxProvider(DataCache() if use_cache else None)
+    if provider == 'replay':
+        return OverpassReplayProvider()
+    raise ValueError(f"Unknown data provider '{provider}'. Use 'osmnx' or 'replay'.")
+
+
+def build_shared_store(bounds_list, store_dir, provider=DATA_PROVIDER, use_cache=CACHE_ENABLED,
+                       layers=('buildings', 'streets', 'green_blue')):
+    """
+    Load the OSM layers of many (overlapping) query boxes once into a shared store
+
+    Each layer is loaded for the union of the boxes and written as a
+    Hilbert-sorted GeoParquet file with bbox columns (see footprint_store),
+    which SharedStoreProvider slices per location. With the osmnx provider
+    only the union of the tiles covering the boxes is read, so I/O scales
+    with the unique area covered rather than the sum of the box areas.
+
+    Args:
+        bounds_list (list): Query boxes (minx, miny, maxx, maxy) in CRS_UTM
+        store_dir: Output directory
+        provider: DataProvider or name used to load the layers
+        use_cache (bool): Whether the osmnx provider uses the tile cache
+        layers (tuple): Layers to store
+
+    Returns:
+        dict: Store manifest (extent and per-layer feature counts)
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    provider = get_provider(provider, use_cache=use_cache)
+
+    bounds_array = np.asarray(bounds_list, dtype=float)
+    extent = (bounds_array[:, 0].min(), bounds_array[:, 1].min(),
+              bounds_array[:, 2].max(), bounds_array[:, 3].max())
+
+    if isinstance(provider, OSMnxProvider):
+        tiles = sorted({tile for bounds in bounds_list
+                        for tile in tiles_for_bounds(bounds, provider.tile_size)})
+        all_tiles = tiles_for_bounds(extent, provider.tile_size)
+        logger.info(f"Shared store: {len(tiles)} unique tiles for {len(bounds_list)} locations "
+                    f"({len(all_tiles)} in the union extent)")
+
+    manifest = {'extent': list(extent), 'crs': str(CRS_UTM), 'layers': {}}
+
+    for layer in layers:
+        columns = CACHE_BUILDING_COLUMNS if layer == 'buildings' else None
+
+        if isinstance(provider, OSMnxProvider):
+            configure_osmnx(timeout=FETCH_TIMEOUTS[layer])
+            frames, _ = load_tiles(layer, tiles, provider.cache, provider.tile_size, columns=columns)
+            gdf = union_tiles(frames, layer)
+        else:
+            gdf = provider.fetch_layer(layer, extent, columns=columns)
+
+        path = store_dir / f"{layer}.parquet"
+        if path.exists():
+            path.unlink()
+        if not gdf.empty:
+            write_footprint_part(DataCache._prepare_for_parquet(gdf), path, extent=extent)
+
+        manifest['layers'][layer] = len(gdf)
+        logger.info(f"Shared store: {len(gdf)} {layer} features")
+
+    with open(store_dir / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def configure_osmnx(overpass_url=None, timeout=None):
+    """
+    Point osmnx at an Overpass endpoint and set its request timeout
+
+    Args:
+        overpass_url (str): Overpass API base URL, e.g. a local stub server (optional)
+        timeout (float): Request timeout in seconds (optional)
+    """
+    import osmnx as ox
+
+    if timeout is not None:
+        ox.settings.requests_timeout = timeout
+    if overpass_url is not None:
+        if hasattr(ox.settings, 'overpass_url'):
+            ox.settings.overpass_url = overpass_url
+        else:
+            # osmnx < 2.0
+            ox.settings.overpass_endpoint = overpass_url
+
+
+def _run_task(name, func, kwargs):
+    """Run one concurrent fetch task inside a profiler span"""
+    with profiling.span(f"Fetch {name}"):
+        return func(**kwargs)
+
+
+def run_concurrent(tasks, timeouts=None, fallbacks=None, max_workers=None):
+    """
+    Run independent I/O-bound tasks on a thread pool with per-task deadlines
+
+    A task that raises or misses its deadline yields its fallback value;
+    the other tasks are unaffected.
+
+    Args:
+        tasks (dict): {name: (callable, kwargs)}
+        timeouts (dict): {name: seconds from submission} (optional)
+        fallbacks (dict): {name: zero-argument callable producing the fallback} (optional)
+        max_workers (int): Thread count (default: one per task)
+
+    Returns:
+        tuple: (results dict, errors dict of {name: message})
+    """
+    timeouts = timeouts or {}
+    fallbacks = fallbacks or {}
+    results = {}
+    errors = {}
+
+    if not tasks:
+        return results, errors
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(tasks),
+                                  thread_name_prefix='fetch')
+    start = time.monotonic()
+    futures = {name: executor.submit(_run_task, name, func, kwargs)
+               for name, (func, kwargs) in tasks.items()}
+
+    for name, future in futures.items():
+        timeout = timeouts.get(name)
+        remaining = None if timeout is None else max(0.0, start + timeout - time.monotonic())
+
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FuturesTimeoutError:
+            future.cancel()
+            errors[name] = f"timed out after {timeout}s"
+        except Exception as e:
+            errors[name] = f"{type(e).__name__}: {e}"
+
+        if name in errors:
+            logger.error(f"Fetching {name} failed ({errors[name]}); using fallback.")
+            fallback = fallbacks.get(name)
+            results[name] = fallback() if fallback is not None else None
+
+    # Do not block on timed-out requests; their threads finish in the background
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, errors
+
+
+def _fetch_buildings(lat, lon, dist, bounds, provider):
+    """Buildings layer from MS footprints (if configured) or the data provider"""
+    if USE_MS_BUILDINGS and ms_buildings_available():
+        logger.info("Loading Microsoft Building Footprints...")
+        return load_ms_buildings(lat, lon, dist)
+    return provider.fetch_layer('buildings', bounds, columns=CACHE_BUILDING_COLUMNS)
+
+
+def fetch_all_data(lat=CITY_LAT, lon=CITY_LON, dist=ANALYSIS_RADIUS_METERS,
+                   use_cache=CACHE_ENABLED, sources=FETCH_SOURCES, timeouts=None,
+                   max_workers=None, wind_url=OPEN_METEO_URL, aqi_url=WAQI_URL,
+                   overpass_url=None, provider=DATA_PROVIDER):
+    """
+    Concurrently fetch buildings, streets, green/blue spaces, wind and AQI
+
+    Cold-cache wall time is bounded by the slowest source rather than the
+    sum. Endpoints are injectable so the stage can run against a local
+    stub server.
+
+    Args:
+        lat (float): Latitude of center point
+        lon (float): Longitude of center point
+        dist (int): Radius in meters
+        use_cache (bool): Whether to use the OSM tile cache
+        sources (tuple): Subset of FETCH_SOURCES to fetch
+        timeouts (dict): Per-source deadlines in seconds (default: FETCH_TIMEOUTS).
+            With the osmnx provider, OSM layer deadlines are per tile to fetch.
+        max_workers (int): Thread count (default: one per source)
+        wind_url (str): Open-Meteo archive endpoint
+        aqi_url (str): WAQI geo feed URL template
+        overpass_url (str): Overpass API endpoint for osmnx (optional)
+        provider: DataProvider or name for the OSM layers ('osmnx' or 'replay')
+
+    Returns:
+        dict: {source: result} plus 'errors': {source: message} for failed sources
+    """
+    timeouts = {**FETCH_TIMEOUTS, **(timeouts or {})}
+    provider = get_provider(provider, use_cache=use_cache)
+
+    # Bounding box of the study circle, as osmnx's *_from_point queries use
+    bounds = get_study_area(lat, lon, dist).bounds
+
+    osm_sources = [name for name in ('buildings', 'streets', 'green_blue') if name in sources]
+    if osm_sources and isinstance(provider, OSMnxProvider):
+        configure_osmnx(overpass_url, timeout=max(timeouts[name] for name in osm_sources))
+        # Missing tiles are fetched one after another, each request bounded
+        # by the osmnx timeout, so a layer's deadline grows with their count
+        for name in osm_sources:
+            missing = len(provider.missing_tiles(name, bounds))
+            timeouts[name] = timeouts[name] * max(1, missing)
+
+    available = {
+        'buildings': (_fetch_buildings,
+                      dict(lat=lat, lon=lon, dist=dist, bounds=bounds, provider=provider)),
+        'streets': (provider.fetch_layer, dict(layer='streets', bounds=bounds)),
+        'green_blue': (provider.fetch_layer, dict(layer='green_blue', bounds=bounds)),
+        'wind': (fetch_prevailing_wind_direction,
+                 dict(lat=lat, lon=lon, url=wind_url, timeout=timeouts['wind'])),
+        'air_quality': (fetch_air_quality,
+                        dict(lat=lat, lon=lon, url=aqi_url, timeout=timeouts['air_quality'])),
+    }
+    fallbacks = {
+        'buildings': lambda: gpd.GeoDataFrame(geometry=[], crs=CRS_UTM),
+        'streets': lambda: gpd.GeoDataFrame(geometry=[], crs=CRS_UTM),
+        'green_blue': lambda: gpd.GeoDataFrame(geometry=[], crs=CRS_UTM),
+        'wind': lambda: DEFAULT_WIND_DIRECTION,
+        'air_quality': lambda: {'aqi': 'N/A', 'pm25': 'N/A'},
+    }
+
+    unknown = set(sources) - set(available)
+    if unknown:
+        raise ValueError(f"Unknown data sources: {sorted(unknown)}")
+
+    logger.info(f"Fetching {', '.join(sources)} concurrently "
+                f"for ({lat}, {lon}) radius {dist}m...")
+
+    tasks = {name: available[name] for name in sources}
+    results, errors = run_concurrent(tasks, timeouts, fallbacks, max_workers)
+
+    for name in osm_sources:
+        if results[name].empty:
+            logger.warning(f"No {name} found in the specified area.")
+
+    results['errors'] = errors
+    return results
+
+
+def fetch_live_infrastructure(lat=CITY_LAT, lon=CITY_LON, dist=ANALYSIS_RADIUS_METERS, use_cache=CACHE_ENABLED,
+                              provider=DATA_PROVIDER):
     """
     Fetches real-time building footprints, street networks, and green/blue spaces from OpenStreetMap.
     
+    Data is fetched and cached per fixed UTM tile (OSM_TILE_SIZE_METERS), so
+    overlapping or shifted study areas reuse cached tiles and only the
+    missing ones hit the network. The three layers are fetched concurrently.
+    
     Args:
         lat (float): Latitude of center point
         lon (float): Longitude of center point
         dist (int): Radius in meters
         use_cache (bool): Whether to use cached data
+        provider: DataProvider or name ('osmnx' for live data, 'replay' for
+            saved Overpass responses)
     
     Returns:
         tuple: (buildings_gdf, streets_gdf, green_blue_gdf)
     """
-    logger.info(f"Fetching OSM data for coordinates ({lat}, {lon}) radius {dist}m...")
-    
-    cache = DataCache() if use_cache else None
-    cache_key = f"osm_{lat}_{lon}_{dist}"
-    
-    # Initialize empty GeoDataFrames
-    buildings = gpd.GeoDataFrame()
-    edges = gpd.GeoDataFrame()
-    green_blue = gpd.GeoDataFrame()
-    
-    # 1. Fetch Buildings
-    logger.info("Fetching building footprints...")
-    
-    if USE_MS_BUILDINGS and os.path.exists(MS_BUILDINGS_PATH):
-        logger.info("Loading Microsoft Building Footprints...")
-        buildings = load_ms_buildings(lat, lon, dist)
-    else:
-        buildings_cache_key = f"{cache_key}_buildings"
-        
-        if use_cache and cache.is_valid(buildings_cache_key):
-            logger.info("Loading buildings from cache...")
-            buildings = cache.load(buildings_cache_key)
-        else:
-            tags = {'building': True}
-            try:
-                buildings = ox.features_from_point(
-                    (lat, lon), 
-                    tags=tags, 
-                    dist=dist
-                )
-                
-                if not buildings.empty:
-                    # Convert to UTM for metric calculations
-                    buildings = buildings.to_crs(CRS_UTM)
-                    
-                    if use_cache:
-                        cache.save(buildings_cache_key, buildings)
-                    
-                    logger.info(f"Retrieved {len(buildings)} building footprints.")
-                else:
-                    logger.warning("No buildings found in the specified area.")
-                    
-            except Exception as e:
-                logger.error(f"Error fetching buildings: {e}")
-                buildings = gpd.GeoDataFrame(crs=CRS_UTM)
-    
-    # 2. Fetch Street Network
-    logger.info("Fetching street network...")
-    streets_cache_key = f"{cache_key}_streets"
-    
-    if use_cache and cache.is_valid(streets_cache_key):
-        logger.info("Loading streets from cache...")
-        edges = cache.load(streets_cache_key)
-    else:
-        try:
-            G = ox.graph_from_point(
-                (lat, lon), 
-                dist=dist, 
-                network_type='drive',
-                simplify=True
-            )
-            edges = ox.graph_to_gdfs(G, nodes=False, edges=True)
-            
-            if not edges.empty:
-                edges = edges.to_crs(CRS_UTM)
-                
-                if use_cache:
-                    cache.save(streets_cache_key, edges)
-                
-                logger.info(f"Retrieved {len(edges)} street segments.")
-            else:
-                logger.warning("No streets found in the specified area.")
-                
-        except Exception as e:
-            logger.error(f"Error fetching streets: {e}")
-            edges = gpd.GeoDataFrame(crs=CRS_UTM)
-    
-    # 3. Fetch Green/Blue Spaces
-    logger.info("Fetching green and blue spaces...")
-    green_cache_key = f"{cache_key}_green_blue"
-    
-    if use_cache and cache.is_valid(green_cache_key):
-        logger.info("Loading green/blue spaces from cache...")
-        green_blue = cache.load(green_cache_key)
-    else:
-        try:
-            env_tags = {
-                'leisure': ['park', 'garden', 'playground'],
-                'landuse': ['grass', 'forest', 'meadow', 'recreation_ground'],
-                'natural': ['water', 'wetland', 'wood', 'scrub']
-            }
-            green_blue = ox.features_from_point(
-                (lat, lon), 
-                tags=env_tags, 
-                dist=dist
-            )
-            
-            if not green_blue.empty:
-                green_blue = green_blue.to_crs(CRS_UTM)
-                
-                if use_cache:
-                    cache.save(green_cache_key, green_blue)
-                
-                logger.info(f"Retrieved {len(green_blue)} green/blue features.")
-            else:
-                logger.warning("No green/blue spaces found in the specified area.")
-                
-        except Exception as e:
-            logger.warning(f"Green/Blue fetch warning: {e}")
-            green_blue = gpd.GeoDataFrame(crs=CRS_UTM)
-    
-    return buildings, edges, green_blue
+    data = fetch_all_data(lat, lon, dist, use_cache=use_cache,
+                          sources=('buildings', 'streets', 'green_blue'),
+                          provider=provider)
+    return data['buildings'], data['streets'], data['green_blue']
+
+
+def ms_buildings_available():
+    """Check whether a footprint store or the raw MS Buildings file exists"""
+    return os.path.exists(MS_BUILDINGS_STORE_PATH) or os.path.exists(MS_BUILDINGS_PATH)
 
 
 def load_ms_buildings(lat, lon, dist):
     """
     Load Microsoft Building Footprints for the specified area
     
+    Reads from the prepared footprint store when available, so only row
+    groups overlapping the query are decoded; otherwise the raw file is
+    read with a bbox filter. Only the matching rows are reprojected.
+    
     Args:
         lat, lon: Center coordinates
         dist: Radius in meters
@@ -231,28 +819,26 @@ def load_ms_buildings(lat, lon, dist):
     logger.info("Loading Microsoft Building Footprints from file...")
     
     try:
-        # Load full dataset
-        buildings = gpd.read_file(MS_BUILDINGS_PATH)
-        
-        # Create buffer around center point
-        from shapely.geometry import Point
-        center = gpd.GeoDataFrame(
-            geometry=[Point(lon, lat)],
-            crs=CRS_WGS84
-        ).to_crs(CRS_UTM)
-        
-        buffer = center.buffer(dist)
-        buffer_gdf = gpd.GeoDataFrame(geometry=buffer, crs=CRS_UTM)
-        
-        # Spatial filter
-        buildings_utm = buildings.to_crs(CRS_UTM)
-        filtered = gpd.sjoin(
-            buildings_utm, 
-            buffer_gdf, 
-            how='inner', 
-            predicate='intersects'
+        study_area = get_study_area(lat, lon, dist)
+        query_bounds = tuple(
+            gpd.GeoSeries([study_area], crs=CRS_UTM).to_crs(CRS_WGS84).total_bounds
         )
         
+        if os.path.exists(MS_BUILDINGS_STORE_PATH):
+            buildings = read_footprints(MS_BUILDINGS_STORE_PATH, query_bounds)
+        else:
+            logger.info("No footprint store found; reading raw file with a bbox filter. "
+                        "Build the store with tools/download_ms_data.py --build-store.")
+            buildings = gpd.read_file(MS_BUILDINGS_PATH, bbox=query_bounds)
+        
+        if buildings.crs is None:
+            buildings = buildings.set_crs(CRS_WGS84)
+        
+        # Reproject only the bbox matches, then keep those within the study circle
+        buildings = buildings.to_crs(CRS_UTM)
+        positions = buildings.sindex.query(study_area, predicate='intersects')
+        filtered = buildings.iloc[np.sort(positions)].reset_index(drop=True)
+        
         logger.info(f"Loaded {len(filtered)} buildings from MS dataset.")
         return filtered
         
@@ -263,7 +849,8 @@ def load_ms_buildings(lat, lon, dist):
 
 def fetch_prevailing_wind_direction(lat=CITY_LAT, lon=CITY_LON, 
                                      start_date="2023-01-01", 
-                                     end_date="2023-12-31"):
+                                     end_date="2023-12-31",
+                                     url=OPEN_METEO_URL, timeout=30):
     """
     Fetches historical wind data from Open-Meteo to determine
     the dominant wind direction for ventilation planning.
@@ -273,6 +860,8 @@ def fetch_prevailing_wind_direction(lat=CITY_LAT, lon=CITY_LON,
         lon (float): Longitude
         start_date (str): Start date for historical data (YYYY-MM-DD)
         end_date (str): End date for historical data (YYYY-MM-DD)
+        url (str): Open-Meteo archive endpoint
+        timeout (float): Request timeout in seconds
     
     Returns:
         float: Dominant wind direction in degrees (0-360)
@@ -288,7 +877,7 @@ def fetch_prevailing_wind_direction(lat=CITY_LAT, lon=CITY_LON,
     }
     
     try:
-        response = requests.get(OPEN_METEO_URL, params=params, timeout=30)
+        response = requests.get(url, params=params, timeout=timeout)
         response.raise_for_status()
         data = response.json()
         
@@ -379,13 +968,15 @@ def fetch_wind_statistics(lat=CITY_LAT, lon=CITY_LON,
         }
 
 
-def fetch_air_quality(lat=CITY_LAT, lon=CITY_LON):
+def fetch_air_quality(lat=CITY_LAT, lon=CITY_LON, url=WAQI_URL, timeout=10):
     """
     Fetches current air quality index from World Air Quality Index API
     
     Args:
         lat (float): Latitude
         lon (float): Longitude
+        url (str): WAQI geo feed URL template ({lat}, {lon} placeholders)
+        timeout (float): Request timeout in seconds
     
     Returns:
         dict: Air quality data including AQI, PM2.5, and pollutants
@@ -393,8 +984,7 @@ def fetch_air_quality(lat=CITY_LAT, lon=CITY_LON):
     logger.info("Fetching air quality data from WAQI...")
     
     try:
-        url = WAQI_URL.format(lat, lon)
-        response = requests.get(url, timeout=10)
+        response = requests.get(url.format(lat, lon), timeout=timeout)
         response.raise_for_status()
         data = response.json()
         
@@ -417,24 +1007,29 @@ def fetch_air_quality(lat=CITY_LAT, lon=CITY_LON):
         return {'aqi': 'N/A', 'pm25': 'N/A'}
 
 
-def get_study_area_bounds(lat=CITY_LAT, lon=CITY_LON, dist=ANALYSIS_RADIUS_METERS):
+def get_study_area(lat=CITY_LAT, lon=CITY_LON, dist=ANALYSIS_RADIUS_METERS):
     """
-    Get bounding box of study area
+    Get the circular study area queried around the center point
     
     Returns:
-        tuple: (minx, miny, maxx, maxy) in UTM coordinates
+        Polygon: Circle of radius dist in UTM coordinates
     """
-    from shapely.geometry import Point
-    
     center = gpd.GeoDataFrame(
         geometry=[Point(lon, lat)],
         crs=CRS_WGS84
     ).to_crs(CRS_UTM)
     
-    buffer = center.buffer(dist)
-    bounds = buffer.total_bounds  # (minx, miny, maxx, maxy)
+    return center.buffer(dist).iloc[0]
+
+
+def get_study_area_bounds(lat=CITY_LAT, lon=CITY_LON, dist=ANALYSIS_RADIUS_METERS):
+    """
+    Get bounding box of study area
     
-    return bounds
+    Returns:
+        tuple: (minx, miny, maxx, maxy) in UTM coordinates
+    """
+    return get_study_area(lat, lon, dist).bounds
 
 
 def export_to_geojson(gdf, filename, output_dir):
@@ -0,0 +1,140 @@
+"""
+Footprint Store Module
+Spatially indexed GeoParquet store for large building footprint datasets
+(Microsoft Building Footprints):
+- Rows are sorted along a Hilbert curve and written in small row groups
+- Each row carries its bounding box (bbox_xmin/ymin/xmax/ymax columns)
+- Reads push a bbox filter down to the row-group statistics, so a query
+  only decodes the row groups that overlap it
+
+A store is a single .parquet file or a directory of part files (written
+in parallel); both are read as one dataset.
+"""
+
+import json
+from pathlib import Path
+import numpy as np
+import geopandas as gpd
+import shapely
+import logging
+
+from .config import CRS_WGS84, FOOTPRINT_ROW_GROUP_SIZE, FOOTPRINT_STORE_EXTENT
+
+logger = logging.getLogger(__name__)
+
+BBOX_COLUMNS = ['bbox_xmin', 'bbox_ymin', 'bbox_xmax', 'bbox_ymax']
+
+
+def prepare_footprints(gdf, extent=FOOTPRINT_STORE_EXTENT):
+    """
+    Add bbox columns and sort footprints along a Hilbert curve
+
+    Args:
+        gdf (GeoDataFrame): Footprints in the store CRS
+        extent (tuple): Curve extent (minx, miny, maxx, maxy); a fixed extent
+            keeps the order consistent across part files
+
+    Returns:
+        GeoDataFrame: Sorted footprints with bbox columns
+    """
+    bounds = shapely.bounds(np.asarray(gdf.geometry.values, dtype=object))
+    gdf = gdf.copy()
+    for i, col in enumerate(BBOX_COLUMNS):
+        gdf[col] = bounds[:, i]
+
+    order = np.argsort(gdf.geometry.hilbert_distance(total_bounds=extent).to_numpy(),
+                       kind='stable')
+    return gdf.iloc[order].reset_index(drop=True)
+
+
+def write_footprint_part(gdf, path, extent=FOOTPRINT_STORE_EXTENT,
+                         row_group_size=FOOTPRINT_ROW_GROUP_SIZE):
+    """
+    Write footprints as one sorted, bbox-annotated GeoParquet file
+
+    Args:
+        gdf (GeoDataFrame): Footprints
+        path: Output .parquet path
+        extent (tuple): Hilbert curve extent
+        row_group_size (int): Rows per row group
+
+    Returns:
+        Path: Written file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    prepare_footprints(gdf, extent).to_parquet(
+        path, index=False, compression='zstd', row_group_size=row_group_size
+    )
+    return path
+
+
+def build_footprint_store(source, store_path, extent=FOOTPRINT_STORE_EXTENT,
+                          row_group_size=FOOTPRINT_ROW_GROUP_SIZE):
+    """
+    Convert a footprint file (GeoJSON, GeoPackage, ...) into a store
+
+    Args:
+        source: Input footprint file
+        store_path: Output .parquet path
+        extent (tuple): Hilbert curve extent
+        row_group_size (int): Rows per row group
+
+    Returns:
+        int: Number of footprints written
+    """
+    gdf = gpd.read_file(source)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(CRS_WGS84)
+
+    write_footprint_part(gdf, store_path, extent, row_group_size)
+    logger.info(f"Footprint store written: {store_path} ({len(gdf)} footprints)")
+    return len(gdf)
+
+
+def read_footprints(store_path, bounds, columns=None):
+    """
+    Read the footprints whose bounding box overlaps a query box
+
+    Args:
+        store_path: Store file or directory
+        bounds (tuple): (minx, miny, maxx, maxy) in the store CRS
+        columns (list): Attribute columns to read (optional; geometry always read)
+
+    Returns:
+        GeoDataFrame: Matching footprints in the store CRS
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(str(store_path), format='parquet')
+
+    geo = json.loads(dataset.schema.metadata[b'geo'])
+    geometry_column = geo['primary_column']
+    crs = geo['columns'][geometry_column].get('crs', CRS_WGS84)
+    if isinstance(crs, dict):
+        crs = json.dumps(crs)
+
+    minx, miny, maxx, maxy = bounds
+    bbox_filter = ((ds.field('bbox_xmax') >= minx) & (ds.field('bbox_xmin') <= maxx) &
+                   (ds.field('bbox_ymax') >= miny) & (ds.field('bbox_ymin') <= maxy))
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name not in BBOX_COLUMNS]
+    else:
+        columns = [c for c in columns if c in dataset.schema.names and c != geometry_column]
+        columns.append(geometry_column)
+
+    table = dataset.to_table(columns=columns, filter=bbox_filter)
+
+    geometry = shapely.from_wkb(table.column(geometry_column).to_numpy(zero_copy_only=False))
+    attributes = table.drop([geometry_column]).to_pandas()
+
+    logger.debug(f"Read {table.num_rows} footprints from {store_path} for bbox {bounds}")
+
+    return gpd.GeoDataFrame(attributes, geometry=geometry, crs=crs)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Footprint store module loaded successfully.")
@@ -10,7 +10,8 @@ Calculates urban morphology metrics including:
 import geopandas as gpd
 import numpy as np
 import pandas as pd
-from shapely.geometry import box
+import shapely
+from shapely.errors import GEOSException
 import logging
 
 from .config import (
@@ -20,6 +21,8 @@ from .config import (
     ROUGHNESS_VERY_HIGH, ROUGHNESS_HIGH, ROUGHNESS_MEDIUM, ROUGHNESS_LOW
 )
 
+from . import profiling
+
 logger = logging.getLogger(__name__)
 
 
@@ -50,16 +53,26 @@ def filter_polygon_geometries(gdf):
     return filtered
 
 
-def create_analysis_grid(buildings, grid_size=GRID_SIZE_METERS):
+def create_analysis_grid(buildings, grid_size=GRID_SIZE_METERS, study_area=None,
+                         drop_empty=False, spatial_index=None):
     """
     Creates a regular grid over the study area for localized analysis.
     
+    Cells are built with vectorized shapely box construction. grid_id is the
+    lattice position (col * n_rows + row) over the buildings' bounding box, so
+    IDs are stable whether or not cells are dropped.
+    
     Args:
         buildings (GeoDataFrame): Building footprints
         grid_size (float): Size of grid cells in meters
+        study_area (Polygon): Query area in grid CRS (optional). Cells not
+            intersecting it (e.g. corners outside the query circle) are dropped.
+        drop_empty (bool): Drop cells that contain no buildings
+        spatial_index (SpatialIndex): Shared run index (optional), used for
+            the empty-cell check
     
     Returns:
-        GeoDataFrame: Grid cells with unique IDs
+        GeoDataFrame: Grid cells with unique IDs and integer grid_row/grid_col
     """
     logger.info(f"Creating analysis grid with {grid_size}m cells...")
     
@@ -69,24 +82,86 @@ def create_analysis_grid(buildings, grid_size=GRID_SIZE_METERS):
     
     minx, miny, maxx, maxy = buildings.total_bounds
     
-    # Create grid
-    cols = list(np.arange(minx, maxx, grid_size))
-    rows = list(np.arange(miny, maxy, grid_size))
+    # Lattice coordinates (column-major, matching grid_id = col * n_rows + row)
+    xs = np.arange(minx, maxx, grid_size)
+    ys = np.arange(miny, maxy, grid_size)
+    cols, rows = np.meshgrid(np.arange(len(xs)), np.arange(len(ys)), indexing='ij')
+    cols, rows = cols.ravel(), rows.ravel()
+    
+    x = xs[cols]
+    y = ys[rows]
+    polygons = shapely.box(x, y, x + grid_size, y + grid_size)
     
-    polygons = []
-    for x in cols:
-        for y in rows:
-            polygons.append(box(x, y, x + grid_size, y + grid_size))
+    keep = np.ones(len(polygons), dtype=bool)
     
-    grid = gpd.GeoDataFrame({'geometry': polygons}, crs=buildings.crs)
-    grid['grid_id'] = range(len(grid))
+    if study_area is not None:
+        shapely.prepare(study_area)
+        keep &= shapely.intersects(study_area, polygons)
+    
+    if drop_empty:
+        if spatial_index is not None:
+            cell_pos, _ = spatial_index.query('buildings', polygons)
+        else:
+            building_geoms = np.asarray(filter_polygon_geometries(buildings).geometry.values,
+                                        dtype=object)
+            cell_pos, _ = shapely.STRtree(building_geoms).query(polygons, predicate='intersects')
+        occupied = np.zeros(len(polygons), dtype=bool)
+        occupied[cell_pos] = True
+        keep &= occupied
+    
+    grid = gpd.GeoDataFrame({
+        'grid_id': (cols * len(ys) + rows)[keep],
+        'grid_row': rows[keep],
+        'grid_col': cols[keep],
+        'geometry': polygons[keep],
+    }, crs=buildings.crs)
     grid['cell_area'] = grid_size * grid_size  # m²
     
+    dropped = len(polygons) - len(grid)
+    if dropped:
+        logger.info(f"Dropped {dropped} of {len(polygons)} cells outside the study area"
+                    f"{' or without buildings' if drop_empty else ''}.")
+    
     logger.info(f"Created grid with {len(grid)} cells.")
     
     return grid
 
 
+def get_cell_neighbours(grid, offsets=((-1, -1), (-1, 0), (-1, 1), (0, -1),
+                                       (0, 1), (1, -1), (1, 0), (1, 1))):
+    """
+    Neighbour lookup by lattice arithmetic on grid_row/grid_col.
+    
+    Args:
+        grid (GeoDataFrame): Grid from create_analysis_grid
+        offsets (sequence): (d_row, d_col) neighbour offsets (default: 8-neighbourhood)
+    
+    Returns:
+        ndarray: (n_cells, n_offsets) positional indices into grid, -1 where
+        the neighbour is outside the grid or was dropped
+    """
+    rows = grid['grid_row'].to_numpy()
+    cols = grid['grid_col'].to_numpy()
+    n_cells = len(grid)
+    
+    if n_cells == 0:
+        return np.zeros((0, len(offsets)), dtype=np.int64)
+    
+    n_rows = int(rows.max()) + 1
+    n_cols = int(cols.max()) + 1
+    lookup = np.full(n_rows * n_cols, -1, dtype=np.int64)
+    lookup[rows * n_cols + cols] = np.arange(n_cells)
+    
+    neighbours = np.full((n_cells, len(offsets)), -1, dtype=np.int64)
+    for k, (d_row, d_col) in enumerate(offsets):
+        r = rows + d_row
+        c = cols + d_col
+        inside = (r >= 0) & (r < n_rows) & (c >= 0) & (c < n_cols)
+        neighbours[inside, k] = lookup[r[inside] * n_cols + c[inside]]
+    
+    return neighbours
+
+
 def estimate_building_heights(buildings):
     """
     Estimate building heights from OSM tags or use defaults.
@@ -135,63 +210,138 @@ def estimate_building_heights(buildings):
     return heights
 
 
-def calculate_plan_area_density(grid, buildings):
+def compute_morphology_metrics(grid, buildings, spatial_index=None):
     """
-    Calculate Plan Area Density (λp) for each grid cell.
-    λp = (Built-up Area) / (Total Cell Area)
+    Single-pass morphology engine.
+    
+    Performs one bulk building x cell intersection and derives every
+    per-cell metric from it with vectorized reductions:
+    - built_area: building footprint area clipped to the cell (m²)
+    - building_count: number of buildings intersecting the cell
+    - avg_height: mean height of intersecting buildings (m)
+    - density: Plan Area Density λp = built_area / cell_area (capped at 1.0)
+    - roughness: z0 ≈ 0.5 * avg_height * density
+    - svf: SVF ≈ 1 - density * min(avg_height / 20, 1)
     
     Args:
         grid (GeoDataFrame): Analysis grid
         buildings (GeoDataFrame): Building footprints
+        spatial_index (SpatialIndex): Shared run index (optional). When given,
+            its prefiltered buildings, heights and STRtree are reused.
     
     Returns:
-        Series: Density values for each grid cell
+        DataFrame: Metrics indexed by grid_id
     """
-    logger.info("Calculating plan area density...")
+    grid_ids = pd.Index(grid['grid_id'], name='grid_id')
+    n_cells = len(grid)
     
-    # Filter to only polygon geometries (OSM can have mixed types)
-    buildings_clean = filter_polygon_geometries(buildings)
-    
-    if buildings_clean.empty:
-        logger.warning("No polygon geometries found in buildings. Returning zero density.")
-        return pd.Series({grid_id: 0.0 for grid_id in grid['grid_id']})
+    cell_geoms = np.asarray(grid.geometry.values, dtype=object)
+    cell_area = shapely.area(cell_geoms) if n_cells else np.zeros(0)
     
-    # Spatial join to find buildings in each cell
-    joined = gpd.sjoin(buildings_clean, grid, how='inner', predicate='intersects')
+    built_area = np.zeros(n_cells)
+    building_count = np.zeros(n_cells, dtype=np.int64)
+    height_sum = np.zeros(n_cells)
     
-    densities = {}
+    if spatial_index is not None:
+        buildings_clean = spatial_index.layer('buildings')
+    else:
+        # Filter to only polygon geometries (OSM can have mixed types)
+        buildings_clean = filter_polygon_geometries(buildings)
     
-    for grid_id in grid['grid_id']:
-        cell_buildings = joined[joined['grid_id'] == grid_id]
-        cell_geom = grid[grid['grid_id'] == grid_id].geometry.iloc[0]
-        cell_area = cell_geom.area
-        
-        if len(cell_buildings) == 0:
-            densities[grid_id] = 0.0
+    if buildings_clean.empty or n_cells == 0:
+        logger.warning("No polygon geometries found in buildings. Using empty-cell defaults.")
+    else:
+        if spatial_index is not None:
+            heights = buildings_clean['height_m'].to_numpy(dtype=float)
+            building_geoms = spatial_index.geometries('buildings')
+            # Bulk candidate pairs from the shared buildings tree
+            cell_pos, bldg_pos = spatial_index.query('buildings', cell_geoms)
         else:
-            # Calculate intersection area (more accurate than raw building area)
+            heights = estimate_building_heights(buildings_clean).to_numpy(dtype=float)
+            building_geoms = np.asarray(buildings_clean.geometry.values, dtype=object)
+            # Bulk candidate pairs: (building position, cell position)
+            bldg_pos, cell_pos = grid.sindex.query(building_geoms, predicate='intersects')
+        
+        if len(bldg_pos) > 0:
             try:
-                intersection = gpd.overlay(
-                    cell_buildings,
-                    gpd.GeoDataFrame(geometry=[cell_geom], crs=grid.crs),
-                    how='intersection'
-                )
-                
-                built_area = intersection.geometry.area.sum()
-                densities[grid_id] = min(built_area / cell_area, 1.0)  # Cap at 1.0
-            except Exception as e:
-                logger.warning(f"Error calculating density for grid {grid_id}: {e}. Using fallback method.")
-                # Fallback: use simple area sum
-                built_area = cell_buildings.geometry.area.sum()
-                densities[grid_id] = min(built_area / cell_area, 1.0)
-    
-    density_series = pd.Series(densities)
+                clipped = shapely.intersection(building_geoms[bldg_pos], cell_geoms[cell_pos])
+            except GEOSException as e:
+                logger.warning(f"Bulk intersection failed ({e}). Repairing invalid footprints.")
+                building_geoms = shapely.make_valid(building_geoms)
+                clipped = shapely.intersection(building_geoms[bldg_pos], cell_geoms[cell_pos])
+            
+            built_area = np.bincount(cell_pos, weights=shapely.area(clipped), minlength=n_cells)
+            building_count = np.bincount(cell_pos, minlength=n_cells)
+            height_sum = np.bincount(cell_pos, weights=heights[bldg_pos], minlength=n_cells)
+    
+    return metrics_from_aggregates(grid_ids, cell_area, built_area, building_count, height_sum)
+
+
+def metrics_from_aggregates(grid_ids, cell_area, built_area, building_count, height_sum):
+    """
+    Derive per-cell morphology metrics from reduced building aggregates.
+    
+    Shared by the vector and raster morphology engines so both apply
+    identical density, roughness and SVF formulas.
+    
+    Args:
+        grid_ids (Index): Grid cell IDs
+        cell_area (ndarray): Cell areas (m²)
+        built_area (ndarray): Built footprint area inside each cell (m²)
+        building_count (ndarray): Number of buildings in each cell
+        height_sum (ndarray): Sum of heights of buildings in each cell (m)
+    
+    Returns:
+        DataFrame: Metrics indexed by grid_id
+    """
+    n_cells = len(grid_ids)
+    occupied = building_count > 0
+    
+    avg_height = np.divide(height_sum, building_count,
+                           out=np.zeros(n_cells), where=occupied)
+    density = np.minimum(np.divide(built_area, cell_area,
+                                   out=np.zeros(n_cells), where=cell_area > 0), 1.0)
+    roughness = 0.5 * avg_height * density
+    
+    # Height factor (normalized by typical building height, 20m reference)
+    height_factor = np.minimum(avg_height / 20.0, 1.0)
+    svf = np.where(occupied, np.maximum(1.0 - density * height_factor, 0.0), 1.0)
+    
+    return pd.DataFrame({
+        'built_area': built_area,
+        'building_count': building_count,
+        'avg_height': avg_height,
+        'density': density,
+        'roughness': roughness,
+        'svf': svf,
+    }, index=pd.Index(grid_ids, name='grid_id'))
+
+
+def calculate_plan_area_density(grid, buildings, metrics=None):
+    """
+    Calculate Plan Area Density (λp) for each grid cell.
+    λp = (Built-up Area) / (Total Cell Area)
+    
+    Args:
+        grid (GeoDataFrame): Analysis grid
+        buildings (GeoDataFrame): Building footprints
+        metrics (DataFrame): Precomputed result of compute_morphology_metrics (optional)
+    
+    Returns:
+        Series: Density values for each grid cell
+    """
+    logger.info("Calculating plan area density...")
+    
+    if metrics is None:
+        metrics = compute_morphology_metrics(grid, buildings)
+    
+    density_series = metrics['density'].rename(None)
     logger.info(f"Density calculation complete. Mean: {density_series.mean():.3f}")
     
     return density_series
 
 
-def calculate_roughness_length(grid, buildings):
+def calculate_roughness_length(grid, buildings, metrics=None):
     """
     Calculate Roughness Length (z0) for each grid cell.
     
@@ -206,72 +356,25 @@ def calculate_roughness_length(grid, buildings):
     Args:
         grid (GeoDataFrame): Analysis grid
         buildings (GeoDataFrame): Building footprints with heights
+        metrics (DataFrame): Precomputed result of compute_morphology_metrics (optional)
     
     Returns:
         tuple: (roughness_series, height_series)
     """
     logger.info("Calculating roughness length...")
     
-    # Filter to only polygon geometries
-    buildings_clean = filter_polygon_geometries(buildings)
-    
-    if buildings_clean.empty:
-        logger.warning("No polygon geometries found. Returning zero roughness.")
-        zero_series = pd.Series({grid_id: 0.0 for grid_id in grid['grid_id']})
-        return zero_series, zero_series
-    
-    # Ensure buildings have height estimates
-    buildings_clean['height_m'] = estimate_building_heights(buildings_clean)
-    
-    # Spatial join
-    joined = gpd.sjoin(buildings_clean, grid, how='inner', predicate='intersects')
-    
-    roughness_values = {}
-    height_values = {}
-    
-    for grid_id in grid['grid_id']:
-        cell_buildings = joined[joined['grid_id'] == grid_id]
-        cell_geom = grid[grid['grid_id'] == grid_id].geometry.iloc[0]
-        cell_area = cell_geom.area
-        
-        if len(cell_buildings) == 0:
-            roughness_values[grid_id] = 0.0
-            height_values[grid_id] = 0.0
-        else:
-            # Calculate density for this cell
-            try:
-                intersection = gpd.overlay(
-                    cell_buildings,
-                    gpd.GeoDataFrame(geometry=[cell_geom], crs=grid.crs),
-                    how='intersection'
-                )
-                
-                built_area = intersection.geometry.area.sum()
-                density = min(built_area / cell_area, 1.0)
-            except Exception as e:
-                logger.debug(f"Overlay failed for grid {grid_id}, using fallback: {e}")
-                # Fallback: use simple area sum
-                built_area = cell_buildings.geometry.area.sum()
-                density = min(built_area / cell_area, 1.0)
-            
-            # Calculate mean height
-            mean_height = cell_buildings['height_m'].mean()
-            
-            # Roughness formula (simplified)
-            roughness = 0.5 * mean_height * density
-            
-            roughness_values[grid_id] = roughness
-            height_values[grid_id] = mean_height
+    if metrics is None:
+        metrics = compute_morphology_metrics(grid, buildings)
     
-    roughness_series = pd.Series(roughness_values)
-    height_series = pd.Series(height_values)
+    roughness_series = metrics['roughness'].rename(None)
+    height_series = metrics['avg_height'].rename(None)
     
     logger.info(f"Roughness calculation complete. Mean: {roughness_series.mean():.3f}m")
     
     return roughness_series, height_series
 
 
-def calculate_sky_view_factor_simple(grid, buildings):
+def calculate_sky_view_factor_simple(grid, buildings, metrics=None):
     """
     Simplified Sky View Factor (SVF) calculation.
     
@@ -285,59 +388,17 @@ def calculate_sky_view_factor_simple(grid, buildings):
     Args:
         grid (GeoDataFrame): Analysis grid
         buildings (GeoDataFrame): Building footprints with heights
+        metrics (DataFrame): Precomputed result of compute_morphology_metrics (optional)
     
     Returns:
         Series: SVF values for each grid cell
     """
     logger.info("Calculating simplified Sky View Factor...")
     
-    # Filter to only polygon geometries
-    buildings_clean = filter_polygon_geometries(buildings)
-    
-    if buildings_clean.empty:
-        logger.warning("No polygon geometries found. Returning SVF = 1.0 (open sky).")
-        return pd.Series({grid_id: 1.0 for grid_id in grid['grid_id']})
-    
-    buildings_clean['height_m'] = estimate_building_heights(buildings_clean)
-    
-    joined = gpd.sjoin(buildings_clean, grid, how='inner', predicate='intersects')
-    
-    svf_values = {}
-    
-    for grid_id in grid['grid_id']:
-        cell_buildings = joined[joined['grid_id'] == grid_id]
-        cell_geom = grid[grid['grid_id'] == grid_id].geometry.iloc[0]
-        cell_area = cell_geom.area
-        
-        if len(cell_buildings) == 0:
-            svf_values[grid_id] = 1.0  # Completely open
-        else:
-            # Calculate coverage and height
-            try:
-                intersection = gpd.overlay(
-                    cell_buildings,
-                    gpd.GeoDataFrame(geometry=[cell_geom], crs=grid.crs),
-                    how='intersection'
-                )
-                
-                built_area = intersection.geometry.area.sum()
-                coverage = min(built_area / cell_area, 1.0)
-            except Exception as e:
-                logger.debug(f"Overlay failed for SVF calculation, using fallback: {e}")
-                # Fallback: use simple area sum
-                built_area = cell_buildings.geometry.area.sum()
-                coverage = min(built_area / cell_area, 1.0)
-            
-            mean_height = cell_buildings['height_m'].mean()
-            
-            # Height factor (normalized by typical building height)
-            height_factor = min(mean_height / 20.0, 1.0)  # 20m = typical reference
-            
-            # SVF approximation
-            svf = 1.0 - (coverage * height_factor)
-            svf_values[grid_id] = max(svf, 0.0)  # Ensure non-negative
+    if metrics is None:
+        metrics = compute_morphology_metrics(grid, buildings)
     
-    svf_series = pd.Series(svf_values)
+    svf_series = metrics['svf'].rename(None)
     logger.info(f"SVF calculation complete. Mean: {svf_series.mean():.3f}")
     
     return svf_series
@@ -387,13 +448,16 @@ def classify_roughness(roughness):
         return 'Very Low'
 
 
-def calculate_roughness_and_density(grid, buildings):
+def calculate_roughness_and_density(grid, buildings, spatial_index=None, engine='vector'):
     """
     Main function to calculate all morphology metrics for each grid cell.
     
     Args:
         grid (GeoDataFrame): Analysis grid
         buildings (GeoDataFrame): Building footprints
+        spatial_index (SpatialIndex): Shared run index (optional)
+        engine (str): 'vector' (exact polygon intersection) or 'raster'
+            (block reductions on a rasterized footprint sub-grid)
     
     Returns:
         GeoDataFrame: Grid with morphology metrics added
@@ -410,20 +474,34 @@ def calculate_roughness_and_density(grid, buildings):
         grid['roughness_class'] = 'Very Low'
         return grid
     
-    # Calculate metrics
-    density = calculate_plan_area_density(grid, buildings)
-    roughness, avg_height = calculate_roughness_length(grid, buildings)
-    svf = calculate_sky_view_factor_simple(grid, buildings)
-    
-    # Merge into grid
-    grid['density'] = grid['grid_id'].map(density).fillna(0.0)
-    grid['roughness'] = grid['grid_id'].map(roughness).fillna(0.0)
-    grid['avg_height'] = grid['grid_id'].map(avg_height).fillna(0.0)
-    grid['svf'] = grid['grid_id'].map(svf).fillna(1.0)
-    
-    # Classifications
-    grid['density_class'] = grid['density'].apply(classify_density)
-    grid['roughness_class'] = grid['roughness'].apply(classify_roughness)
+    # Calculate metrics (single bulk pass shared by all three views)
+    with profiling.span('Morphology aggregates', engine=engine, cells=len(grid),
+                        buildings=len(buildings)):
+        if engine == 'raster':
+            from .raster_morphology import compute_morphology_metrics_raster
+            metrics = compute_morphology_metrics_raster(grid, buildings, spatial_index=spatial_index)
+        elif engine == 'vector':
+            metrics = compute_morphology_metrics(grid, buildings, spatial_index=spatial_index)
+        else:
+            raise ValueError(f"Unknown morphology engine: {engine}")
+    
+    with profiling.span('Plan area density'):
+        density = calculate_plan_area_density(grid, buildings, metrics=metrics)
+    with profiling.span('Roughness length'):
+        roughness, avg_height = calculate_roughness_length(grid, buildings, metrics=metrics)
+    with profiling.span('Sky view factor'):
+        svf = calculate_sky_view_factor_simple(grid, buildings, metrics=metrics)
+    
+    with profiling.span('Merge and classify'):
+        # Merge into grid
+        grid['density'] = grid['grid_id'].map(density).fillna(0.0)
+        grid['roughness'] = grid['grid_id'].map(roughness).fillna(0.0)
+        grid['avg_height'] = grid['grid_id'].map(avg_height).fillna(0.0)
+        grid['svf'] = grid['grid_id'].map(svf).fillna(1.0)
+        
+        # Classifications
+        grid['density_class'] = grid['density'].apply(classify_density)
+        grid['roughness_class'] = grid['roughness'].apply(classify_roughness)
     
     logger.info("Morphology analysis complete.")
     logger.info(f"  Mean Density: {grid['density'].mean():.3f}")
@@ -434,12 +512,13 @@ def calculate_roughness_and_density(grid, buildings):
     return grid
 
 
-def calculate_building_statistics(buildings):
+def calculate_building_statistics(buildings, spatial_index=None):
     """
     Calculate comprehensive building statistics
     
     Args:
         buildings (GeoDataFrame): Building footprints
+        spatial_index (SpatialIndex): Shared run index (optional)
     
     Returns:
         dict: Building statistics
@@ -452,8 +531,11 @@ def calculate_building_statistics(buildings):
             'mean_height': 0
         }
     
-    # Filter to only polygon geometries
-    buildings_clean = filter_polygon_geometries(buildings)
+    if spatial_index is not None:
+        buildings_clean = spatial_index.layer('buildings').copy()
+    else:
+        # Filter to only polygon geometries
+        buildings_clean = filter_polygon_geometries(buildings)
     
     if buildings_clean.empty:
         logger.warning("No polygon geometries found in buildings.")
@@ -464,7 +546,8 @@ def calculate_building_statistics(buildings):
             'mean_height': 0
         }
     
-    buildings_clean['height_m'] = estimate_building_heights(buildings_clean)
+    if 'height_m' not in buildings_clean.columns:
+        buildings_clean['height_m'] = estimate_building_heights(buildings_clean)
     buildings_clean['footprint_area'] = buildings_clean.geometry.area
     
     stats = {
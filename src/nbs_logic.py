@@ -9,14 +9,17 @@ import pandas as pd
 import logging
 
 from .config import (
-    DENSITY_VERY_HIGH, DENSITY_HIGH, DENSITY_MEDIUM, DENSITY_LOW,
+    DENSITY_VERY_HIGH, DENSITY_HIGH, DENSITY_MEDIUM, DENSITY_LOW, DENSITY_OPEN,
     ROUGHNESS_VERY_HIGH, ROUGHNESS_HIGH, ROUGHNESS_MEDIUM,
     SVF_OPEN, SVF_MODERATE, SVF_ENCLOSED,
     WIND_ALIGNMENT_TOLERANCE,
+    GREEN_BLUE_PROXIMITY_METERS, GREEN_BLUE_SEARCH_RADIUS_METERS,
     G20_NBS_PRINCIPLES,
     MULTI_BENEFIT_CATEGORIES,
     NBS_TYPES
 )
+from .nbs_rules import resolve_rule_table
+from . import profiling
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +50,7 @@ def assign_nbs_intervention(row, wind_dir, green_blue_gdf=None):
     avg_height = row.get('avg_height', 0)
     
     # Check if already green space
-    if density < 0.05:
+    if density < DENSITY_OPEN:
         # Very low density - might already be green space or water
         return "None"
     
@@ -93,6 +96,56 @@ def assign_nbs_intervention(row, wind_dir, green_blue_gdf=None):
     return "None"
 
 
+def assign_nbs_interventions(analysis_gdf, wind_dir, green_blue_gdf=None):
+    """
+    Vectorized counterpart of assign_nbs_intervention for a whole grid.
+    
+    The same priority cascade is compiled into boolean masks evaluated by
+    np.select (first matching condition wins), so results are identical to
+    applying assign_nbs_intervention row by row.
+    
+    Args:
+        analysis_gdf (GeoDataFrame): Grid with morphology metrics
+        wind_dir: Prevailing wind direction (degrees)
+        green_blue_gdf: Existing green/blue spaces (optional)
+    
+    Returns:
+        Series: Recommended NbS intervention type per cell
+    """
+    density = analysis_gdf['density'].to_numpy(dtype=float)
+    roughness = analysis_gdf['roughness'].to_numpy(dtype=float)
+    if 'svf' in analysis_gdf.columns:
+        svf = analysis_gdf['svf'].to_numpy(dtype=float)
+    else:
+        svf = np.full(len(analysis_gdf), 0.5)
+    
+    medium_high = (DENSITY_MEDIUM < density) & (density < DENSITY_HIGH)
+    
+    conditions = [
+        density < DENSITY_OPEN,
+        density >= DENSITY_VERY_HIGH,
+        (density >= DENSITY_HIGH) & (roughness >= ROUGHNESS_HIGH),
+        medium_high & (roughness >= ROUGHNESS_MEDIUM),
+        medium_high,
+        (DENSITY_LOW < density) & (density <= DENSITY_MEDIUM) & (svf < SVF_MODERATE),
+        (density <= DENSITY_MEDIUM) & (roughness < ROUGHNESS_MEDIUM),
+        density <= DENSITY_MEDIUM,
+    ]
+    choices = [
+        "None",
+        "Green Roof",
+        "Green Roof",
+        "Ventilation Corridor",
+        "Urban Forest",
+        "Urban Forest",
+        "Permeable Pavement",
+        "Rain Garden",
+    ]
+    
+    assigned = np.select(conditions, choices, default="None").astype(object)
+    return pd.Series(assigned, index=analysis_gdf.index)
+
+
 def assess_multi_benefits(nbs_type, area_sqm, density, roughness):
     """
     Assess multiple benefits of an NbS intervention.
@@ -245,8 +298,135 @@ def calculate_implementation_cost(nbs_type, area_sqm, num_trees=0):
         return area_sqm * cost_per_sqm
 
 
+def assess_multi_benefits_vectorized(nbs_types, area_sqm):
+    """
+    Vectorized counterpart of assess_multi_benefits.
+    
+    Area-independent scores are looked up from a per-type table (one
+    assess_multi_benefits call per distinct type) and broadcast over the
+    cells; tree counts, PM2.5 and carbon are then computed with the same
+    arithmetic as the scalar function.
+    
+    Args:
+        nbs_types (Series): NbS type per cell
+        area_sqm (float or Series): Intervention area per cell in square meters
+    
+    Returns:
+        DataFrame: Benefit columns (same names and order as assess_multi_benefits)
+    """
+    from .config import (
+        PM25_REMOVAL_TREE, PM25_REMOVAL_GREEN_ROOF,
+        CARBON_SEQUESTRATION_TREE, CARBON_SEQUESTRATION_GREEN_ROOF,
+        TREES_PER_HECTARE
+    )
+    
+    types = pd.Series(nbs_types)
+    area = np.broadcast_to(np.asarray(area_sqm), (len(types),))
+    
+    lookup = pd.DataFrame.from_dict(
+        {nbs_type: assess_multi_benefits(nbs_type, 0.0, 0.0, 0.0) for nbs_type in types.unique()},
+        orient='index'
+    )
+    benefits = lookup.reindex(types.to_numpy())
+    benefits.index = types.index
+    
+    green_roof = (types == "Green Roof").to_numpy()
+    forest = (types == "Urban Forest").to_numpy()
+    corridor = (types == "Ventilation Corridor").to_numpy()
+    
+    if forest.any() or corridor.any():
+        area_hectares = area / 10000.0
+        trees_per_hectare = np.where(forest, TREES_PER_HECTARE, 50)
+        estimated_trees = np.where(
+            forest | corridor, np.trunc(area_hectares * trees_per_hectare), 0
+        ).astype(np.int64)
+        benefits['estimated_trees'] = estimated_trees
+        benefits['pm25_removal_kg_yr'] = np.where(
+            forest | corridor, estimated_trees * PM25_REMOVAL_TREE / 1000,
+            benefits['pm25_removal_kg_yr']
+        )
+        benefits['carbon_sequestration_kg_yr'] = np.where(
+            forest | corridor, estimated_trees * CARBON_SEQUESTRATION_TREE,
+            benefits['carbon_sequestration_kg_yr']
+        )
+    
+    if green_roof.any():
+        benefits['pm25_removal_kg_yr'] = np.where(
+            green_roof, area * PM25_REMOVAL_GREEN_ROOF / 1000,
+            benefits['pm25_removal_kg_yr']
+        )
+        benefits['carbon_sequestration_kg_yr'] = np.where(
+            green_roof, area * CARBON_SEQUESTRATION_GREEN_ROOF,
+            benefits['carbon_sequestration_kg_yr']
+        )
+    
+    return benefits
+
+
+def calculate_implementation_costs(nbs_types, area_sqm, num_trees=0):
+    """
+    Vectorized counterpart of calculate_implementation_cost
+    
+    Args:
+        nbs_types (Series): NbS type per cell
+        area_sqm (float or Series): Area per cell in square meters
+        num_trees (int or Series): Number of trees per cell (for Urban Forest)
+    
+    Returns:
+        ndarray: Estimated cost in INR per cell
+    """
+    types = pd.Series(nbs_types)
+    cost_per_sqm = types.map(
+        {t: NBS_TYPES.get(t, {}).get('cost_per_sqm', 100) for t in types.unique()}
+    ).to_numpy()
+    cost_per_tree = NBS_TYPES.get("Urban Forest", {}).get('cost_per_tree', 5000)
+    
+    return np.where(
+        (types == "Urban Forest").to_numpy(),
+        np.asarray(num_trees) * cost_per_tree,
+        np.asarray(area_sqm) * cost_per_sqm
+    )
+
+
+def calculate_green_blue_context(analysis_gdf, spatial_index):
+    """
+    Add neighbourhood context columns from existing green/blue spaces.
+    
+    Uses the run's shared SpatialIndex so that proximity is a bulk
+    nearest-neighbour query rather than a per-cell geometry scan.
+    
+    Adds:
+    - dist_to_green_blue: distance (m) to the nearest green/blue feature,
+      NaN if none within GREEN_BLUE_SEARCH_RADIUS_METERS
+    - near_green_blue: True if within GREEN_BLUE_PROXIMITY_METERS
+    
+    Args:
+        analysis_gdf (GeoDataFrame): Grid with morphology metrics
+        spatial_index (SpatialIndex): Shared run index
+    
+    Returns:
+        GeoDataFrame: Grid with context columns added
+    """
+    cell_geoms = np.asarray(analysis_gdf.geometry.values, dtype=object)
+    distances = np.full(len(analysis_gdf), np.nan)
+    
+    cell_pos, _, nearest_dist = spatial_index.nearest(
+        'green_blue', cell_geoms, max_distance=GREEN_BLUE_SEARCH_RADIUS_METERS
+    )
+    distances[cell_pos] = nearest_dist
+    
+    analysis_gdf['dist_to_green_blue'] = distances
+    analysis_gdf['near_green_blue'] = distances <= GREEN_BLUE_PROXIMITY_METERS
+    
+    logger.info(f"Cells near existing green/blue space: "
+                f"{int(analysis_gdf['near_green_blue'].sum())}")
+    
+    return analysis_gdf
+
+
 def run_nbs_planning(analysis_gdf, prevailing_wind, green_blue_gdf=None, 
-                     calculate_benefits=True, calculate_costs=True):
+                     calculate_benefits=True, calculate_costs=True,
+                     spatial_index=None, rules=None):
     """
     Main NbS planning function. Applies decision logic to each grid cell.
     
@@ -256,17 +436,30 @@ def run_nbs_planning(analysis_gdf, prevailing_wind, green_blue_gdf=None,
         green_blue_gdf (GeoDataFrame): Existing green/blue spaces (optional)
         calculate_benefits (bool): Whether to calculate multi-benefits
         calculate_costs (bool): Whether to calculate implementation costs
+        spatial_index (SpatialIndex): Shared run index (optional). Enables
+            green/blue proximity context columns.
+        rules: Rule table (RuleTable or path to JSON/YAML) replacing the
+            built-in decision tree (optional)
     
     Returns:
         GeoDataFrame: Grid with NbS recommendations and assessments
     """
     logger.info(f"Applying NbS decision logic (prevailing wind: {prevailing_wind}°)...")
     
-    # Apply NbS assignment
-    analysis_gdf['Proposed_NbS'] = analysis_gdf.apply(
-        lambda row: assign_nbs_intervention(row, prevailing_wind, green_blue_gdf),
-        axis=1
-    )
+    if spatial_index is not None:
+        with profiling.span('Green/blue context'):
+            analysis_gdf = calculate_green_blue_context(analysis_gdf, spatial_index)
+    
+    # Apply NbS assignment (rule table or built-in vectorized decision tree)
+    with profiling.span('NbS assignment', cells=len(analysis_gdf)):
+        rule_table = resolve_rule_table(rules)
+        if rule_table is not None:
+            logger.info(f"Using NbS rule table: {rule_table.source or 'in-memory'}")
+            analysis_gdf['Proposed_NbS'] = rule_table.evaluate(analysis_gdf)
+        else:
+            analysis_gdf['Proposed_NbS'] = assign_nbs_interventions(
+                analysis_gdf, prevailing_wind, green_blue_gdf
+            )
     
     # Count interventions by type
     nbs_counts = analysis_gdf['Proposed_NbS'].value_counts()
@@ -274,42 +467,32 @@ def run_nbs_planning(analysis_gdf, prevailing_wind, green_blue_gdf=None,
     for nbs_type, count in nbs_counts.items():
         logger.info(f"  {nbs_type}: {count} cells")
     
+    # Default 150x150m when the grid carries no cell areas
+    cell_area = analysis_gdf['cell_area'] if 'cell_area' in analysis_gdf.columns else 22500
+    
     # Calculate benefits if requested
     if calculate_benefits:
         logger.info("Calculating multi-benefits for each intervention...")
         
-        benefits_list = []
-        for idx, row in analysis_gdf.iterrows():
-            cell_area = row.get('cell_area', 22500)  # Default 150x150m
-            benefits = assess_multi_benefits(
-                row['Proposed_NbS'],
-                cell_area,
-                row['density'],
-                row['roughness']
-            )
-            benefits_list.append(benefits)
-        
-        # Add benefit columns
-        benefits_df = pd.DataFrame(benefits_list, index=analysis_gdf.index)
-        for col in benefits_df.columns:
-            analysis_gdf[f'benefit_{col}'] = benefits_df[col]
+        with profiling.span('Multi-benefit assessment'):
+            benefits_df = assess_multi_benefits_vectorized(analysis_gdf['Proposed_NbS'], cell_area)
+            for col in benefits_df.columns:
+                analysis_gdf[f'benefit_{col}'] = benefits_df[col]
     
     # Calculate costs if requested
     if calculate_costs:
         logger.info("Calculating implementation costs...")
         
-        costs = []
-        for idx, row in analysis_gdf.iterrows():
-            cell_area = row.get('cell_area', 22500)
-            num_trees = row.get('benefit_estimated_trees', 0) if calculate_benefits else 0
-            cost = calculate_implementation_cost(row['Proposed_NbS'], cell_area, num_trees)
-            costs.append(cost)
-        
-        analysis_gdf['cost_inr'] = costs
+        with profiling.span('Implementation costs'):
+            num_trees = analysis_gdf['benefit_estimated_trees'] if calculate_benefits else 0
+            analysis_gdf['cost_inr'] = calculate_implementation_costs(
+                analysis_gdf['Proposed_NbS'], cell_area, num_trees
+            )
     
     # Add priority ranking
-    analysis_gdf['priority'] = analysis_gdf['Proposed_NbS'].map(
-        lambda x: NBS_TYPES.get(x, {}).get('priority', 999)
+    nbs_types = analysis_gdf['Proposed_NbS']
+    analysis_gdf['priority'] = nbs_types.map(
+        {t: NBS_TYPES.get(t, {}).get('priority', 999) for t in nbs_types.unique()}
     )
     
     logger.info("NbS planning complete.")
@@ -0,0 +1,241 @@
+"""
+NbS Rule Table Module
+Declarative, hot-reloadable NbS decision rules
+
+A rule table (JSON, or YAML when PyYAML is installed) lists
+condition → NbS type → priority. It is compiled once into vectorized
+boolean masks over the morphology columns and cached by content hash,
+so editing a threshold only changes the planning stage.
+
+Condition values may name a threshold constant in src/config.py (e.g.
+"DENSITY_HIGH") instead of a number. The shipped table does this for every
+threshold, so config.py stays the single owner of the default values.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import logging
+
+from . import config
+from .config import NBS_TYPES, NBS_RULES_PATH
+
+logger = logging.getLogger(__name__)
+
+_OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+# Compiled tables keyed by content hash
+_COMPILED_CACHE = {}
+
+
+class RuleTable:
+    """
+    Compiled NbS rule table.
+
+    Rules are kept in ascending priority; each is a list of
+    (column, operator, value) conditions that are ANDed together.
+    evaluate() builds one mask per rule and resolves them with np.select,
+    so the first matching rule wins.
+    """
+
+    def __init__(self, rules, default='None', defaults=None, content_hash=None, source=None):
+        """
+        Args:
+            rules (list): Compiled rules as (name, nbs_type, [(column, ufunc, value), ...])
+            default (str): NbS type when no rule matches
+            defaults (dict): Fallback values for columns missing from the grid
+            content_hash (str): SHA-256 of the source table
+            source (str): Path the table was loaded from (optional)
+        """
+        self.rules = rules
+        self.default = default
+        self.defaults = defaults or {}
+        self.content_hash = content_hash
+        self.source = source
+
+    @property
+    def columns(self):
+        """Grid columns referenced by the rule conditions"""
+        return sorted({column for _, _, conditions in self.rules for column, _, _ in conditions})
+
+    def _column(self, analysis_gdf, column):
+        """Column values as an array, falling back to the table defaults"""
+        if column in analysis_gdf.columns:
+            return analysis_gdf[column].to_numpy()
+        if column in self.defaults:
+            return np.full(len(analysis_gdf), self.defaults[column])
+        raise KeyError(f"Rule table references missing column '{column}' with no default")
+
+    def evaluate(self, analysis_gdf):
+        """
+        Assign an NbS type to every cell
+
+        Args:
+            analysis_gdf (GeoDataFrame): Grid with morphology metrics
+
+        Returns:
+            Series: NbS type per cell
+        """
+        values = {column: self._column(analysis_gdf, column) for column in self.columns}
+
+        masks = []
+        for _, _, conditions in self.rules:
+            mask = np.ones(len(analysis_gdf), dtype=bool)
+            for column, op, value in conditions:
+                mask &= op(values[column], value)
+            masks.append(mask)
+
+        choices = [nbs_type for _, nbs_type, _ in self.rules]
+        assigned = np.select(masks, choices, default=self.default).astype(object)
+        return pd.Series(assigned, index=analysis_gdf.index)
+
+
+def _resolve_value(name, value):
+    """
+    Resolve a condition value, looking up config constant names
+
+    Args:
+        name (str): Rule name (for error messages)
+        value: Literal value or name of a numeric constant in src/config.py
+
+    Returns:
+        tuple: (resolved value, constant name or None)
+
+    Raises:
+        ValueError: If an upper-case name is not a numeric config constant
+    """
+    if not (isinstance(value, str) and value.isupper()):
+        return value, None
+
+    constant = getattr(config, value, None)
+    if isinstance(constant, bool) or not isinstance(constant, (int, float)):
+        raise ValueError(f"Rule '{name}': '{value}' is not a numeric constant in config.py")
+    return constant, value
+
+
+def compile_rule_table(table, content_hash=None, source=None):
+    """
+    Compile a parsed rule table into a RuleTable
+
+    Config constants referenced by name are resolved here, and their values
+    are folded into the content hash so a changed threshold in config.py
+    also invalidates cached planning results.
+
+    Args:
+        table (dict): Parsed rule table with 'rules', 'default' and 'defaults'
+        content_hash (str): SHA-256 of the source content (optional)
+        source (str): Source path (optional)
+
+    Returns:
+        RuleTable: Compiled table
+
+    Raises:
+        ValueError: If a rule is malformed, uses an unknown operator or
+            references an unknown config constant
+    """
+    compiled = []
+    constants = {}
+
+    rules = sorted(enumerate(table.get('rules', [])),
+                   key=lambda item: (item[1].get('priority', 999), item[0]))
+
+    for position, rule in rules:
+        name = rule.get('name', f'rule_{position}')
+        nbs_type = rule.get('nbs_type')
+
+        if nbs_type is None:
+            raise ValueError(f"Rule '{name}' has no nbs_type")
+        if nbs_type not in NBS_TYPES:
+            logger.warning(f"Rule '{name}' assigns unknown NbS type '{nbs_type}'")
+
+        conditions = []
+        for condition in rule.get('when', []):
+            if len(condition) != 3:
+                raise ValueError(f"Rule '{name}': condition must be [column, op, value], got {condition}")
+            column, op, value = condition
+            if op not in _OPERATORS:
+                raise ValueError(f"Rule '{name}': unknown operator '{op}'")
+            value, constant = _resolve_value(name, value)
+            if constant is not None:
+                constants[constant] = value
+            conditions.append((column, _OPERATORS[op], value))
+
+        compiled.append((name, nbs_type, conditions))
+
+    if content_hash is not None and constants:
+        resolved = json.dumps(constants, sort_keys=True).encode()
+        content_hash = hashlib.sha256(content_hash.encode() + resolved).hexdigest()
+
+    return RuleTable(
+        compiled,
+        default=table.get('default', 'None'),
+        defaults=table.get('defaults', {}),
+        content_hash=content_hash,
+        source=source
+    )
+
+
+def load_rule_table(path=NBS_RULES_PATH):
+    """
+    Load and compile a rule table, reusing the compiled form while the
+    file content is unchanged
+
+    Args:
+        path: Path to a .json (or .yaml/.yml) rule table
+
+    Returns:
+        RuleTable: Compiled table
+    """
+    path = Path(path)
+    content = path.read_bytes()
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    if content_hash in _COMPILED_CACHE:
+        return _COMPILED_CACHE[content_hash]
+
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is required for YAML rule tables (pip install pyyaml)")
+        table = yaml.safe_load(content)
+    else:
+        table = json.loads(content)
+
+    rule_table = compile_rule_table(table, content_hash=content_hash, source=str(path))
+    _COMPILED_CACHE[content_hash] = rule_table
+
+    logger.info(f"Compiled {len(rule_table.rules)} NbS rules from {path} "
+                f"(hash {content_hash[:12]})")
+
+    return rule_table
+
+
+def resolve_rule_table(rules):
+    """
+    Normalize a rules argument to a RuleTable
+
+    Args:
+        rules: RuleTable, path to a rule table, or None
+
+    Returns:
+        RuleTable or None
+    """
+    if rules is None or isinstance(rules, RuleTable):
+        return rules
+    return load_rule_table(rules)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    table = load_rule_table()
+    print(f"Loaded {len(table.rules)} rules (hash {table.content_hash[:12]}).")
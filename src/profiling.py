@@ -0,0 +1,328 @@
+"""
+Profiling Module
+Hierarchical run profiler behind utils.Timer and main.py --profile
+
+Records nested spans (stage → sub-stage → per-metric) with:
+- wall time (perf_counter) and CPU time (process_time)
+- peak RSS of the process at span exit
+- tracemalloc allocation delta and peak above the span's start
+
+and writes them as a JSON report and a Chrome trace-format file
+(chrome://tracing or https://ui.perfetto.dev). A cProfile or
+pyinstrument call profile can be captured alongside.
+
+When no profiler is active, span() is a no-op, so instrumented code
+costs nothing in normal runs. Spans are recorded in this process only;
+work in tiling worker processes appears as its parent span.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import logging
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+HOOKS = ('cprofile', 'pyinstrument')
+
+_MB = 1024 * 1024
+
+# Active profiler (None when profiling is off)
+_active = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / _MB if sys.platform == 'darwin' else peak / 1024
+
+
+class Profiler:
+    """
+    Collects nested spans for one run.
+
+    Each thread keeps its own span stack; the tracemalloc peak is
+    propagated from child spans to their parents, so a parent's peak
+    covers its whole extent.
+    """
+
+    def __init__(self, trace_memory=True, hook=None):
+        """
+        Args:
+            trace_memory (bool): Record tracemalloc deltas (slows allocation-heavy code)
+            hook (str): Optional call profiler, 'cprofile' or 'pyinstrument'
+        """
+        if hook is not None and hook not in HOOKS:
+            raise ValueError(f"Unknown profiler hook '{hook}'. Use one of {HOOKS}.")
+
+        self.trace_memory = trace_memory
+        self.hook = hook
+        self.spans = []
+        self.started_at = None
+        self.total_wall_s = None
+        self._origin = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hook_profiler = None
+        self._started_tracemalloc = False
+
+    def _stack(self):
+        """Span stack of the calling thread"""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def start(self):
+        """Start timing, memory tracing and the call profiler hook"""
+        self.started_at = datetime.now()
+        self._origin = time.perf_counter()
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        if self.hook == 'cprofile':
+            import cProfile
+            self._hook_profiler = cProfile.Profile()
+            self._hook_profiler.enable()
+        elif self.hook == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler as CallProfiler
+            except ImportError:
+                raise ImportError("pyinstrument is required for --profile pyinstrument "
+                                  "(pip install pyinstrument)")
+            self._hook_profiler = CallProfiler()
+            self._hook_profiler.start()
+
+        return self
+
+    def stop(self):
+        """Stop the call profiler hook and memory tracing"""
+        if self.hook == 'cprofile' and self._hook_profiler is not None:
+            self._hook_profiler.disable()
+        elif self.hook == 'pyinstrument' and self._hook_profiler is not None:
+            self._hook_profiler.stop()
+
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+        self.total_wall_s = time.perf_counter() - self._origin
+        return self
+
+    @contextmanager
+    def span(self, name, **args):
+        """
+        Record one span
+
+        Args:
+            name (str): Span name
+            **args: Extra attributes stored with the span (e.g. cell counts)
+        """
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+
+        frame = {'name': name, 'peak': 0}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['mem_start'] = current
+        stack.append(frame)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            stack.pop()
+
+            record = {
+                'name': name,
+                'parent': parent['name'] if parent is not None else None,
+                'depth': len(stack),
+                'thread': threading.current_thread().name,
+                'tid': threading.get_ident(),
+                'start_s': wall_start - self._origin,
+                'wall_s': wall,
+                'cpu_s': cpu,
+                'rss_peak_mb': peak_rss_mb(),
+            }
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                frame['peak'] = max(frame['peak'], peak)
+                if parent is not None:
+                    parent['peak'] = max(parent['peak'], frame['peak'])
+                tracemalloc.reset_peak()
+                record['alloc_delta_mb'] = (current - frame['mem_start']) / _MB
+                record['alloc_peak_mb'] = max(frame['peak'] - frame['mem_start'], 0) / _MB
+            if args:
+                record['args'] = args
+
+            with self._lock:
+                self.spans.append(record)
+
+    def summary(self):
+        """
+        Aggregate spans by name
+
+        Returns:
+            list: {name, count, wall_s, cpu_s} sorted by total wall time
+        """
+        totals = {}
+        for record in self.spans:
+            entry = totals.setdefault(record['name'], {'name': record['name'], 'count': 0,
+                                                       'wall_s': 0.0, 'cpu_s': 0.0})
+            entry['count'] += 1
+            entry['wall_s'] += record['wall_s']
+            entry['cpu_s'] += record['cpu_s']
+        return sorted(totals.values(), key=lambda entry: entry['wall_s'], reverse=True)
+
+    def to_dict(self):
+        """Profile as a JSON-serializable dict (spans in start order)"""
+        return {
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'total_wall_s': self.total_wall_s,
+            'pid': os.getpid(),
+            'trace_memory': self.trace_memory,
+            'hook': self.hook,
+            'spans': sorted(self.spans, key=lambda record: record['start_s']),
+            'summary': self.summary(),
+        }
+
+    def chrome_trace(self):
+        """
+        Profile in Chrome trace-event format
+
+        Returns:
+            dict: {'traceEvents': [...]} with one complete ('X') event per span
+        """
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid,
+                   'args': {'name': 'NbS Planner'}}]
+
+        for record in self.spans:
+            args = {key: record[key] for key in
+                    ('cpu_s', 'rss_peak_mb', 'alloc_delta_mb', 'alloc_peak_mb') if key in record}
+            args.update(record.get('args', {}))
+            events.append({
+                'name': record['name'],
+                'cat': record['parent'] or 'run',
+                'ph': 'X',
+                'ts': record['start_s'] * 1e6,
+                'dur': record['wall_s'] * 1e6,
+                'pid': pid,
+                'tid': record['tid'],
+                'args': args,
+            })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, output_dir, prefix=None):
+        """
+        Write the JSON report, Chrome trace and call profile (if hooked)
+
+        Args:
+            output_dir: Output directory
+            prefix (str): File name prefix (default: profile_<timestamp>)
+
+        Returns:
+            dict: {'json': path, 'trace': path, 'call_profile': path (if hooked)}
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        prefix = prefix or f"profile_{(self.started_at or datetime.now()).strftime('%Y%m%d_%H%M%S')}"
+
+        files = {
+            'json': output_dir / f"{prefix}.json",
+            'trace': output_dir / f"{prefix}.trace.json",
+        }
+        with open(files['json'], 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        with open(files['trace'], 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+        if self.hook == 'cprofile' and self._hook_profiler is not None:
+            files['call_profile'] = output_dir / f"{prefix}.prof"
+            self._hook_profiler.dump_stats(str(files['call_profile']))
+        elif self.hook == 'pyinstrument' and self._hook_profiler is not None:
+            files['call_profile'] = output_dir / f"{prefix}.html"
+            files['call_profile'].write_text(self._hook_profiler.output_html(), encoding='utf-8')
+
+        logger.info(f"Profile written to: {files['json']} (trace: {files['trace']})")
+        return files
+
+
+def start_profiling(trace_memory=True, hook=None):
+    """
+    Start a run profiler; span() and utils.Timer record into it until stopped
+
+    Args:
+        trace_memory (bool): Record tracemalloc deltas
+        hook (str): Optional call profiler, 'cprofile' or 'pyinstrument'
+
+    Returns:
+        Profiler: Active profiler
+    """
+    global _active
+    _active = Profiler(trace_memory=trace_memory, hook=hook).start()
+    return _active
+
+
+def stop_profiling():
+    """
+    Stop the active profiler
+
+    Returns:
+        Profiler or None: The stopped profiler (None if none was active)
+    """
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+
+def get_profiler():
+    """Active profiler, or None"""
+    return _active
+
+
+@contextmanager
+def span(name, **args):
+    """
+    Record a span in the active profiler (no-op when profiling is off)
+
+    Args:
+        name (str): Span name
+        **args: Extra attributes stored with the span
+    """
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    with profiler.span(name, **args):
+        yield
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Profiling module loaded successfully.")
@@ -0,0 +1,487 @@
+"""
+Data Provider Module
+Pluggable sources for the OSM layers used by fetch_live_infrastructure:
+- DataProvider: interface returning buildings, streets or green/blue spaces for a box
+- OverpassReplayProvider: offline provider over raw Overpass API JSON responses
+  (e.g. the osmnx request cache in cache/), with no osmnx or network access
+- SharedStoreProvider: slices layers from a shared store built once for many
+  overlapping locations (data_loader.build_shared_store)
+
+The live osmnx/Overpass provider lives in data_loader (OSMnxProvider).
+"""
+
+import re
+import json
+from abc import ABC, abstractmethod
+import contextlib
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from shapely.geometry import box
+from pyproj import Transformer
+import logging
+
+from .config import CRS_WGS84, CRS_UTM, OSM_LAYER_TAGS, OVERPASS_REPLAY_DIR
+from .footprint_store import read_footprints
+
+logger = logging.getLogger(__name__)
+
+# Highway values excluded from osmnx's 'drive' network
+DRIVE_EXCLUDED_HIGHWAYS = {
+    'abandoned', 'bridleway', 'bus_guideway', 'construction', 'corridor',
+    'cycleway', 'elevator', 'escalator', 'footway', 'no', 'path', 'pedestrian',
+    'planned', 'platform', 'proposed', 'raceway', 'razed', 'service', 'steps', 'track'
+}
+
+_ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+
+
+class DataProvider(ABC):
+    """
+    Source of OSM feature layers.
+
+    Implementations return a GeoDataFrame in CRS_UTM with the features of
+    one layer ('buildings', 'streets' or 'green_blue') intersecting a box.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def fetch_layer(self, layer, bounds, columns=None):
+        """
+        Fetch one layer for a query box
+
+        Args:
+            layer (str): 'buildings', 'streets' or 'green_blue'
+            bounds (tuple): (minx, miny, maxx, maxy) in CRS_UTM
+            columns (list): Attribute columns to keep (optional; geometry is always kept)
+
+        Returns:
+            GeoDataFrame: Features intersecting the box
+        """
+
+
+def iter_overpass_elements(source, chunk_size=1 << 20):
+    """
+    Stream the elements of an Overpass API JSON response
+
+    The input is read in chunks and each element object is decoded as soon
+    as it is complete, so the full document is never held as one string.
+
+    Args:
+        source: Path to an Overpass JSON response, or a text stream
+            (e.g. a streamed HTTP response wrapped in io.TextIOWrapper)
+        chunk_size (int): Characters read per chunk
+
+    Yields:
+        dict: One OSM element (node, way or relation)
+    """
+    decoder = json.JSONDecoder()
+
+    if hasattr(source, 'read'):
+        stream = contextlib.nullcontext(source)
+    else:
+        stream = open(source, 'r', encoding='utf-8')
+
+    with stream as f:
+        # Locate the start of the elements array
+        buffer = ''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buffer += chunk
+            match = _ELEMENTS_START.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            buffer = buffer[-32:]
+
+        pos = 0
+        eof = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+
+            try:
+                element, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield element
+
+            if pos > chunk_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+
+def matches_tags(tags, tag_filter):
+    """
+    Check OSM tags against an osmnx-style tag filter
+
+    Args:
+        tags (dict): Element tags
+        tag_filter (dict): {key: True | value | [values]}
+
+    Returns:
+        bool: True if any key matches
+    """
+    for key, wanted in tag_filter.items():
+        value = tags.get(key)
+        if value is None:
+            continue
+        if wanted is True:
+            return True
+        if isinstance(wanted, (list, tuple, set)):
+            if value in wanted:
+                return True
+        elif value == wanted:
+            return True
+    return False
+
+
+def is_drive_street(tags):
+    """
+    Check whether a way belongs to osmnx's 'drive' network
+
+    Args:
+        tags (dict): Way tags
+
+    Returns:
+        bool: True for drivable highways
+    """
+    highway = tags.get('highway')
+    if highway is None or highway in DRIVE_EXCLUDED_HIGHWAYS:
+        return False
+    if tags.get('area') == 'yes' or tags.get('access') == 'private':
+        return False
+    if tags.get('motor_vehicle') == 'no' or tags.get('motorcar') == 'no':
+        return False
+    return True
+
+
+class OverpassElements:
+    """
+    Columnar store of parsed Overpass elements.
+
+    Node coordinates are kept as sorted id/x/y arrays (projected to CRS_UTM
+    once); ways as one flat node-reference array with offsets, so way
+    geometries are assembled with vectorized lookups and shapely's array
+    constructors.
+    """
+
+    def __init__(self, paths):
+        """
+        Parse one or more Overpass responses (duplicates across files are merged)
+
+        Args:
+            paths (list): Paths to Overpass JSON responses
+        """
+        node_ids, lons, lats = [], [], []
+        self.tagged_nodes = {}
+        ways = {}
+        self.relations = {}
+
+        for path in paths:
+            for element in iter_overpass_elements(path):
+                kind = element.get('type')
+                if kind == 'node':
+                    node_ids.append(element['id'])
+                    lons.append(element['lon'])
+                    lats.append(element['lat'])
+                    if element.get('tags'):
+                        self.tagged_nodes[element['id']] = element['tags']
+                elif kind == 'way':
+                    ways[element['id']] = (element.get('nodes', []), element.get('tags', {}))
+                elif kind == 'relation':
+                    self.relations[element['id']] = (element.get('members', []),
+                                                     element.get('tags', {}))
+
+        # Nodes: unique, sorted by id, projected once
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        node_ids, first = np.unique(node_ids, return_index=True)
+        transformer = Transformer.from_crs(CRS_WGS84, CRS_UTM, always_xy=True)
+        x, y = transformer.transform(np.asarray(lons, dtype=float)[first],
+                                     np.asarray(lats, dtype=float)[first])
+        self.node_ids = node_ids
+        self.node_xy = np.column_stack([x, y])
+
+        # Ways: flat reference array with per-way lengths
+        self.way_ids = np.fromiter(ways.keys(), dtype=np.int64, count=len(ways))
+        self.way_tags = [tags for _, tags in ways.values()]
+        self.way_lengths = np.fromiter((len(refs) for refs, _ in ways.values()),
+                                       dtype=np.int64, count=len(ways))
+        refs = np.fromiter((ref for refs, _ in ways.values() for ref in refs),
+                           dtype=np.int64, count=int(self.way_lengths.sum()))
+
+        positions = np.searchsorted(self.node_ids, refs)
+        positions = np.minimum(positions, max(len(self.node_ids) - 1, 0))
+        found = (self.node_ids[positions] == refs) if len(self.node_ids) else np.zeros(len(refs), bool)
+        way_index = np.repeat(np.arange(len(self.way_ids)), self.way_lengths)
+        missing = np.bincount(way_index, weights=(~found).astype(float),
+                              minlength=len(self.way_ids))
+
+        self.way_coord_pos = positions
+        self.way_complete = (missing == 0) & (self.way_lengths >= 2)
+
+        # Closed ways (first ref == last ref) are areas
+        ends = np.cumsum(self.way_lengths)
+        starts = ends - self.way_lengths
+        self.way_closed = np.zeros(len(self.way_ids), dtype=bool)
+        ring = self.way_lengths >= 4
+        self.way_closed[ring] = refs[starts[ring]] == refs[ends[ring] - 1]
+
+        self._way_positions = {way_id: i for i, way_id in enumerate(self.way_ids)}
+        self._lines = None
+
+        incomplete = int((~self.way_complete).sum())
+        if incomplete:
+            logger.debug(f"{incomplete} ways reference nodes missing from the replay data.")
+
+    def _way_coords(self, mask):
+        """Coordinates and renumbered geometry indices of the selected ways"""
+        coord_mask = np.repeat(mask, self.way_lengths)
+        coords = self.node_xy[self.way_coord_pos[coord_mask]]
+        indices = np.repeat(np.arange(int(mask.sum())), self.way_lengths[mask])
+        return coords, indices
+
+    def way_lines(self):
+        """LineString for every complete way (None for incomplete ways)"""
+        if self._lines is None:
+            lines = np.full(len(self.way_ids), None, dtype=object)
+            if self.way_complete.any():
+                coords, indices = self._way_coords(self.way_complete)
+                lines[self.way_complete] = shapely.linestrings(coords, indices=indices)
+            self._lines = lines
+        return self._lines
+
+    def way_polygons(self, mask):
+        """Polygons for the selected closed ways"""
+        if not mask.any():
+            return np.zeros(0, dtype=object)
+        coords, indices = self._way_coords(mask)
+        return shapely.polygons(shapely.linearrings(coords, indices=indices))
+
+    def relation_polygon(self, members):
+        """
+        Assemble a multipolygon relation from its member ways
+
+        Args:
+            members (list): Relation members
+
+        Returns:
+            Polygon/MultiPolygon or None if no outer ring could be built
+        """
+        lines = self.way_lines()
+        rings = {'outer': [], 'inner': []}
+
+        for member in members:
+            if member.get('type') != 'way':
+                continue
+            pos = self._way_positions.get(member.get('ref'))
+            if pos is None or lines[pos] is None:
+                continue
+            role = 'inner' if member.get('role') == 'inner' else 'outer'
+            rings[role].append(lines[pos])
+
+        if not rings['outer']:
+            return None
+
+        outer = shapely.union_all(shapely.get_parts(shapely.polygonize(rings['outer'])))
+        if outer.is_empty:
+            return None
+        if rings['inner']:
+            inner = shapely.union_all(shapely.get_parts(shapely.polygonize(rings['inner'])))
+            outer = outer.difference(inner)
+        return outer
+
+    def layer(self, layer):
+        """
+        Build the GeoDataFrame of one layer
+
+        Args:
+            layer (str): 'buildings', 'streets' or 'green_blue'
+
+        Returns:
+            GeoDataFrame: Features in CRS_UTM with element_type/osmid columns
+        """
+        if layer == 'streets':
+            match = is_drive_street
+        else:
+            tag_filter = OSM_LAYER_TAGS[layer]
+            match = lambda tags: matches_tags(tags, tag_filter)
+
+        element_types, osmids, tags_list, geoms = [], [], [], []
+
+        # Tagged nodes become points (areas only; streets are ways)
+        if layer != 'streets':
+            for node_id, tags in self.tagged_nodes.items():
+                if match(tags):
+                    pos = np.searchsorted(self.node_ids, node_id)
+                    element_types.append('node')
+                    osmids.append(node_id)
+                    tags_list.append(tags)
+                    geoms.append(shapely.points(self.node_xy[pos]))
+
+        # Ways: polygons when closed (areas), lines otherwise
+        selected = np.fromiter((match(tags) for tags in self.way_tags),
+                               dtype=bool, count=len(self.way_tags)) & self.way_complete
+        way_geoms = self.way_lines()[selected].copy()
+        if layer != 'streets':
+            closed = self.way_closed[selected]
+            way_geoms[closed] = self.way_polygons(selected & self.way_closed)
+
+        element_types.extend(['way'] * int(selected.sum()))
+        osmids.extend(self.way_ids[selected].tolist())
+        tags_list.extend(self.way_tags[i] for i in np.flatnonzero(selected))
+        geoms.extend(way_geoms)
+
+        # Multipolygon relations
+        if layer != 'streets':
+            for relation_id, (members, tags) in self.relations.items():
+                if tags.get('type') != 'multipolygon' or not match(tags):
+                    continue
+                geom = self.relation_polygon(members)
+                if geom is None:
+                    continue
+                element_types.append('relation')
+                osmids.append(relation_id)
+                tags_list.append(tags)
+                geoms.append(geom)
+
+        attributes = pd.DataFrame.from_records(tags_list) if tags_list else pd.DataFrame()
+        attributes.insert(0, 'element_type', element_types)
+        attributes.insert(1, 'osmid', np.asarray(osmids, dtype=np.int64))
+
+        gdf = gpd.GeoDataFrame(attributes, geometry=list(geoms), crs=CRS_UTM)
+        if layer == 'streets':
+            gdf['length'] = gdf.geometry.length
+
+        return gdf
+
+
+class OverpassReplayProvider(DataProvider):
+    """
+    Offline provider over saved Overpass API responses.
+
+    All responses are parsed once (on first use), split into layers by tag,
+    and then served by bounding-box selection. Streets are returned per OSM
+    way rather than as osmnx graph edges split at intersections.
+    """
+
+    name = 'replay'
+
+    def __init__(self, paths=None, replay_dir=OVERPASS_REPLAY_DIR):
+        """
+        Args:
+            paths (list): Overpass JSON files (default: all *.json in replay_dir)
+            replay_dir: Directory of saved responses
+        """
+        if paths is None:
+            paths = sorted(Path(replay_dir).glob('*.json'))
+        self.paths = [Path(p) for p in paths]
+        self._layers = {}
+        self._elements = None
+        self._lock = threading.Lock()
+
+    def _layer(self, layer):
+        """Parse the responses and build a layer once (thread-safe)"""
+        with self._lock:
+            if self._elements is None:
+                if not self.paths:
+                    raise FileNotFoundError("No Overpass responses found for replay.")
+                logger.info(f"Parsing {len(self.paths)} Overpass responses for replay...")
+                self._elements = OverpassElements(self.paths)
+            if layer not in self._layers:
+                self._layers[layer] = self._elements.layer(layer)
+            return self._layers[layer]
+
+    def fetch_layer(self, layer, bounds, columns=None):
+        """
+        Fetch one layer for a query box from the replay data
+
+        Args:
+            layer (str): 'buildings', 'streets' or 'green_blue'
+            bounds (tuple): (minx, miny, maxx, maxy) in CRS_UTM
+            columns (list): Attribute columns to keep (optional)
+
+        Returns:
+            GeoDataFrame: Features intersecting the box
+        """
+        gdf = self._layer(layer)
+
+        if not gdf.empty:
+            positions = gdf.sindex.query(box(*bounds), predicate='intersects')
+            gdf = gdf.iloc[np.sort(positions)].reset_index(drop=True)
+
+        if columns is not None:
+            keep = ['element_type', 'osmid'] + [c for c in columns if c in gdf.columns]
+            gdf = gdf[list(dict.fromkeys(keep)) + [gdf.geometry.name]]
+
+        logger.info(f"Replayed {len(gdf)} {layer} features.")
+        return gdf
+
+
+class SharedStoreProvider(DataProvider):
+    """
+    Provider over a shared store of pre-loaded layers.
+
+    The store (one Hilbert-sorted GeoParquet file per layer, written by
+    data_loader.build_shared_store) covers the union extent of a batch of
+    locations. Each query reads only the row groups whose bbox statistics
+    overlap it and then filters exactly with a spatial index, so the
+    store is shared by worker processes through the OS page cache rather
+    than loaded per location.
+    """
+
+    name = 'store'
+
+    def __init__(self, store_dir):
+        """
+        Args:
+            store_dir: Directory with <layer>.parquet files and manifest.json
+        """
+        self.store_dir = Path(store_dir)
+
+    def fetch_layer(self, layer, bounds, columns=None):
+        """
+        Slice one layer for a query box from the store
+
+        Args:
+            layer (str): 'buildings', 'streets' or 'green_blue'
+            bounds (tuple): (minx, miny, maxx, maxy) in CRS_UTM
+            columns (list): Attribute columns to keep (optional)
+
+        Returns:
+            GeoDataFrame: Features intersecting the box
+        """
+        path = self.store_dir / f"{layer}.parquet"
+        if not path.exists():
+            logger.info(f"Shared store has no {layer} features.")
+            return gpd.GeoDataFrame(geometry=[], crs=CRS_UTM)
+
+        if columns is not None:
+            columns = ['element_type', 'osmid'] + list(columns)
+        gdf = read_footprints(path, bounds, columns=columns)
+
+        positions = gdf.sindex.query(box(*bounds), predicate='intersects')
+        gdf = gdf.iloc[np.sort(positions)].reset_index(drop=True)
+
+        logger.info(f"Sliced {len(gdf)} {layer} features from shared store.")
+        return gdf
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Data provider module loaded successfully.")
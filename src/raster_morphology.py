@@ -0,0 +1,324 @@
+"""
+Raster Morphology Engine
+City-scale alternative to the vector morphology path:
+- Building footprints are rasterized once onto a fine sub-grid (default 2 m)
+- Per-cell metrics for any grid size are block reductions on that array
+- Work is done in horizontal strips so memory stays bounded and predictable
+"""
+
+import math
+import weakref
+import tempfile
+import numpy as np
+import shapely
+from shapely.geometry import box
+import logging
+
+from .config import (
+    RASTER_RESOLUTION_METERS, RASTER_MAX_STRIP_PIXELS,
+    RASTER_MEMMAP_THRESHOLD_PIXELS, RASTER_VALIDATION_TOLERANCE
+)
+from .morphology import (
+    filter_polygon_geometries, estimate_building_heights,
+    compute_morphology_metrics, metrics_from_aggregates
+)
+
+logger = logging.getLogger(__name__)
+
+# Rasters built by get_building_raster, keyed by (id of the source frame or
+# SpatialIndex, row count, resolution); entries are dropped when the source
+# is garbage collected
+_raster_cache = {}
+
+
+def grid_lattice(grid):
+    """
+    Recover the regular lattice underlying an analysis grid
+
+    Args:
+        grid (GeoDataFrame): Analysis grid of square cells
+
+    Returns:
+        tuple: (x0, y0, grid_size, rows, cols) where rows/cols are the
+        integer lattice positions of each cell counted from (x0, y0)
+    """
+    bounds = shapely.bounds(np.asarray(grid.geometry.values, dtype=object))
+    grid_size = float(np.median(bounds[:, 2] - bounds[:, 0]))
+
+    if 'grid_row' in grid.columns and 'grid_col' in grid.columns:
+        # Lattice indices carried by create_analysis_grid
+        rows = grid['grid_row'].to_numpy(dtype=np.int64)
+        cols = grid['grid_col'].to_numpy(dtype=np.int64)
+        x0 = float(bounds[0, 0] - cols[0] * grid_size)
+        y0 = float(bounds[0, 1] - rows[0] * grid_size)
+        return x0, y0, grid_size, rows, cols
+
+    x0 = float(bounds[:, 0].min())
+    y0 = float(bounds[:, 1].min())
+    cols = np.rint((bounds[:, 0] - x0) / grid_size).astype(np.int64)
+    rows = np.rint((bounds[:, 1] - y0) / grid_size).astype(np.int64)
+    return x0, y0, grid_size, rows, cols
+
+
+class BuildingRaster:
+    """
+    Building-ID raster of footprints on a fine sub-grid.
+
+    Each pixel holds the position of the building covering its centre, or -1.
+    The raster is built once; reduce() then aggregates it onto any analysis
+    grid. Large rasters are spilled to a temporary memory-mapped file.
+    """
+
+    def __init__(self, buildings, resolution=RASTER_RESOLUTION_METERS, spatial_index=None):
+        """
+        Rasterize building footprints
+
+        Args:
+            buildings (GeoDataFrame): Building footprints
+            resolution (float): Pixel size in meters
+            spatial_index (SpatialIndex): Shared run index (optional)
+        """
+        if spatial_index is not None:
+            buildings_clean = spatial_index.layer('buildings')
+            self.heights = buildings_clean['height_m'].to_numpy(dtype=float)
+            geoms = spatial_index.geometries('buildings')
+            tree = spatial_index.tree('buildings')
+        else:
+            buildings_clean = filter_polygon_geometries(buildings)
+            self.heights = estimate_building_heights(buildings_clean).to_numpy(dtype=float)
+            geoms = np.asarray(buildings_clean.geometry.values, dtype=object)
+            tree = shapely.STRtree(geoms)
+
+        self.resolution = float(resolution)
+        self.n_buildings = len(geoms)
+
+        # Snap the raster origin to a global lattice of pixel multiples so that
+        # rasters built over different extents (e.g. tiles) share pixel centres
+        minx, miny, maxx, maxy = buildings_clean.total_bounds
+        self.left = math.floor(minx / self.resolution) * self.resolution
+        bottom = math.floor(miny / self.resolution) * self.resolution
+        self.width = max(1, math.ceil((maxx - self.left) / self.resolution))
+        self.height = max(1, math.ceil((maxy - bottom) / self.resolution))
+        self.top = bottom + self.height * self.resolution
+        self.strip_rows = max(1, RASTER_MAX_STRIP_PIXELS // self.width)
+
+        self.ids = self._allocate()
+        self._rasterize(geoms, tree)
+
+    def _allocate(self):
+        """Allocate the ID raster in memory or as a temporary memmap"""
+        n_pixels = self.width * self.height
+
+        if n_pixels > RASTER_MEMMAP_THRESHOLD_PIXELS:
+            logger.info(f"Raster has {n_pixels:,} pixels; using disk-backed memmap.")
+            self._tmpfile = tempfile.TemporaryFile()
+            return np.memmap(self._tmpfile, dtype=np.int32, mode='w+',
+                             shape=(self.height, self.width))
+
+        return np.full((self.height, self.width), -1, dtype=np.int32)
+
+    def _rasterize(self, geoms, tree):
+        """Burn building positions into the ID raster strip by strip"""
+        from rasterio.features import rasterize
+        from rasterio.transform import from_origin
+
+        logger.info(f"Rasterizing {self.n_buildings} footprints at {self.resolution}m "
+                    f"({self.width}x{self.height} pixels)...")
+
+        for i0 in range(0, self.height, self.strip_rows):
+            i1 = min(i0 + self.strip_rows, self.height)
+            strip_top = self.top - i0 * self.resolution
+            strip_bottom = self.top - i1 * self.resolution
+
+            candidates = tree.query(
+                box(self.left, strip_bottom, self.left + self.width * self.resolution, strip_top),
+                predicate='intersects'
+            )
+
+            if len(candidates) == 0:
+                self.ids[i0:i1] = -1
+                continue
+
+            self.ids[i0:i1] = rasterize(
+                ((geoms[pos], int(pos)) for pos in np.sort(candidates)),
+                out_shape=(i1 - i0, self.width),
+                transform=from_origin(self.left, strip_top, self.resolution, self.resolution),
+                fill=-1,
+                dtype='int32'
+            )
+
+    def reduce(self, grid):
+        """
+        Aggregate the raster onto an analysis grid
+
+        Pixels are assigned to cells by their centre, so any grid size or
+        origin works without re-rasterizing.
+
+        Args:
+            grid (GeoDataFrame): Analysis grid
+
+        Returns:
+            DataFrame: Metrics indexed by grid_id
+        """
+        n_cells = len(grid)
+        cell_area = shapely.area(np.asarray(grid.geometry.values, dtype=object))
+        built_pixels = np.zeros(n_cells)
+        pair_chunks = []
+
+        if n_cells > 0 and self.n_buildings > 0:
+            x0, y0, grid_size, rows, cols = grid_lattice(grid)
+            n_rows, n_cols = int(rows.max()) + 1, int(cols.max()) + 1
+
+            # Dense lattice -> grid position lookup (-1 where a cell was dropped)
+            lookup = np.full(n_rows * n_cols, -1, dtype=np.int64)
+            lookup[rows * n_cols + cols] = np.arange(n_cells)
+
+            px_x = self.left + (np.arange(self.width) + 0.5) * self.resolution
+            pix_col = np.floor((px_x - x0) / grid_size).astype(np.int64)
+            col_ok = (pix_col >= 0) & (pix_col < n_cols)
+
+            for i0 in range(0, self.height, self.strip_rows):
+                i1 = min(i0 + self.strip_rows, self.height)
+                ids = np.asarray(self.ids[i0:i1])
+
+                px_y = self.top - (np.arange(i0, i1) + 0.5) * self.resolution
+                pix_row = np.floor((px_y - y0) / grid_size).astype(np.int64)
+                row_ok = (pix_row >= 0) & (pix_row < n_rows)
+
+                valid = (ids >= 0) & row_ok[:, None] & col_ok[None, :]
+                if not valid.any():
+                    continue
+
+                r_idx, c_idx = np.nonzero(valid)
+                cell_pos = lookup[pix_row[r_idx] * n_cols + pix_col[c_idx]]
+                bldg_pos = ids[r_idx, c_idx].astype(np.int64)
+
+                inside = cell_pos >= 0
+                cell_pos, bldg_pos = cell_pos[inside], bldg_pos[inside]
+
+                built_pixels += np.bincount(cell_pos, minlength=n_cells)
+                pair_chunks.append(np.unique(cell_pos * self.n_buildings + bldg_pos))
+
+        built_area = built_pixels * self.resolution ** 2
+        building_count = np.zeros(n_cells, dtype=np.int64)
+        height_sum = np.zeros(n_cells)
+
+        if pair_chunks:
+            pairs = np.unique(np.concatenate(pair_chunks))
+            pair_cells = pairs // self.n_buildings
+            pair_bldgs = pairs % self.n_buildings
+            building_count = np.bincount(pair_cells, minlength=n_cells)
+            height_sum = np.bincount(pair_cells, weights=self.heights[pair_bldgs],
+                                     minlength=n_cells)
+
+        return metrics_from_aggregates(grid['grid_id'], cell_area, built_area,
+                                       building_count, height_sum)
+
+
+def get_building_raster(buildings, resolution=RASTER_RESOLUTION_METERS, spatial_index=None):
+    """
+    Building raster for a footprint frame, built once per frame and resolution
+
+    Later calls with the same buildings frame (or SpatialIndex) and
+    resolution return the cached raster, so changing the grid size only
+    repeats the reduction. Frames must not be modified in place between calls.
+
+    Args:
+        buildings (GeoDataFrame): Building footprints
+        resolution (float): Pixel size in meters
+        spatial_index (SpatialIndex): Shared run index (optional; used as the cache key)
+
+    Returns:
+        BuildingRaster: Cached or newly built raster
+    """
+    source = spatial_index if spatial_index is not None else buildings
+    n_rows = len(spatial_index.layer('buildings')) if spatial_index is not None else len(buildings)
+    key = (id(source), n_rows, float(resolution))
+
+    entry = _raster_cache.get(key)
+    if entry is not None and entry[0]() is source:
+        logger.info(f"Reusing building raster at {resolution}m.")
+        return entry[1]
+
+    raster = BuildingRaster(buildings, resolution=resolution, spatial_index=spatial_index)
+    _raster_cache[key] = (weakref.ref(source), raster)
+    weakref.finalize(source, _raster_cache.pop, key, None)
+    return raster
+
+
+def clear_raster_cache():
+    """Drop all cached building rasters"""
+    _raster_cache.clear()
+
+
+def compute_morphology_metrics_raster(grid, buildings, resolution=RASTER_RESOLUTION_METERS,
+                                      spatial_index=None, building_raster=None):
+    """
+    Raster counterpart of morphology.compute_morphology_metrics
+
+    Args:
+        grid (GeoDataFrame): Analysis grid
+        buildings (GeoDataFrame): Building footprints
+        resolution (float): Sub-grid pixel size in meters
+        spatial_index (SpatialIndex): Shared run index (optional)
+        building_raster (BuildingRaster): Prebuilt raster to reuse (optional;
+            by default the raster is cached per buildings frame and resolution)
+
+    Returns:
+        DataFrame: Metrics indexed by grid_id
+    """
+    if building_raster is None:
+        buildings_clean = (spatial_index.layer('buildings') if spatial_index is not None
+                           else filter_polygon_geometries(buildings))
+        if buildings_clean.empty:
+            logger.warning("No polygon geometries found in buildings. Using empty-cell defaults.")
+            zeros = np.zeros(len(grid))
+            return metrics_from_aggregates(grid['grid_id'], zeros, zeros,
+                                           zeros.astype(np.int64), zeros)
+        building_raster = get_building_raster(buildings, resolution=resolution,
+                                              spatial_index=spatial_index)
+
+    return building_raster.reduce(grid)
+
+
+def validate_against_vector(grid, buildings, raster_metrics=None, vector_metrics=None,
+                            tolerance=RASTER_VALIDATION_TOLERANCE, spatial_index=None):
+    """
+    Compare raster-engine metrics with the exact vector engine
+
+    Args:
+        grid (GeoDataFrame): Analysis grid
+        buildings (GeoDataFrame): Building footprints
+        raster_metrics (DataFrame): Raster engine result (computed if None)
+        vector_metrics (DataFrame): Vector engine result (computed if None)
+        tolerance (dict): Allowed mean absolute error per metric
+        spatial_index (SpatialIndex): Shared run index (optional)
+
+    Returns:
+        dict: {metric: {'mean_abs_error', 'max_abs_error', 'tolerance', 'within_tolerance'}}
+    """
+    if raster_metrics is None:
+        raster_metrics = compute_morphology_metrics_raster(grid, buildings,
+                                                           spatial_index=spatial_index)
+    if vector_metrics is None:
+        vector_metrics = compute_morphology_metrics(grid, buildings,
+                                                    spatial_index=spatial_index)
+
+    report = {}
+    for metric, limit in tolerance.items():
+        diff = (raster_metrics[metric] - vector_metrics[metric]).abs()
+        mae = float(diff.mean()) if len(diff) else 0.0
+        report[metric] = {
+            'mean_abs_error': mae,
+            'max_abs_error': float(diff.max()) if len(diff) else 0.0,
+            'tolerance': limit,
+            'within_tolerance': mae <= limit
+        }
+        logger.info(f"Raster vs vector {metric}: MAE {mae:.4f} (tolerance {limit})")
+
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Raster morphology module loaded successfully.")
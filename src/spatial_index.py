@@ -0,0 +1,188 @@
+"""
+Spatial Index Module
+Shared STRtree-backed index over the vector layers of a pipeline run
+Built once after data fetching and passed to morphology, nbs_logic and visualization
+"""
+
+import numpy as np
+import geopandas as gpd
+import shapely
+from shapely.geometry import box
+import logging
+
+from .config import CRS_UTM
+from .morphology import filter_polygon_geometries, estimate_building_heights
+
+logger = logging.getLogger(__name__)
+
+
+class SpatialIndex:
+    """
+    Reusable spatial index over buildings, streets and green/blue features.
+
+    Each layer keeps its (cleaned) GeoDataFrame, a flat geometry array and a
+    shapely STRtree. All query methods are bulk operations: they take an array
+    of geometries and return positional index pairs into (input, layer).
+
+    Buildings are filtered to polygon geometries and carry a 'height_m'
+    column, so downstream stages never need to re-filter or re-estimate.
+    """
+
+    LAYERS = ('buildings', 'streets', 'green_blue')
+
+    def __init__(self, buildings=None, streets=None, green_blue=None):
+        """
+        Build the index for all provided layers
+
+        Args:
+            buildings (GeoDataFrame): Building footprints
+            streets (GeoDataFrame): Street network edges
+            green_blue (GeoDataFrame): Existing green/blue spaces
+        """
+        self._frames = {}
+        self._geoms = {}
+        self._trees = {}
+
+        if buildings is not None and not buildings.empty:
+            buildings = filter_polygon_geometries(buildings)
+            buildings['height_m'] = estimate_building_heights(buildings)
+
+        self._add_layer('buildings', buildings)
+        self._add_layer('streets', streets)
+        self._add_layer('green_blue', green_blue)
+
+        logger.info("Spatial index built: " + ", ".join(
+            f"{name}={len(self._geoms[name])}" for name in self.LAYERS
+        ))
+
+    def _add_layer(self, name, gdf):
+        """Register a layer and build its STRtree"""
+        if gdf is None or gdf.empty:
+            gdf = gpd.GeoDataFrame(geometry=[], crs=CRS_UTM)
+
+        geoms = np.asarray(gdf.geometry.values, dtype=object)
+        self._frames[name] = gdf
+        self._geoms[name] = geoms
+        self._trees[name] = shapely.STRtree(geoms)
+
+    def layer(self, name):
+        """
+        Get the (cleaned) GeoDataFrame of a layer
+
+        Args:
+            name (str): Layer name ('buildings', 'streets' or 'green_blue')
+
+        Returns:
+            GeoDataFrame: Layer features
+        """
+        return self._frames[name]
+
+    def geometries(self, name):
+        """
+        Get the flat geometry array of a layer
+
+        Args:
+            name (str): Layer name
+
+        Returns:
+            ndarray: Array of shapely geometries
+        """
+        return self._geoms[name]
+
+    def tree(self, name):
+        """
+        Get the STRtree of a layer
+
+        Args:
+            name (str): Layer name
+
+        Returns:
+            STRtree: Tree over the layer's geometry array
+        """
+        return self._trees[name]
+
+    def is_empty(self, name):
+        """Check whether a layer has no features"""
+        return len(self._geoms[name]) == 0
+
+    def query(self, name, geometries, predicate='intersects'):
+        """
+        Bulk spatial predicate query against a layer
+
+        Args:
+            name (str): Layer name
+            geometries: Array-like of query geometries
+            predicate (str): Shapely binary predicate
+
+        Returns:
+            tuple: (input_positions, layer_positions) integer arrays
+        """
+        geometries = np.asarray(geometries, dtype=object)
+        input_pos, layer_pos = self._trees[name].query(geometries, predicate=predicate)
+        return input_pos, layer_pos
+
+    def nearest(self, name, geometries, max_distance=None):
+        """
+        Nearest layer feature for each query geometry
+
+        Args:
+            name (str): Layer name
+            geometries: Array-like of query geometries
+            max_distance (float): Search radius in meters (optional)
+
+        Returns:
+            tuple: (input_positions, layer_positions, distances)
+        """
+        geometries = np.asarray(geometries, dtype=object)
+
+        if self.is_empty(name) or len(geometries) == 0:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty, np.zeros(0)
+
+        (input_pos, layer_pos), distances = self._trees[name].query_nearest(
+            geometries,
+            max_distance=max_distance,
+            return_distance=True,
+            all_matches=False
+        )
+        return input_pos, layer_pos, distances
+
+    def within_distance(self, name, geometries, distance):
+        """
+        All layer features within a distance of each query geometry
+
+        Args:
+            name (str): Layer name
+            geometries: Array-like of query geometries
+            distance (float): Distance in meters
+
+        Returns:
+            tuple: (input_positions, layer_positions) integer arrays
+        """
+        geometries = np.asarray(geometries, dtype=object)
+        input_pos, layer_pos = self._trees[name].query(
+            geometries, predicate='dwithin', distance=distance
+        )
+        return input_pos, layer_pos
+
+    def subset(self, name, bounds):
+        """
+        Features of a layer intersecting a bounding box
+
+        Args:
+            name (str): Layer name
+            bounds (tuple): (minx, miny, maxx, maxy)
+
+        Returns:
+            GeoDataFrame: Matching features
+        """
+        if self.is_empty(name):
+            return self._frames[name]
+
+        positions = self._trees[name].query(box(*bounds), predicate='intersects')
+        return self._frames[name].iloc[np.sort(positions)]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Spatial index module loaded successfully.")
@@ -4,6 +4,7 @@ Handles interaction with SpatialBound API for 4D visualization
 """
 
 import os
+import gzip
 import logging
 from pathlib import Path
 from typing import Dict, Optional, Tuple
@@ -121,8 +122,9 @@ class SpatialBoundClient:
             logger.error(f"✗ Data file not found: {data_file}")
             return False
         
-        # Read file content
-        with open(data_file, 'r') as f:
+        # Read file content (gzipped CityJSON is decompressed)
+        opener = gzip.open if data_file.suffix == '.gz' else open
+        with opener(data_file, 'rt') as f:
             data_content = json.load(f)
         
         payload = {
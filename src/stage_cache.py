@@ -0,0 +1,223 @@
+"""
+Stage Cache Module
+Content-addressed memoization of main.py pipeline stages
+
+Each stage's result is stored under a key hashed from its inputs:
+- data fingerprints of the layers it consumes (geometry WKB + attributes)
+- the config constants referenced by the modules implementing the stage
+- the source code of those modules (the code version)
+- upstream stage keys and explicit parameters
+
+A rerun therefore recomputes only the stages whose inputs changed; e.g.
+editing a cost in config.NBS_TYPES invalidates planning and the stages
+after it, but not morphology.
+"""
+
+import re
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import shapely
+import logging
+
+from . import config
+from .config import STAGE_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+_CONSTANT_NAME = re.compile(r'\b[A-Z][A-Z0-9_]+\b')
+
+
+def _canonical(value):
+    """JSON-serializable, order-stable form of a config value"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(_canonical(v)) for v in value)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def frame_fingerprint(df):
+    """
+    Hash the content of a (Geo)DataFrame
+
+    Args:
+        df: DataFrame or GeoDataFrame (None hashes as empty)
+
+    Returns:
+        str: SHA-256 hex digest of the CRS, columns, geometry WKB and attributes
+    """
+    digest = hashlib.sha256()
+    if df is None:
+        return digest.hexdigest()
+
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(str(len(df)).encode())
+
+    attributes = df
+    geometry_name = getattr(df, '_geometry_column_name', None)
+    if geometry_name is not None and geometry_name in df.columns:
+        digest.update(str(df.crs).encode())
+        wkb = shapely.to_wkb(np.asarray(df.geometry.values, dtype=object))
+        digest.update(b''.join(w if w is not None else b'' for w in wkb))
+        attributes = pd.DataFrame(df.drop(columns=geometry_name))
+
+    try:
+        hashed = pd.util.hash_pandas_object(attributes, index=True)
+    except TypeError:
+        # Unhashable cell values (lists, dicts from OSM tags)
+        attributes = attributes.copy()
+        for col in attributes.columns[attributes.dtypes == object]:
+            attributes[col] = attributes[col].astype(str)
+        hashed = pd.util.hash_pandas_object(attributes, index=True)
+    digest.update(hashed.to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def config_fingerprint(modules):
+    """
+    Hash the config constants referenced by a set of modules
+
+    Constants are found by scanning each module's source for upper-case
+    names defined in config, so function-local config imports count too.
+
+    Args:
+        modules (list): Imported modules
+
+    Returns:
+        str: SHA-256 hex digest of the referenced config values
+    """
+    names = set()
+    for module in modules:
+        names.update(name for name in _CONSTANT_NAME.findall(inspect.getsource(module))
+                     if hasattr(config, name))
+
+    subset = {name: _canonical(getattr(config, name)) for name in sorted(names)}
+    return hashlib.sha256(json.dumps(subset, sort_keys=True).encode()).hexdigest()
+
+
+def code_fingerprint(modules):
+    """
+    Hash the source code of a set of modules
+
+    Args:
+        modules (list): Imported modules
+
+    Returns:
+        str: SHA-256 hex digest of the module sources
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(Path(inspect.getsourcefile(module)).read_bytes())
+    return digest.hexdigest()
+
+
+def stage_key(stage, modules=(), **inputs):
+    """
+    Content-addressed key of one stage run
+
+    Args:
+        stage (str): Stage name
+        modules (list): Modules implementing the stage (config subset and code version)
+        **inputs: Fingerprints, upstream keys and parameters (JSON-serializable)
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    payload = {
+        'stage': stage,
+        'config': config_fingerprint(modules) if modules else None,
+        'code': code_fingerprint(modules) if modules else None,
+        'inputs': _canonical(inputs),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class StageCache:
+    """
+    On-disk store of stage results keyed by stage_key
+
+    Results are pickled with the highest protocol (out-of-band numpy
+    buffers, no text encoding), one file per stage and key:
+    <cache_dir>/<stage>/<key>.pkl
+    """
+
+    def __init__(self, cache_dir=STAGE_CACHE_DIR, enabled=True):
+        """
+        Args:
+            cache_dir: Cache directory
+            enabled (bool): When False, get() always misses and put() is a no-op
+        """
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+
+    def _path(self, stage, key):
+        """File holding one stage result"""
+        return self.cache_dir / re.sub(r'\W+', '_', stage.lower()) / f"{key}.pkl"
+
+    def get(self, stage, key):
+        """
+        Load a stage result
+
+        Args:
+            stage (str): Stage name
+            key (str): Stage key
+
+        Returns:
+            Stored result, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        path = self._path(stage, key)
+        if not path.exists():
+            logger.info(f"Stage cache miss: {stage} ({key[:12]})")
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable stage cache entry {path}: {e}")
+            return None
+
+        logger.info(f"Stage cache hit: {stage} ({key[:12]})")
+        return result
+
+    def put(self, stage, key, result):
+        """
+        Store a stage result (written atomically)
+
+        Args:
+            stage (str): Stage name
+            key (str): Stage key
+            result: Picklable stage output
+        """
+        if not self.enabled:
+            return
+
+        path = self._path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        logger.debug(f"Stored stage result: {stage} ({key[:12]})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print("Stage cache module loaded successfully.")
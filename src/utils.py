@@ -9,9 +9,11 @@ import sys
 from pathlib import Path
 from datetime import datetime
 import json
+import time
 import pickle
 
 from .config import LOG_LEVEL, LOG_FORMAT, LOG_FILE, PROJECT_ROOT
+from . import profiling
 
 
 def setup_logging(log_file=LOG_FILE, log_level=LOG_LEVEL):
@@ -435,21 +437,36 @@ def print_summary(stats):
 
 
 class Timer:
-    """Context manager for timing code blocks"""
+    """
+    Context manager for timing code blocks
+
+    Wall time is measured with perf_counter. If a timings dict is given,
+    the duration (seconds) is added to timings[name] on exit, so repeated
+    stages accumulate. When a profiler is active (see src/profiling.py),
+    the block is also recorded as a span with CPU time and memory.
+    """
     
-    def __init__(self, name="Operation"):
+    def __init__(self, name="Operation", timings=None):
         self.name = name
+        self.timings = timings
+        self.duration = None
         self.logger = logging.getLogger(__name__)
     
     def __enter__(self):
         self.start_time = datetime.now()
         self.logger.info(f"Starting: {self.name}")
+        self._span = profiling.span(self.name)
+        self._span.__enter__()
+        self._start = time.perf_counter()
         return self
     
     def __exit__(self, *args):
+        self.duration = time.perf_counter() - self._start
         self.end_time = datetime.now()
-        duration = (self.end_time - self.start_time).total_seconds()
-        self.logger.info(f"Completed: {self.name} in {duration:.2f} seconds")
+        self._span.__exit__(*args)
+        if self.timings is not None:
+            self.timings[self.name] = self.timings.get(self.name, 0.0) + self.duration
+        self.logger.info(f"Completed: {self.name} in {self.duration:.3f} seconds")
 
 
 if __name__ == "__main__":
@@ -24,8 +24,26 @@ plt.rcParams['font.family'] = 'sans-serif'
 plt.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans']
 
 
+def clip_to_extent(gdf, layer, extent_gdf, spatial_index=None):
+    """
+    Restrict a context layer to the features inside the mapped extent
+    
+    Args:
+        gdf: Context layer (streets or green/blue spaces)
+        layer: Layer name in the spatial index
+        extent_gdf: GeoDataFrame whose bounds define the map extent
+        spatial_index: Shared run index (optional)
+    
+    Returns:
+        GeoDataFrame: Features within the extent (unchanged without an index)
+    """
+    if spatial_index is None or extent_gdf.empty:
+        return gdf
+    return spatial_index.subset(layer, extent_gdf.total_bounds)
+
+
 def plot_nbs_map(nbs_gdf, streets_gdf, green_blue_gdf, wind_dir, 
-                 output_path=None, title=None):
+                 output_path=None, title=None, spatial_index=None):
     """
     Create comprehensive NbS intervention map
     
@@ -36,12 +54,16 @@ def plot_nbs_map(nbs_gdf, streets_gdf, green_blue_gdf, wind_dir,
         wind_dir: Prevailing wind direction
         output_path: Path to save the map
         title: Custom title (optional)
+        spatial_index: Shared run index (optional)
     
     Returns:
         Figure: Matplotlib figure object
     """
     logger.info("Creating NbS intervention map...")
     
+    streets_gdf = clip_to_extent(streets_gdf, 'streets', nbs_gdf, spatial_index)
+    green_blue_gdf = clip_to_extent(green_blue_gdf, 'green_blue', nbs_gdf, spatial_index)
+    
     fig, ax = plt.subplots(1, 1, figsize=MAP_FIGSIZE)
     
     # Plot streets as background
@@ -158,7 +180,7 @@ def add_wind_arrow(ax, wind_dir, gdf):
     )
 
 
-def plot_morphology_maps(analysis_gdf, streets_gdf, output_dir=None):
+def plot_morphology_maps(analysis_gdf, streets_gdf, output_dir=None, spatial_index=None):
     """
     Create multiple maps showing different morphology metrics
     
@@ -166,12 +188,15 @@ def plot_morphology_maps(analysis_gdf, streets_gdf, output_dir=None):
         analysis_gdf: GeoDataFrame with morphology data
         streets_gdf: Street network
         output_dir: Directory to save maps
+        spatial_index: Shared run index (optional)
     
     Returns:
         Figure: Matplotlib figure with subplots
     """
     logger.info("Creating morphology maps...")
     
+    streets_gdf = clip_to_extent(streets_gdf, 'streets', analysis_gdf, spatial_index)
+    
     fig, axes = plt.subplots(2, 2, figsize=(18, 16))
     axes = axes.flatten()
     
@@ -429,7 +454,7 @@ def plot_cost_benefit_analysis(summary_df, output_path=None):
 
 
 def create_dashboard(nbs_gdf, streets_gdf, green_blue_gdf, summary_df, wind_dir, 
-                     output_path=None):
+                     output_path=None, spatial_index=None):
     """
     Create comprehensive dashboard with multiple visualizations
     
@@ -440,12 +465,16 @@ def create_dashboard(nbs_gdf, streets_gdf, green_blue_gdf, summary_df, wind_dir,
         summary_df: Summary statistics
         wind_dir: Prevailing wind direction
         output_path: Path to save dashboard
+        spatial_index: Shared run index (optional)
     
     Returns:
         Figure: Matplotlib figure
     """
     logger.info("Creating comprehensive dashboard...")
     
+    streets_gdf = clip_to_extent(streets_gdf, 'streets', nbs_gdf, spatial_index)
+    green_blue_gdf = clip_to_extent(green_blue_gdf, 'green_blue', nbs_gdf, spatial_index)
+    
     fig = plt.figure(figsize=(20, 14))
     gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
     
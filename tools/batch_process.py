@@ -2,21 +2,241 @@
 """
 Batch Processing Tool for Multiple Locations
 Allows running NbS analysis for multiple locations from a CSV file
+
+Locations run concurrently with two separate limits: network-bound OSM
+fetches warm the tile cache in a thread pool, and CPU-bound morphology,
+planning and reporting run in a process pool as soon as a location's
+data is cached. A job ledger (batch_ledger.json) records finished
+locations, so a rerun skips those whose outputs exist and whose inputs
+(coordinates, radius, grid size, NbS rule table) are unchanged.
+
+With --shared-store, the OSM layers for all locations are loaded once
+into a shared store covering their union extent, and each location
+slices its own area from it instead of fetching and parsing its own.
 """
 
 import sys
 import csv
+import json
+import os
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor,
+                                wait, FIRST_COMPLETED)
+from datetime import datetime
 from pathlib import Path
 import argparse
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src import utils
+from src import config, utils
+
+# Stages reported in batch_summary.csv (Timer names used by main.main)
+STAGES = [
+    'Cache warm-up',
+    'Data fetching',
+    'Spatial index construction',
+    'Morphology analysis',
+    'NbS planning',
+    'Visualization generation',
+    'Report generation',
+]
+
+OSM_SOURCES = ('buildings', 'streets', 'green_blue')
+
+
+def stage_column(stage):
+    """Summary CSV column for a stage, e.g. 'NbS planning' -> 'nbs_planning_s'"""
+    return stage.lower().replace(' ', '_').replace('-', '_') + '_s'
+
+
+class JobLedger:
+    """
+    Persistent record of completed batch locations
+
+    Entries are keyed by location directory name and hold the input hash,
+    status, output directory, completion time and stage timings. The file
+    is rewritten atomically after every completed location, so an
+    interrupted batch resumes where it stopped.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"WARNING: Ignoring unreadable ledger {self.path}: {e}")
+
+    def is_complete(self, key, input_hash, output_dir):
+        """
+        Check whether a location can be skipped
+
+        Args:
+            key (str): Location key
+            input_hash (str): Hash of the location's current inputs
+            output_dir: Location output directory
+
+        Returns:
+            bool: True if it succeeded with the same inputs and its report exists
+        """
+        entry = self.entries.get(key)
+        if not entry or entry.get('status') != 'SUCCESS' or entry.get('input_hash') != input_hash:
+            return False
+        return any((Path(output_dir) / 'reports').glob('nbs_statistics_*.json'))
+
+    def record(self, key, entry):
+        """Store an entry and persist the ledger"""
+        self.entries[key] = entry
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def input_hash(lat, lon, radius, grid_size, rules_path=config.NBS_RULES_PATH):
+    """
+    Hash the inputs that determine a location's outputs
+
+    Args:
+        lat (float): Latitude
+        lon (float): Longitude
+        radius (int): Analysis radius in meters
+        grid_size (int): Grid cell size in meters
+        rules_path: NbS rule table (its content is hashed when present)
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    rules_hash = None
+    if rules_path and Path(rules_path).exists():
+        rules_hash = hashlib.sha256(Path(rules_path).read_bytes()).hexdigest()
+
+    payload = json.dumps({
+        'lat': round(lat, 6),
+        'lon': round(lon, 6),
+        'radius': radius,
+        'grid_size': grid_size,
+        'rules': rules_hash,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _warm_cache(job):
+    """
+    Fetch a location's OSM layers into the tile cache (thread pool)
+
+    Args:
+        job (dict): Location job
+
+    Returns:
+        dict: {source: error} for layers that could not be fetched
+    """
+    from src import data_loader
+
+    data = data_loader.fetch_all_data(
+        lat=job['lat'], lon=job['lon'], dist=job['radius'],
+        use_cache=True, sources=OSM_SOURCES
+    )
+    return data['errors']
+
+
+def _run_location(job):
+    """
+    Run the full analysis for one location (process pool)
+
+    Args:
+        job (dict): Location job
+
+    Returns:
+        dict: Result row with status, error, total_seconds and timings
+    """
+    # Import main here to avoid circular imports
+    from main import main as run_analysis
+
+    timings = dict(job['timings'])
+    status, error = 'ERROR', ''
+    start = time.perf_counter()
+
+    try:
+        success = run_analysis(
+            lat=job['lat'],
+            lon=job['lon'],
+            radius=job['radius'],
+            grid_size=job['grid_size'],
+            output_dir=job['output_dir'],
+            no_cache=job['no_cache'],
+            quick_mode=False,
+            provider=job.get('provider') or config.DATA_PROVIDER,
+            timings=timings
+        )
+        status = 'SUCCESS' if success else 'FAILED'
+    except Exception as e:
+        error = str(e)
+
+    return {
+        'status': status,
+        'error': error,
+        'total_seconds': time.perf_counter() - start + timings.get('Cache warm-up', 0.0),
+        'timings': timings,
+    }
+
+
+def build_batch_store(jobs, store_dir, no_cache=False):
+    """
+    Load the OSM layers of all jobs once into a shared store
+
+    Args:
+        jobs (list): Location jobs
+        store_dir: Store directory
+        no_cache (bool): Bypass the tile cache while loading
+
+    Returns:
+        SharedStoreProvider: Provider slicing the store
+    """
+    from src import data_loader
+    from src.providers import SharedStoreProvider
+
+    bounds_list = [data_loader.get_study_area_bounds(job['lat'], job['lon'], job['radius'])
+                   for job in jobs]
+
+    manifest = data_loader.build_shared_store(bounds_list, store_dir, use_cache=not no_cache)
+
+    counts = ', '.join(f"{count} {layer}" for layer, count in manifest['layers'].items())
+    print(f"Shared store: {counts} -> {store_dir}")
+    return SharedStoreProvider(store_dir)
+
+
+def _summary_row(job, status, error='', total_seconds=None, timings=None):
+    """Flatten a job result into a batch_summary.csv row"""
+    row = {
+        'name': job['name'],
+        'latitude': job['lat'],
+        'longitude': job['lon'],
+        'status': status,
+        'output_dir': str(job['output_dir']),
+        'error': error,
+        'total_seconds': None if total_seconds is None else round(total_seconds, 2),
+    }
+    timings = timings or {}
+    for stage in STAGES:
+        value = timings.get(stage)
+        row[stage_column(stage)] = None if value is None else round(value, 2)
+    return row
 
 
 def process_locations_from_csv(csv_file, output_base_dir=None, grid_size=150, 
-                               radius=1500, no_cache=False):
+                               radius=1500, no_cache=False,
+                               fetch_workers=config.BATCH_FETCH_WORKERS,
+                               analysis_workers=config.BATCH_ANALYSIS_WORKERS,
+                               force=False, shared_store=False):
     """
     Process multiple locations from CSV file
     
@@ -28,11 +248,13 @@ def process_locations_from_csv(csv_file, output_base_dir=None, grid_size=150,
         output_base_dir: Base directory for outputs
         grid_size: Default grid size
         radius: Default analysis radius
-        no_cache: Disable caching
+        no_cache: Disable caching (also disables the fetch pool)
+        fetch_workers: Concurrent network-bound fetches (threads)
+        analysis_workers: Concurrent CPU-bound analyses (processes)
+        force: Re-run every location, ignoring the job ledger
+        shared_store: Load OSM layers once for the union extent of all
+            locations and slice each location from the shared store
     """
-    # Import main here to avoid circular imports
-    from main import main as run_analysis
-    
     csv_path = Path(csv_file)
     
     if not csv_path.exists():
@@ -57,76 +279,186 @@ def process_locations_from_csv(csv_file, output_base_dir=None, grid_size=150,
     
     print(f"\n{'='*70}")
     print(f"BATCH PROCESSING: {len(locations)} LOCATIONS")
+    print(f"Fetch workers: {0 if no_cache or shared_store else fetch_workers}, "
+          f"analysis workers: {analysis_workers}")
     print(f"{'='*70}\n")
     
-    results = []
+    ledger = JobLedger(output_base_dir / config.BATCH_LEDGER_NAME)
+    
+    jobs = []
+    skipped = []
     
     for idx, location in enumerate(locations, 1):
-        name = location.get('name', f'Location_{idx}')
+        name = location.get('name') or f'Location_{idx}'
         lat = float(location['latitude'])
         lon = float(location['longitude'])
-        loc_radius = int(location.get('radius', radius))
-        loc_grid = int(location.get('grid_size', grid_size))
-        
-        print(f"\n{'='*70}")
-        print(f"PROCESSING {idx}/{len(locations)}: {name}")
-        print(f"Coordinates: ({lat}, {lon})")
-        print(f"{'='*70}\n")
+        loc_radius = int(location.get('radius') or radius)
+        loc_grid = int(location.get('grid_size') or grid_size)
         
         # Create location-specific output directory
-        location_dir = output_base_dir / name.replace(' ', '_').replace(',', '')
+        key = name.replace(' ', '_').replace(',', '')
+        job = {
+            'key': key,
+            'name': name,
+            'lat': lat,
+            'lon': lon,
+            'radius': loc_radius,
+            'grid_size': loc_grid,
+            'output_dir': output_base_dir / key,
+            'no_cache': no_cache,
+            'input_hash': input_hash(lat, lon, loc_radius, loc_grid),
+            'timings': {},
+        }
         
-        try:
-            success = run_analysis(
-                lat=lat,
-                lon=lon,
-                radius=loc_radius,
-                grid_size=loc_grid,
-                output_dir=location_dir,
-                no_cache=no_cache,
-                quick_mode=False
-            )
-            
-            results.append({
-                'name': name,
-                'latitude': lat,
-                'longitude': lon,
-                'status': 'SUCCESS' if success else 'FAILED',
-                'output_dir': str(location_dir)
-            })
+        if not force and ledger.is_complete(key, job['input_hash'], job['output_dir']):
+            skipped.append(job)
+        else:
+            jobs.append(job)
+    
+    if skipped:
+        print(f"Skipping {len(skipped)} location(s) already completed with unchanged inputs "
+              f"(use --force to re-run)")
+    
+    results = {}
+    for job in skipped:
+        entry = ledger.entries[job['key']]
+        results[job['key']] = _summary_row(job, 'SKIPPED',
+                                           total_seconds=entry.get('total_seconds'),
+                                           timings=entry.get('timings'))
+    
+    batch_start = time.perf_counter()
+    
+    store_seconds = None
+    if shared_store and jobs:
+        with utils.Timer("Shared store build") as timer:
+            provider = build_batch_store(jobs, output_base_dir / config.BATCH_SHARED_STORE_NAME,
+                                         no_cache=no_cache)
+        store_seconds = timer.duration
+        for job in jobs:
+            job['provider'] = provider
+    
+    # Spawned workers: the parent already runs fetch threads
+    mp_context = multiprocessing.get_context('spawn')
+    
+    with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as fetch_pool, \
+            ProcessPoolExecutor(max_workers=max(1, analysis_workers),
+                                mp_context=mp_context) as analysis_pool:
+        
+        running = {}
+        
+        def submit_analysis(job):
+            running[analysis_pool.submit(_run_location, job)] = ('analysis', job, time.perf_counter())
+        
+        for job in jobs:
+            if no_cache or shared_store:
+                submit_analysis(job)
+            else:
+                running[fetch_pool.submit(_warm_cache, job)] = ('fetch', job, time.perf_counter())
+        
+        completed = 0
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
             
-        except Exception as e:
-            print(f"\nERROR processing {name}: {e}")
-            results.append({
-                'name': name,
-                'latitude': lat,
-                'longitude': lon,
-                'status': 'ERROR',
-                'error': str(e)
-            })
+            for future in done:
+                kind, job, submitted = running.pop(future)
+                
+                if kind == 'fetch':
+                    # A failed warm-up is not fatal: main.main fetches again
+                    try:
+                        errors = future.result()
+                    except Exception as e:
+                        errors = {'fetch': str(e)}
+                    if errors:
+                        print(f"WARNING: Cache warm-up incomplete for {job['name']}: {errors}")
+                    job['timings'] = {'Cache warm-up': time.perf_counter() - submitted}
+                    submit_analysis(job)
+                    continue
+                
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'status': 'ERROR', 'error': str(e),
+                              'total_seconds': time.perf_counter() - submitted,
+                              'timings': job['timings']}
+                
+                completed += 1
+                print(f"[{completed}/{len(jobs)}] {job['name']}: {result['status']} "
+                      f"({result['total_seconds']:.1f}s)"
+                      + (f" - {result['error']}" if result['error'] else ""))
+                
+                results[job['key']] = _summary_row(job, result['status'], result['error'],
+                                                   result['total_seconds'], result['timings'])
+                ledger.record(job['key'], {
+                    'name': job['name'],
+                    'input_hash': job['input_hash'],
+                    'status': result['status'],
+                    'output_dir': str(job['output_dir']),
+                    'completed_at': datetime.now().isoformat(),
+                    'total_seconds': round(result['total_seconds'], 2),
+                    'timings': {stage: round(value, 2) for stage, value in result['timings'].items()},
+                })
+    
+    elapsed = time.perf_counter() - batch_start
+    throughput = len(jobs) / (elapsed / 3600) if jobs and elapsed > 0 else 0.0
+    
+    # Rows in CSV order, followed by a batch total
+    rows = []
+    for idx, location in enumerate(locations, 1):
+        name = location.get('name') or f'Location_{idx}'
+        key = name.replace(' ', '_').replace(',', '')
+        if key in results:
+            rows.append(results.pop(key))
+    
+    processed = [r for r in rows if r['status'] != 'SKIPPED']
+    total_row = {key: None for key in rows[0]}
+    total_row.update({
+        'name': 'TOTAL',
+        'status': f"{sum(r['status'] == 'SUCCESS' for r in processed)}/{len(processed)} SUCCESS",
+        'output_dir': str(output_base_dir),
+        'total_seconds': round(elapsed, 2),
+    })
+    for stage in STAGES:
+        values = [r[stage_column(stage)] for r in processed if r[stage_column(stage)] is not None]
+        total_row[stage_column(stage)] = round(sum(values), 2) if values else None
+    
+    for row in rows:
+        row['locations_per_hour'] = None
+    total_row['locations_per_hour'] = round(throughput, 2)
     
     # Save summary
     summary_path = output_base_dir / 'batch_summary.csv'
     summary_path.parent.mkdir(parents=True, exist_ok=True)
     
     with open(summary_path, 'w', newline='') as f:
-        if results:
-            writer = csv.DictWriter(f, fieldnames=results[0].keys())
-            writer.writeheader()
-            writer.writerows(results)
+        writer = csv.DictWriter(f, fieldnames=total_row.keys())
+        writer.writeheader()
+        writer.writerows(rows + [total_row])
     
     # Print summary
     print(f"\n{'='*70}")
     print("BATCH PROCESSING COMPLETE")
     print(f"{'='*70}")
     
-    successful = sum(1 for r in results if r['status'] == 'SUCCESS')
-    failed = len(results) - successful
+    successful = sum(1 for r in processed if r['status'] == 'SUCCESS')
+    failed = len(processed) - successful
     
-    print(f"\nTotal Locations: {len(results)}")
+    print(f"\nTotal Locations: {len(rows)}")
+    print(f"Skipped (unchanged): {len(rows) - len(processed)}")
     print(f"Successful: {successful}")
     print(f"Failed: {failed}")
+    print(f"Wall time: {elapsed:.1f}s ({throughput:.1f} locations/hour)")
+    
+    if store_seconds is not None:
+        print(f"Shared store build: {store_seconds:.1f}s")
+    
+    if processed:
+        print("\nStage time (sum over locations):")
+        for stage in STAGES:
+            if total_row[stage_column(stage)] is not None:
+                print(f"  {stage:28s}: {total_row[stage_column(stage)]:10.1f}s")
+    
     print(f"\nSummary saved to: {summary_path}")
+    print(f"Ledger saved to: {ledger.path}")
     print(f"Outputs saved to: {output_base_dir}")
     print(f"{'='*70}\n")
     
@@ -208,6 +540,15 @@ Examples:
   
   # Process without caching
   python tools/batch_process.py --csv locations.csv --no-cache
+  
+  # 8 concurrent fetches, 4 concurrent analyses
+  python tools/batch_process.py --csv locations.csv --fetch-workers 8 --workers 4
+  
+  # Neighbouring wards: load OSM layers once for all locations
+  python tools/batch_process.py --csv wards.csv --shared-store
+  
+  # Re-run everything, ignoring the job ledger
+  python tools/batch_process.py --csv locations.csv --force
 
 CSV Format:
   name,latitude,longitude,radius,grid_size
@@ -261,6 +602,33 @@ CSV Format:
         help='Disable caching (fetch fresh data)'
     )
     
+    parser.add_argument(
+        '--fetch-workers',
+        type=int,
+        default=config.BATCH_FETCH_WORKERS,
+        help=f'Concurrent network fetches (threads, default: {config.BATCH_FETCH_WORKERS})'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=config.BATCH_ANALYSIS_WORKERS,
+        help=f'Concurrent morphology/planning runs (processes, default: {config.BATCH_ANALYSIS_WORKERS})'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Re-run all locations, ignoring the job ledger'
+    )
+    
+    parser.add_argument(
+        '--shared-store',
+        action='store_true',
+        help='Load OSM layers once for the union extent of all locations '
+             'and slice each location from the shared store'
+    )
+    
     args = parser.parse_args()
     
     if args.create_sample:
@@ -281,7 +649,11 @@ CSV Format:
         output_base_dir=args.output_dir,
         grid_size=args.grid_size,
         radius=args.radius,
-        no_cache=args.no_cache
+        no_cache=args.no_cache,
+        fetch_workers=args.fetch_workers,
+        analysis_workers=args.workers,
+        force=args.force,
+        shared_store=args.shared_store
     )
     
     return 0 if success else 1
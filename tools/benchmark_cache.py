@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Data Cache Benchmark
+Compares GeoJSON and GeoParquet DataCache backends on a synthetic buildings
+layer: warm-cache load time and disk usage.
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import geopandas as gpd
+import shapely
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import CRS_UTM, CACHE_BUILDING_COLUMNS
+from src.data_loader import DataCache
+
+
+def make_synthetic_buildings(n_buildings, seed=42):
+    """
+    Create a synthetic OSM-like buildings layer
+
+    Args:
+        n_buildings: Number of footprints
+        seed: Random seed
+
+    Returns:
+        GeoDataFrame: Rectangular footprints with typical OSM attributes
+    """
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 5000, n_buildings)
+    y = rng.uniform(0, 5000, n_buildings)
+    w = rng.uniform(5, 30, n_buildings)
+    h = rng.uniform(5, 30, n_buildings)
+
+    levels = rng.integers(1, 15, n_buildings).astype(str).astype(object)
+    levels[rng.random(n_buildings) < 0.6] = None
+
+    return gpd.GeoDataFrame({
+        'building': rng.choice(['yes', 'residential', 'commercial', 'apartments'], n_buildings),
+        'building:levels': levels,
+        'height': None,
+        'name': None,
+        'addr:street': rng.choice(['Road No. 1', 'Road No. 12', 'MG Road'], n_buildings),
+        'source': 'synthetic',
+    }, geometry=shapely.box(x, y, x + w, y + h), crs=CRS_UTM)
+
+
+def benchmark(n_buildings, repeats=3):
+    """
+    Time warm-cache loads for each backend
+
+    Args:
+        n_buildings: Number of footprints
+        repeats: Number of timing repetitions (best time is reported)
+
+    Returns:
+        list: One result dict per backend
+    """
+    buildings = make_synthetic_buildings(n_buildings)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for cache_format in ('geojson', 'parquet'):
+            cache = DataCache(cache_dir=Path(tmp) / cache_format, cache_format=cache_format)
+            cache.save('buildings', buildings)
+
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                loaded = cache.load('buildings', columns=CACHE_BUILDING_COLUMNS)
+                times.append(time.perf_counter() - start)
+
+            assert len(loaded) == n_buildings
+            results.append({
+                'format': cache.format,
+                'load_seconds': min(times),
+                'size_mb': cache._get_cache_path('buildings').stat().st_size / 1e6,
+            })
+
+    return results
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Benchmark GeoJSON vs GeoParquet data cache'
+    )
+    parser.add_argument('--buildings', type=int, nargs='+', default=[10000, 100000],
+                        help='Layer sizes to benchmark (default: 10000 100000)')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Timing repetitions per size (default: 3)')
+    args = parser.parse_args()
+
+    print(f"\n{'='*70}")
+    print("DATA CACHE BENCHMARK (warm-cache load)")
+    print(f"{'='*70}\n")
+    print(f"{'Buildings':>10s} | {'Format':>8s} | {'Load (s)':>9s} | {'Size (MB)':>9s}")
+    print("-" * 70)
+
+    for n_buildings in args.buildings:
+        for result in benchmark(n_buildings, repeats=args.repeats):
+            print(f"{n_buildings:>10d} | {result['format']:>8s} | "
+                  f"{result['load_seconds']:>9.3f} | {result['size_mb']:>9.2f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
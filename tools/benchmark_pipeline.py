@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark
+Times each public pipeline stage on a reproducible synthetic city, entirely
+offline, and stores the results as JSON so runs can be compared between
+commits.
+
+The synthetic city is a street grid around the Hyderabad center with
+building footprints whose density, size and height fall off from the
+core, OSM-like tags (building, height, building:levels), a street
+network split at intersections, and parks and lakes.
+"""
+
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from pyproj import Transformer
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import config, morphology, nbs_logic, reporting, raster_morphology
+from src.spatial_index import SpatialIndex
+from src.data_3d_generator import Data3DGenerator
+
+BLOCK_SIZE = 120.0      # Street spacing in meters
+STREET_WIDTH = 12.0     # Building-free corridor along each street
+MEAN_FOOTPRINT = 150.0  # m², used to size the city for a building count
+MEAN_COVERAGE = 0.3     # Built fraction of the city area
+
+STAGES = [
+    'spatial_index',
+    'grid',
+    'density',
+    'roughness',
+    'svf',
+    'morphology',
+    'raster',
+    'planning',
+    'summary',
+    'reporting',
+    'export_3d',
+]
+
+
+def parse_scale(value):
+    """Parse a building count such as 1000, 10k or 1m"""
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1], 1)
+    if value[-1] in 'km':
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def generate_synthetic_city(n_buildings, seed=42, lat=config.CITY_LAT, lon=config.CITY_LON):
+    """
+    Generate a synthetic city with realistic density and height gradients
+
+    Building centres follow a radial profile (gamma-distributed distance
+    from the core, i.e. exponentially decaying surface density) and are
+    kept off a regular street grid. Footprints are larger and buildings
+    taller towards the core, and never overlap.
+
+    Args:
+        n_buildings: Number of building footprints
+        seed: Random seed (the same seed always yields the same city)
+        lat: Latitude of the city centre
+        lon: Longitude of the city centre
+
+    Returns:
+        dict: 'buildings', 'streets', 'green_blue' GeoDataFrames in CRS_UTM
+        and 'radius' (city radius in meters)
+    """
+    rng = np.random.default_rng(seed)
+
+    radius = np.sqrt(n_buildings * MEAN_FOOTPRINT / MEAN_COVERAGE / np.pi)
+    cx, cy = Transformer.from_crs(config.CRS_WGS84, config.CRS_UTM,
+                                  always_xy=True).transform(lon, lat)
+
+    # --- Buildings ---
+    # Candidates are drawn in batches; one overlapping an earlier footprint
+    # is rejected, since real footprints never overlap (and overlaps would be
+    # double-counted by the vector engine but not the raster engine)
+    def off_street(v):
+        # Map each coordinate into the interior of its block
+        return np.floor(v / BLOCK_SIZE) * BLOCK_SIZE + STREET_WIDTH / 2 + \
+            np.mod(v, BLOCK_SIZE) * (BLOCK_SIZE - STREET_WIDTH) / BLOCK_SIZE
+
+    def draw(m):
+        r = rng.gamma(2.0, radius / 3.0, m)
+        outside = r > radius
+        r[outside] = rng.uniform(0, radius, outside.sum())
+        theta = rng.uniform(0, 2 * np.pi, m)
+        core = np.exp(-r / (0.4 * radius))
+
+        x = off_street(r * np.cos(theta))
+        y = off_street(r * np.sin(theta))
+
+        area = np.clip(rng.lognormal(np.log(110.0) + 0.8 * core, 0.6), 20.0, 5000.0)
+        aspect = rng.uniform(1.0, 2.2, m)
+        width = np.sqrt(area * aspect)
+        depth = np.sqrt(area / aspect)
+        swap = rng.random(m) < 0.5
+        width, depth = np.where(swap, depth, width), np.where(swap, width, depth)
+
+        footprints = shapely.box(cx + x - width / 2, cy + y - depth / 2,
+                                 cx + x + width / 2, cy + y + depth / 2)
+
+        floors = 1 + rng.poisson(1.0 + 6.0 * core)
+        building_type = np.where(
+            floors >= 6, 'apartments',
+            np.where(core > 0.5, rng.choice(['commercial', 'retail', 'yes'], m),
+                     rng.choice(['house', 'residential', 'yes'], m))
+        )
+        return footprints, floors, building_type
+
+    footprints = np.empty(0, dtype=object)
+    floors = np.empty(0, dtype=np.int64)
+    building_type = np.empty(0, dtype=object)
+    for _ in range(50):
+        missing = n_buildings - len(footprints)
+        if missing <= 0:
+            break
+        batch, batch_floors, batch_type = draw(2 * missing + 100)
+
+        rejected = np.zeros(len(batch), dtype=bool)
+        if len(footprints):
+            hits, _ = shapely.STRtree(footprints).query(batch, predicate='intersects')
+            rejected[hits] = True
+        first, second = shapely.STRtree(batch).query(batch, predicate='intersects')
+        rejected[second[first < second]] = True
+
+        keep = np.flatnonzero(~rejected)[:missing]
+        footprints = np.concatenate([footprints, batch[keep]])
+        floors = np.concatenate([floors, batch_floors[keep]])
+        building_type = np.concatenate([building_type, batch_type[keep]])
+    n_buildings = len(footprints)
+
+    # OSM-like tag coverage: some explicit heights, more level counts
+    tag = rng.random(n_buildings)
+    height = np.where(tag < 0.2, (floors * config.FLOOR_HEIGHT).round(1).astype(str), None)
+    levels = np.where((tag >= 0.2) & (tag < 0.55), floors.astype(str), None)
+
+    buildings = gpd.GeoDataFrame({
+        'element_type': 'way',
+        'osmid': np.arange(1, n_buildings + 1),
+        'building': building_type,
+        'height': height,
+        'building:levels': levels,
+    }, geometry=footprints, crs=config.CRS_UTM)
+
+    # --- Streets: grid lines split at every intersection ---
+    k = int(np.ceil(radius / BLOCK_SIZE))
+    lines = np.arange(-k, k + 1)
+    a, b = np.meshgrid(lines, lines[:-1], indexing='ij')
+    a, b = a.ravel(), b.ravel()
+
+    segments = []
+    for vertical in (True, False):
+        start = np.column_stack([a, b]) * BLOCK_SIZE
+        end = np.column_stack([a, b + 1]) * BLOCK_SIZE
+        if not vertical:
+            start, end = start[:, ::-1], end[:, ::-1]
+        mid = (start + end) / 2
+        keep = np.hypot(mid[:, 0], mid[:, 1]) <= radius
+        highway = np.where(a % 10 == 0, 'primary',
+                           np.where(a % 5 == 0, 'secondary', 'residential'))
+        segments.append((start[keep], end[keep], highway[keep]))
+
+    start = np.concatenate([s for s, _, _ in segments]) + [cx, cy]
+    end = np.concatenate([e for _, e, _ in segments]) + [cx, cy]
+    coords = np.stack([start, end], axis=1)
+
+    def node_id(points):
+        ij = np.round((points - [cx, cy]) / BLOCK_SIZE).astype(np.int64) + k
+        return ij[:, 0] * (2 * k + 1) + ij[:, 1]
+
+    streets = gpd.GeoDataFrame({
+        'u': node_id(start),
+        'v': node_id(end),
+        'key': 0,
+        'highway': np.concatenate([h for _, _, h in segments]),
+        'length': BLOCK_SIZE,
+    }, geometry=shapely.linestrings(coords), crs=config.CRS_UTM)
+
+    # --- Green/blue spaces: parks everywhere, a few lakes ---
+    n_parks = int(np.clip(n_buildings // 2000, 1, 500))
+    n_lakes = max(1, n_parks // 5)
+    n_spaces = n_parks + n_lakes
+    pr = radius * np.sqrt(rng.random(n_spaces))
+    pt = rng.uniform(0, 2 * np.pi, n_spaces)
+    size = np.where(np.arange(n_spaces) < n_parks,
+                    rng.lognormal(np.log(60.0), 0.5, n_spaces),
+                    rng.lognormal(np.log(150.0), 0.5, n_spaces))
+    shapes = shapely.buffer(shapely.points(cx + pr * np.cos(pt), cy + pr * np.sin(pt)),
+                            size, quad_segs=4)
+    is_park = np.arange(n_spaces) < n_parks
+
+    green_blue = gpd.GeoDataFrame({
+        'element_type': 'way',
+        'osmid': np.arange(n_buildings + 1, n_buildings + 1 + n_spaces),
+        'leisure': np.where(is_park, 'park', None),
+        'natural': np.where(is_park, None, 'water'),
+    }, geometry=shapes, crs=config.CRS_UTM)
+
+    return {
+        'buildings': buildings,
+        'streets': streets,
+        'green_blue': green_blue,
+        'radius': float(radius),
+    }
+
+
+def time_stage(func, setup=None, repeats=3):
+    """
+    Time a stage
+
+    Args:
+        func: Stage callable; receives the setup() result as arguments
+        setup: Untimed callable returning a tuple of fresh inputs (optional)
+        repeats: Number of timed runs
+
+    Returns:
+        tuple: (result of the last run, list of durations in seconds)
+    """
+    durations = []
+    result = None
+    for _ in range(repeats):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        result = func(*args)
+        durations.append(time.perf_counter() - start)
+    return result, durations
+
+
+def benchmark(n_buildings, stages=STAGES, repeats=3, grid_size=config.GRID_SIZE_METERS,
+              seed=42, wind_dir=config.DEFAULT_WIND_DIRECTION):
+    """
+    Time each public stage on a synthetic city
+
+    Args:
+        n_buildings: Number of buildings
+        stages (list): Stages to time (inputs of skipped stages are still computed)
+        repeats: Timed runs per stage
+        grid_size: Grid cell size in meters
+        seed: Synthetic city seed
+        wind_dir: Prevailing wind direction in degrees
+
+    Returns:
+        dict: Scale description, {stage: {best_s, mean_s, runs}} and the
+        raster-vs-vector validation report (None when 'raster' is skipped)
+    """
+    start = time.perf_counter()
+    city = generate_synthetic_city(n_buildings, seed=seed)
+    generation_s = time.perf_counter() - start
+
+    buildings, streets, green_blue = city['buildings'], city['streets'], city['green_blue']
+    timings = {}
+
+    def run(stage, func, setup=None):
+        if stage not in stages:
+            args = setup() if setup is not None else ()
+            return func(*args)
+        result, durations = time_stage(func, setup, repeats)
+        timings[stage] = {
+            'best_s': min(durations),
+            'mean_s': sum(durations) / len(durations),
+            'runs': durations,
+        }
+        print(f"  {stage:15s}: {min(durations):9.3f}s")
+        return result
+
+    index = run('spatial_index', lambda: SpatialIndex(buildings, streets, green_blue))
+
+    grid = run('grid', lambda: morphology.create_analysis_grid(
+        buildings, grid_size=grid_size, spatial_index=index))
+
+    for stage, func in (('density', morphology.calculate_plan_area_density),
+                        ('roughness', morphology.calculate_roughness_length),
+                        ('svf', morphology.calculate_sky_view_factor_simple)):
+        if stage in stages:
+            run(stage, func, setup=lambda: (grid, buildings))
+
+    analyzed = run('morphology',
+                   lambda g: morphology.calculate_roughness_and_density(
+                       g, buildings, spatial_index=index),
+                   setup=lambda: (grid.copy(),))
+
+    # Raster engine: rasterize + reduce from scratch, then checked against
+    # the vector engine with the METHODOLOGY.md tolerances
+    raster_validation = None
+    if 'raster' in stages:
+        raster_metrics = run('raster',
+                             lambda: raster_morphology.compute_morphology_metrics_raster(
+                                 grid, buildings, spatial_index=index),
+                             setup=lambda: raster_morphology.clear_raster_cache() or ())
+        raster_validation = raster_morphology.validate_against_vector(
+            grid, buildings, raster_metrics=raster_metrics, spatial_index=index)
+        for metric, check in raster_validation.items():
+            status = '✓' if check['within_tolerance'] else '✗'
+            print(f"    {status} raster vs vector {metric:10s}: MAE {check['mean_abs_error']:.4f} "
+                  f"(tolerance {check['tolerance']})")
+
+    nbs_plan = run('planning',
+                   lambda g: nbs_logic.run_nbs_planning(
+                       g, wind_dir, green_blue_gdf=green_blue, calculate_benefits=True,
+                       calculate_costs=True, spatial_index=index),
+                   setup=lambda: (analyzed.copy(),))
+
+    summary_df = run('summary', lambda: nbs_logic.generate_intervention_summary(nbs_plan))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if 'reporting' in stages:
+            run('reporting', lambda: reporting.generate_full_report(
+                nbs_plan, summary_df, buildings, streets, green_blue, wind_dir,
+                output_dir=Path(tmp) / 'reports'))
+
+        if 'export_3d' in stages:
+            buildings_3d = buildings.assign(
+                avg_height=morphology.estimate_building_heights(buildings))
+            run('export_3d', lambda: Data3DGenerator().export_to_cityjson(
+                buildings_3d, nbs_plan, state='AFTER',
+                output_path=Path(tmp) / 'city.json'))
+
+    return {
+        'n_buildings': n_buildings,
+        'n_streets': len(streets),
+        'n_green_blue': len(green_blue),
+        'n_cells': len(grid),
+        'city_radius_m': round(city['radius'], 1),
+        'generation_s': generation_s,
+        'stages': timings,
+        'raster_validation': raster_validation,
+    }
+
+
+def environment():
+    """Commit, interpreter and library versions for the results file"""
+    root = Path(__file__).parent.parent
+
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=root, capture_output=True,
+                                  text=True, timeout=10).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'versions': {
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'geopandas': gpd.__version__,
+            'shapely': shapely.__version__,
+        },
+    }
+
+
+def compare(results, baseline, threshold=0.10):
+    """
+    Compare best stage times with a baseline results file
+
+    Args:
+        results (dict): Current results
+        baseline (dict): Baseline results
+        threshold (float): Relative slowdown reported as a regression
+
+    Returns:
+        list: (n_buildings, stage, baseline_s, current_s, ratio) regressions
+    """
+    baseline_scales = {scale['n_buildings']: scale for scale in baseline['scales']}
+    regressions = []
+
+    print(f"\nComparison with {baseline['environment'].get('commit') or 'baseline'}:")
+    print(f"{'Buildings':>10s} | {'Stage':15s} | {'Baseline (s)':>12s} | "
+          f"{'Current (s)':>11s} | {'Ratio':>6s}")
+    print("-" * 70)
+
+    for scale in results['scales']:
+        reference = baseline_scales.get(scale['n_buildings'])
+        if reference is None:
+            continue
+        for stage, timing in scale['stages'].items():
+            if stage not in reference['stages']:
+                continue
+            before = reference['stages'][stage]['best_s']
+            after = timing['best_s']
+            ratio = after / max(before, 1e-9)
+            flag = ' ✗' if ratio > 1 + threshold else ''
+            print(f"{scale['n_buildings']:>10d} | {stage:15s} | {before:>12.3f} | "
+                  f"{after:>11.3f} | {ratio:>5.2f}x{flag}")
+            if flag:
+                regressions.append((scale['n_buildings'], stage, before, after, ratio))
+
+    return regressions
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Benchmark pipeline stages on a synthetic city (offline)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python tools/benchmark_pipeline.py
+  python tools/benchmark_pipeline.py --scales 1k 10k 100k 1m --stages grid density roughness svf
+  python tools/benchmark_pipeline.py --compare outputs/benchmarks/benchmark_<commit>.json
+  python tools/benchmark_pipeline.py --stages raster    # raster engine vs vector check only
+        """
+    )
+    parser.add_argument('--scales', type=str, nargs='+', default=['1k', '10k'],
+                        help='Building counts, e.g. 1k 10k 100k 1m (default: 1k 10k)')
+    parser.add_argument('--stages', type=str, nargs='+', default=STAGES, choices=STAGES,
+                        help='Stages to time (default: all)')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Timed runs per stage (default: 3; best is compared)')
+    parser.add_argument('--grid-size', type=int, default=config.GRID_SIZE_METERS,
+                        help=f'Grid cell size in meters (default: {config.GRID_SIZE_METERS})')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Synthetic city seed (default: 42)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Results JSON (default: outputs/benchmarks/benchmark_<commit>_<time>.json)')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown reported as a regression (default: 0.10)')
+    args = parser.parse_args()
+
+    results = {
+        'environment': environment(),
+        'settings': {'repeats': args.repeats, 'grid_size': args.grid_size, 'seed': args.seed},
+        'scales': [],
+    }
+
+    print(f"\n{'='*70}")
+    print("PIPELINE BENCHMARK (synthetic city)")
+    print(f"{'='*70}")
+
+    for scale in args.scales:
+        n_buildings = parse_scale(scale)
+        print(f"\n{n_buildings} buildings:")
+        results['scales'].append(benchmark(
+            n_buildings, stages=args.stages, repeats=args.repeats,
+            grid_size=args.grid_size, seed=args.seed
+        ))
+
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        commit = (results['environment']['commit'] or 'nogit')[:10]
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_path = Path(config.OUTPUT_DIR) / 'benchmarks' / f"benchmark_{commit}_{stamp}.json"
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results saved to: {output_path}")
+
+    failed = [(scale['n_buildings'], metric)
+              for scale in results['scales']
+              for metric, check in (scale['raster_validation'] or {}).items()
+              if not check['within_tolerance']]
+    if failed:
+        print(f"\n✗ Raster engine outside validation tolerance: "
+              + ', '.join(f"{metric} ({n} buildings)" for n, metric in failed))
+        return 1
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, threshold=args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} stage(s) slower than baseline by "
+                  f">{args.threshold:.0%}")
+            return 1
+        print("\n✓ No regressions.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
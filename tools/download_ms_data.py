@@ -5,6 +5,9 @@ Provides instructions and utilities for downloading MS Buildings data
 """
 
 import argparse
+import json
+import os
+import re
 import sys
 from pathlib import Path
 
@@ -46,32 +49,13 @@ https://github.com/microsoft/GlobalMLBuildingFootprints/releases/download/v3/Ind
 
 STEP 3: EXTRACT HYDERABAD SUBSET
 
-Once downloaded, extract the Hyderabad area using Python:
+Once downloaded and unzipped, stream the Hyderabad area straight into the
+indexed footprint store (constant memory, parallel across file chunks):
 
-```python
-import geopandas as gpd
-from pathlib import Path
-
-# Load the full India dataset (this may take a few minutes)
-print("Loading India building footprints...")
-gdf = gpd.read_file('India.geojsonl')
-
-# Extract Hyderabad bounding box
-# Coordinates: [78.3°E, 17.3°N] to [78.6°E, 17.5°N]
-print("Extracting Hyderabad subset...")
-hyderabad = gdf.cx[78.3:78.6, 17.3:17.5]
+    python tools/download_ms_data.py --extract India.geojsonl
 
-print(f"Found {len(hyderabad)} buildings in Hyderabad area")
-
-# Save to project directory
-output_path = Path('data/references/hyderabad_buildings_ms.geojson')
-output_path.parent.mkdir(parents=True, exist_ok=True)
-
-print(f"Saving to {output_path}...")
-hyderabad.to_file(output_path, driver='GeoJSON')
-
-print("✓ Done! Hyderabad building footprints saved.")
-```
+Footprints within [78.3°E, 17.3°N] to [78.6°E, 17.5°N] are written to
+data/references/hyderabad_buildings_ms.parquet.
 
 ═══════════════════════════════════════════════════════════════════════════
 
@@ -86,6 +70,11 @@ USE_MS_BUILDINGS = True
 The data_loader module will automatically use the MS Buildings data
 instead of OSM for better accuracy.
 
+--extract already writes the indexed footprint store. Only a GeoJSON
+extract from an earlier version of this script needs converting:
+
+    python tools/download_ms_data.py --build-store data/references/hyderabad_buildings_ms.geojson
+
 ═══════════════════════════════════════════════════════════════════════════
 
 ALTERNATIVE: QUADKEY-BASED DOWNLOAD
@@ -112,15 +101,11 @@ DATASET INFORMATION
 
 TROUBLESHOOTING
 
-Q: The file is too large to process
-A: Use dask-geopandas for parallel processing, or download by quadkey
-
-Q: Memory error when loading
-A: Process in chunks:
-   ```python
-   for chunk in pd.read_json('India.geojsonl', lines=True, chunksize=10000):
-       # Process each chunk
-   ```
+Q: The file is too large to process / Memory error when loading
+A: Use --extract: it streams the file line by line and only parses
+   footprints whose first vertex falls near the Hyderabad bbox, so peak
+   memory does not grow with the input size. Use --workers to limit
+   parallelism on small machines.
 
 Q: How do I find the right QuadKey?
 A: Use online tools like https://www.maptiler.com/google-maps-coordinates-tile-bounds-projection/
@@ -137,69 +122,181 @@ For more information, visit:
     print(instructions)
 
 
-def extract_hyderabad(input_file, output_file=None):
+# First coordinate pair of a feature line, read without parsing the JSON
+_FIRST_COORD = re.compile(
+    rb'"coordinates"\s*:\s*\[+\s*(-?[\d.]+(?:[eE][-+]?\d+)?)\s*,\s*(-?[\d.]+(?:[eE][-+]?\d+)?)'
+)
+
+# Prefilter margin in degrees: a footprint whose first vertex lies just
+# outside the bbox can still overlap it
+PREFILTER_MARGIN_DEG = 0.01
+
+
+def chunk_ranges(path, n_chunks):
+    """
+    Split a file into byte ranges for parallel line processing
+
+    Args:
+        path: Input file
+        n_chunks: Number of ranges
+
+    Returns:
+        list: (start, end) byte offsets
+    """
+    size = Path(path).stat().st_size
+    n_chunks = max(1, min(n_chunks, size // (1 << 20) + 1))
+    return [(i * size // n_chunks, (i + 1) * size // n_chunks) for i in range(n_chunks)]
+
+
+def _write_batch(features, bbox, store_dir, part_name):
+    """Parse a batch of candidate features and write those overlapping bbox"""
+    import geopandas as gpd
+    import shapely
+    from shapely.geometry import shape, box
+    from src.config import CRS_WGS84
+    from src.footprint_store import write_footprint_part
+
+    geoms = [shape(feature['geometry']) for feature in features]
+    properties = [feature.get('properties') or {} for feature in features]
+
+    gdf = gpd.GeoDataFrame(properties, geometry=geoms, crs=CRS_WGS84)
+    gdf = gdf[shapely.intersects(gdf.geometry.values, box(*bbox))]
+
+    if gdf.empty:
+        return 0
+
+    write_footprint_part(gdf, Path(store_dir) / part_name)
+    return len(gdf)
+
+
+def extract_chunk(task):
+    """
+    Stream one byte range of a GeoJSONL file into store part files
+    (process pool worker)
+
+    Lines are prefiltered on their first raw coordinate; only candidates
+    are JSON-parsed, and they are flushed every batch_size features, so
+    memory stays constant regardless of input size.
+
+    Args:
+        task (tuple): (path, start, end, bbox, store_dir, chunk_id, batch_size)
+
+    Returns:
+        tuple: (lines scanned, footprints written)
+    """
+    path, start, end, bbox, store_dir, chunk_id, batch_size = task
+    minx, miny, maxx, maxy = bbox
+    margin = PREFILTER_MARGIN_DEG
+
+    scanned = 0
+    written = 0
+    part = 0
+    candidates = []
+
+    with open(path, 'rb') as f:
+        if start > 0:
+            # Skip the line straddling the range start; the previous chunk owns it
+            f.seek(start - 1)
+            f.readline()
+
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            scanned += 1
+
+            match = _FIRST_COORD.search(line)
+            if match is None:
+                continue
+            x, y = float(match.group(1)), float(match.group(2))
+            if not (minx - margin <= x <= maxx + margin and miny - margin <= y <= maxy + margin):
+                continue
+
+            candidates.append(json.loads(line))
+            if len(candidates) >= batch_size:
+                written += _write_batch(candidates, bbox, store_dir,
+                                        f'part-{chunk_id:04d}-{part:04d}.parquet')
+                part += 1
+                candidates = []
+
+    if candidates:
+        written += _write_batch(candidates, bbox, store_dir,
+                                f'part-{chunk_id:04d}-{part:04d}.parquet')
+
+    return scanned, written
+
+
+def extract_hyderabad(input_file, output_file=None, workers=None, batch_size=100000):
     """
-    Extract Hyderabad subset from India dataset
+    Extract Hyderabad subset from India dataset into the footprint store
+    
+    The GeoJSONL file is streamed line by line in parallel byte ranges;
+    nothing close to the full dataset is ever held in memory.
     
     Args:
         input_file: Path to India GeoJSONL file
-        output_file: Path to save Hyderabad subset
+        output_file: Store directory (default: MS_BUILDINGS_STORE_PATH)
+        workers: Worker processes (default: CPU count)
+        batch_size: Candidate features buffered per worker before writing
     """
     try:
-        import geopandas as gpd
-        from pathlib import Path
+        from concurrent.futures import ProcessPoolExecutor
+        from src.config import MS_BUILDINGS_STORE_PATH, FOOTPRINT_STORE_EXTENT
         
-        print(f"\nLoading building footprints from: {input_file}")
-        print("This may take several minutes for the full India dataset...")
+        bbox = FOOTPRINT_STORE_EXTENT
+        store_dir = Path(output_file) if output_file else Path(MS_BUILDINGS_STORE_PATH)
+        workers = workers or os.cpu_count() or 1
         
-        # Load data
-        gdf = gpd.read_file(input_file)
-        print(f"Loaded {len(gdf)} buildings from India dataset")
+        # Replace any previous store
+        if store_dir.is_file():
+            store_dir.unlink()
+        store_dir.mkdir(parents=True, exist_ok=True)
+        for old_part in store_dir.glob('part-*.parquet'):
+            old_part.unlink()
         
-        # Extract Hyderabad
-        print("\nExtracting Hyderabad bounding box [78.3°E, 17.3°N] to [78.6°E, 17.5°N]...")
-        hyderabad = gdf.cx[78.3:78.6, 17.3:17.5]
-        print(f"Found {len(hyderabad)} buildings in Hyderabad area")
+        ranges = chunk_ranges(input_file, workers * 4)
+        tasks = [(str(input_file), start, end, bbox, str(store_dir), i, batch_size)
+                 for i, (start, end) in enumerate(ranges)]
         
-        if len(hyderabad) == 0:
-            print("WARNING: No buildings found in the specified area.")
-            print("Check if the input file covers Hyderabad region.")
-            return False
+        print(f"\nStreaming building footprints from: {input_file}")
+        print(f"Extracting bbox [{bbox[0]}°E, {bbox[1]}°N] to [{bbox[2]}°E, {bbox[3]}°N] "
+              f"in {len(tasks)} chunks on {workers} workers...")
         
-        # Determine output path
-        if output_file is None:
-            output_file = Path('data/references/hyderabad_buildings_ms.geojson')
-        else:
-            output_file = Path(output_file)
+        scanned = 0
+        written = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_scanned, chunk_written in executor.map(extract_chunk, tasks):
+                scanned += chunk_scanned
+                written += chunk_written
         
-        output_file.parent.mkdir(parents=True, exist_ok=True)
+        print(f"Scanned {scanned} footprints, found {written} in Hyderabad area")
         
-        # Save
-        print(f"\nSaving to: {output_file}")
-        hyderabad.to_file(output_file, driver='GeoJSON')
+        if written == 0:
+            print("WARNING: No buildings found in the specified area.")
+            print("Check if the input file covers Hyderabad region.")
+            return False
         
-        print(f"✓ Successfully saved {len(hyderabad)} buildings")
-        print(f"\nFile size: {output_file.stat().st_size / 1024**2:.2f} MB")
+        store_size = sum(p.stat().st_size for p in store_dir.glob('part-*.parquet'))
         
         # Print statistics
         print("\n" + "="*70)
         print("EXTRACTION SUMMARY")
         print("="*70)
-        print(f"Total buildings extracted: {len(hyderabad)}")
-        print(f"Total footprint area: {hyderabad.geometry.area.sum() / 10000:.2f} hectares")
-        print(f"Output file: {output_file}")
+        print(f"Total buildings extracted: {written}")
+        print(f"Store size: {store_size / 1024**2:.2f} MB")
+        print(f"Output store: {store_dir}")
         print("="*70)
         
         print("\nNext steps:")
         print(f"1. Set USE_MS_BUILDINGS = True in src/config.py")
-        print(f"2. Verify MS_BUILDINGS_PATH points to: {output_file}")
+        print(f"2. Verify MS_BUILDINGS_STORE_PATH points to: {store_dir}")
         print(f"3. Run main.py to use the MS Buildings data")
         
         return True
         
-    except ImportError:
-        print("ERROR: geopandas is not installed.")
-        print("Install with: pip install geopandas")
+    except ImportError as e:
+        print(f"ERROR: missing dependency ({e}).")
+        print("Install with: pip install geopandas pyarrow")
         return False
         
     except Exception as e:
@@ -209,6 +306,27 @@ def extract_hyderabad(input_file, output_file=None):
         return False
 
 
+def build_store(input_file, output_file=None):
+    """
+    Convert a footprint file into the indexed store read by load_ms_buildings
+    
+    Args:
+        input_file: Path to a footprint file (e.g. the extracted GeoJSON)
+        output_file: Path of the store (default: MS_BUILDINGS_STORE_PATH)
+    """
+    from src.config import MS_BUILDINGS_STORE_PATH
+    from src.footprint_store import build_footprint_store
+    
+    output_file = Path(output_file) if output_file else Path(MS_BUILDINGS_STORE_PATH)
+    
+    print(f"\nBuilding footprint store from: {input_file}")
+    count = build_footprint_store(input_file, output_file)
+    
+    print(f"✓ Wrote {count} footprints to {output_file}")
+    print(f"File size: {output_file.stat().st_size / 1024**2:.2f} MB")
+    return True
+
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(
@@ -220,20 +338,37 @@ def main():
         '--extract',
         type=str,
         metavar='INPUT_FILE',
-        help='Extract Hyderabad subset from India GeoJSONL file'
+        help='Stream the Hyderabad subset of the India GeoJSONL file into the footprint store'
+    )
+    
+    parser.add_argument(
+        '--build-store',
+        type=str,
+        metavar='INPUT_FILE',
+        help='Build the Hilbert-sorted GeoParquet footprint store from a footprint file'
     )
     
     parser.add_argument(
         '--output',
         type=str,
         metavar='OUTPUT_FILE',
-        help='Output file path (default: data/references/hyderabad_buildings_ms.geojson)'
+        help='Output store path (default: data/references/hyderabad_buildings_ms.parquet)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes for --extract (default: CPU count)'
     )
     
     args = parser.parse_args()
     
-    if args.extract:
-        success = extract_hyderabad(args.extract, args.output)
+    if args.build_store:
+        success = build_store(args.build_store, args.output)
+        sys.exit(0 if success else 1)
+    elif args.extract:
+        success = extract_hyderabad(args.extract, args.output, workers=args.workers)
         sys.exit(0 if success else 1)
     else:
         print_instructions()
@@ -26,7 +26,17 @@ DATA_DIR = "data"
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def get_hyderabad_data():
+def get_hyderabad_data(workers=None, export_csv=True):
+    """
+    Download the Google Open Buildings tile covering Hyderabad and clip it to the ROI
+    
+    Args:
+        workers: Worker processes for parsing (default: CPU count)
+        export_csv: Also write data/hyderabad_clipped.csv
+    
+    Returns:
+        bool: True on success, None if no tile could be found
+    """
     print("1. Fetching Google Open Buildings Data for Hyderabad...")
     
     # Google Open Buildings V3 - Direct S2 tile for Hyderabad region
@@ -98,57 +108,193 @@ def get_hyderabad_data():
         print("   File already exists. Skipping download.")
 
     # --- PROCESSING SECTION ---
-    print("4. Processing & Clipping Data (This is memory intensive)...")
-    
-    # We use chunks because the CSV is massive (can be 2GB+)
-    # We only want buildings inside our Hyderabad ROI Box
-    chunksize = 100000
-    filtered_rows = []
-    
-    # Columns in V3: latitude, longitude, area_in_meters, confidence, geometry, full_plus_code, height_m (if using V3+ height)
-    # Note: V3 Standard includes geometry/lat/lon. 
-    # If specific height data isn't in standard CSV, we estimate or use 2.5D dataset.
-    # Standard V3 usually has: latitude, longitude, area_in_meters, confidence, geometry
-    
-    for chunk in pd.read_csv(filename, compression='gzip', chunksize=chunksize):
-        # Rough filter by lat/lon first (fast)
-        mask = (
-            (chunk['latitude'] > ROI_BOX.bounds[1]) & 
-            (chunk['latitude'] < ROI_BOX.bounds[3]) & 
-            (chunk['longitude'] > ROI_BOX.bounds[0]) & 
-            (chunk['longitude'] < ROI_BOX.bounds[2])
-        )
-        subset = chunk[mask]
-        
-        if not subset.empty:
-            filtered_rows.append(subset)
-            print(f"   Found {len(subset)} buildings in chunk...")
-
-    if filtered_rows:
-        hyd_df = pd.concat(filtered_rows)
-        
-        # Add random height if not present (Open Buildings V3 standard is 2D polygons, V3-2.5D is raster)
-        # For the 4D engine, we need height.
-        if 'height' not in hyd_df.columns:
-            import numpy as np
-            print("   Note: Standard V3 CSV is 2D. Generating synthetic heights based on area...")
-            # Heuristic: Larger area = Taller building (roughly) + random variation
-            hyd_df['height'] = np.sqrt(hyd_df['area_in_meters']) * 0.8 + np.random.randint(3, 15, size=len(hyd_df))
-        
-        # Add 'lon' and 'lat' columns for compatibility with nbs_engine.py
-        hyd_df['lon'] = hyd_df['longitude']
-        hyd_df['lat'] = hyd_df['latitude']
-        
-        output_file = os.path.join(DATA_DIR, "hyderabad_clipped.csv")
-        hyd_df.to_csv(output_file, index=False)
-        print(f"5. Success! Saved {len(hyd_df)} buildings to {output_file}")
-        print(f"   Columns: {list(hyd_df.columns)}")
-        print(f"   Building heights range: {hyd_df['height'].min():.1f}m - {hyd_df['height'].max():.1f}m")
-        print("\n✓ Data ready! You can now run: streamlit run tools/nbs_engine.py")
-        return True
-    else:
+    print("4. Processing & Clipping Data (streaming, parallel)...")
+    
+    output_file = os.path.join(DATA_DIR, "hyderabad_buildings.parquet")
+    n_buildings = clip_tile_to_parquet(filename, output_file, ROI_BOX.bounds, workers=workers)
+    
+    if n_buildings == 0:
         print("   No buildings found in the ROI.")
         return False
+    
+    print(f"5. Success! Saved {n_buildings} buildings to {output_file}")
+    
+    if export_csv:
+        # Kept for the frontend, which reads the clipped buildings as CSV
+        csv_file = os.path.join(DATA_DIR, "hyderabad_clipped.csv")
+        export_parquet_to_csv(output_file, csv_file)
+        print(f"   CSV export: {csv_file}")
+    
+    print("\n✓ Data ready! You can now run: streamlit run tools/nbs_engine.py")
+    return True
+
+
+def _clip_block(task):
+    """
+    Clip one block of CSV lines to the ROI (process pool worker)
+    
+    Only latitude/longitude are converted for every row; the matching lines
+    are then parsed in full and only their WKT geometries are decoded.
+    
+    Args:
+        task (tuple): (block_index, header bytes, block bytes, roi bounds)
+    
+    Returns:
+        tuple: (rows scanned, pyarrow Table of matching rows or None)
+    """
+    import io
+    import numpy as np
+    import pyarrow as pa
+    import shapely
+    
+    block_index, header, block, (minx, miny, maxx, maxy) = task
+    
+    coords = pd.read_csv(io.BytesIO(header + block), usecols=['latitude', 'longitude'])
+    lat = coords['latitude'].to_numpy()
+    lon = coords['longitude'].to_numpy()
+    mask = (lat > miny) & (lat < maxy) & (lon > minx) & (lon < maxx)
+    
+    if not mask.any():
+        return len(coords), None
+    
+    lines = block.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    
+    if len(lines) == len(coords):
+        selected = b'\n'.join(lines[i] for i in np.flatnonzero(mask))
+        subset = pd.read_csv(io.BytesIO(header + selected + b'\n'))
+    else:
+        # Line and record counts disagree (blank or multi-line records): full parse
+        subset = pd.read_csv(io.BytesIO(header + block))[mask].reset_index(drop=True)
+    
+    # Deferred geometry parse: WKT -> WKB for matching rows only
+    subset['geometry'] = shapely.to_wkb(shapely.from_wkt(subset['geometry'].to_numpy()))
+    
+    # Add random height if not present (Open Buildings V3 standard is 2D polygons, V3-2.5D is raster)
+    # Heuristic: Larger area = Taller building (roughly) + random variation
+    if 'height' not in subset.columns:
+        rng = np.random.default_rng(block_index)
+        subset['height'] = np.sqrt(subset['area_in_meters']) * 0.8 + rng.integers(3, 15, size=len(subset))
+    
+    # Add 'lon' and 'lat' columns for compatibility with nbs_engine.py
+    subset['lon'] = subset['longitude']
+    subset['lat'] = subset['latitude']
+    
+    return len(coords), pa.Table.from_pandas(subset, preserve_index=False)
+
+
+def iter_csv_blocks(filename, block_bytes):
+    """
+    Stream a gzipped CSV as line-aligned raw blocks
+    
+    Args:
+        filename: Path to .csv.gz file
+        block_bytes: Approximate decompressed block size
+    
+    Yields:
+        tuple: (header bytes, block bytes)
+    """
+    import gzip
+    
+    with gzip.open(filename, 'rb') as f:
+        header = f.readline()
+        remainder = b''
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                break
+            data = remainder + data
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                remainder = data
+                continue
+            remainder = data[cut:]
+            yield header, data[:cut]
+        if remainder.strip():
+            yield header, remainder + b'\n'
+
+
+def clip_tile_to_parquet(filename, output_file, bounds, workers=None, block_bytes=64 * 1024 * 1024):
+    """
+    Clip a Google Open Buildings tile to a bbox and write GeoParquet incrementally
+    
+    Decompression is a single sequential stream (gzip cannot be split), so the
+    main process only inflates and cuts line-aligned blocks; CSV parsing,
+    filtering and WKT decoding run in worker processes. At most 2 blocks per
+    worker are in flight, so memory stays bounded by block size.
+    
+    Args:
+        filename: Path to the .csv.gz tile
+        output_file: Output .parquet path
+        bounds (tuple): ROI (minx, miny, maxx, maxy) in lon/lat
+        workers: Worker processes (default: CPU count)
+        block_bytes: Decompressed bytes per block
+    
+    Returns:
+        int: Number of buildings written
+    """
+    import json
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    import pyarrow.parquet as pq
+    
+    workers = workers or os.cpu_count() or 1
+    writer = None
+    schema = None
+    scanned = 0
+    written = 0
+    
+    def write(result):
+        nonlocal writer, schema, scanned, written
+        n_rows, table = result
+        scanned += n_rows
+        if table is None or table.num_rows == 0:
+            return
+        if writer is None:
+            geo = {'version': '1.0.0', 'primary_column': 'geometry',
+                   'columns': {'geometry': {'encoding': 'WKB', 'geometry_types': []}}}
+            schema = table.schema.with_metadata({b'geo': json.dumps(geo).encode()})
+            writer = pq.ParquetWriter(output_file, schema, compression='zstd')
+        writer.write_table(table.select(schema.names).cast(schema))
+        written += table.num_rows
+        print(f"   Found {table.num_rows} buildings in block ({scanned} rows scanned)...")
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for i, (header, block) in enumerate(iter_csv_blocks(filename, block_bytes)):
+                pending.append(executor.submit(_clip_block, (i, header, block, bounds)))
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    print(f"   Scanned {scanned} buildings in tile.")
+    return written
+
+
+def export_parquet_to_csv(parquet_file, csv_file, batch_size=100000):
+    """
+    Export the clipped buildings to CSV (WKT geometry), batch by batch
+    
+    Args:
+        parquet_file: Clipped GeoParquet file
+        csv_file: Output CSV path
+        batch_size: Rows per batch
+    """
+    import pyarrow.parquet as pq
+    import shapely
+    
+    parquet = pq.ParquetFile(parquet_file)
+    for i, batch in enumerate(parquet.iter_batches(batch_size=batch_size)):
+        df = batch.to_pandas()
+        df['geometry'] = shapely.to_wkt(shapely.from_wkb(df['geometry'].to_numpy()))
+        df.to_csv(csv_file, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+
 
 def generate_synthetic_data():
     """
@@ -220,14 +366,23 @@ def generate_synthetic_data():
     
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Fetch and clip Google Open Buildings data')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='Generate synthetic building data for testing')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for parsing the tile (default: CPU count)')
+    parser.add_argument('--no-csv', action='store_true',
+                        help='Skip the data/hyderabad_clipped.csv export (Parquet only)')
+    args = parser.parse_args()
     
-    if len(sys.argv) > 1 and sys.argv[1] == "--synthetic":
+    if args.synthetic:
         # Generate synthetic data for testing
         generate_synthetic_data()
     else:
         # Try to fetch real data
-        result = get_hyderabad_data()
+        result = get_hyderabad_data(workers=args.workers, export_csv=not args.no_csv)
         
         # If real data fetch failed, offer synthetic option
         if result is None:
@@ -239,4 +394,4 @@ if __name__ == "__main__":
                 generate_synthetic_data()
             else:
                 print("\nExiting. Please resolve the data access issue and try again.")
-                print("See documentation for manual download instructions.")
\ No newline at end of file
+                print("See documentation for manual download instructions.")
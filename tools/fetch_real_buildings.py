@@ -16,9 +16,13 @@ import requests
 import geopandas as gpd
 import pandas as pd
 from shapely.geometry import Point, box, shape
+import io
 import json
 import logging
 from pathlib import Path
+import numpy as np
+import shapely
+from pyproj import Transformer
 
 # Setup
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -27,6 +31,9 @@ logger = logging.getLogger(__name__)
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.config import CRS_WGS84, CRS_UTM
+from src.providers import iter_overpass_elements
+
 try:
     from src.config import CITY_LAT, CITY_LON, ANALYSIS_RADIUS_METERS
     LAT, LON = CITY_LAT, CITY_LON
@@ -179,88 +186,28 @@ def fetch_from_osm():
         response = requests.post(
             overpass_url,
             data={'data': overpass_query},
-            timeout=180
+            timeout=180,
+            stream=True
         )
         
         if response.status_code != 200:
             logger.error(f"Overpass API returned status {response.status_code}")
             return None
         
-        data = response.json()
+        # Parse elements incrementally from the response stream
+        response.raw.decode_content = True
+        rings = collect_building_rings(
+            iter_overpass_elements(io.TextIOWrapper(response.raw, encoding='utf-8'))
+        )
         
-        if 'elements' not in data or len(data['elements']) == 0:
+        if rings['n_buildings'] == 0:
             logger.warning("No buildings found in OSM for this region")
             return None
         
-        logger.info(f"✓ Retrieved {len(data['elements'])} buildings from OSM")
+        logger.info(f"✓ Retrieved {rings['n_buildings']} buildings from OSM "
+                    f"({rings['n_relations']} multipolygon relations)")
         
-        # Process OSM data
-        buildings = []
-        
-        for element in data['elements']:
-            try:
-                # Get geometry
-                if element['type'] == 'way' and 'geometry' in element:
-                    coords = [(node['lon'], node['lat']) for node in element['geometry']]
-                    
-                    if len(coords) < 3:
-                        continue
-                    
-                    # Calculate centroid
-                    lon_avg = sum(c[0] for c in coords) / len(coords)
-                    lat_avg = sum(c[1] for c in coords) / len(coords)
-                    
-                    # Get height from tags
-                    tags = element.get('tags', {})
-                    height = None
-                    
-                    if 'height' in tags:
-                        try:
-                            height = float(tags['height'].replace('m', ''))
-                        except:
-                            pass
-                    elif 'building:levels' in tags:
-                        try:
-                            levels = int(tags['building:levels'])
-                            height = levels * 3.0  # Estimate 3m per floor
-                        except:
-                            pass
-                    
-                    if height is None:
-                        # Estimate based on building type
-                        building_type = tags.get('building', 'yes')
-                        if building_type in ['apartments', 'commercial', 'office']:
-                            height = 15.0
-                        elif building_type in ['house', 'residential']:
-                            height = 6.0
-                        else:
-                            height = 10.0
-                    
-                    # Estimate area (rough approximation)
-                    area = estimate_area_from_coords(coords)
-                    
-                    buildings.append({
-                        'latitude': lat_avg,
-                        'longitude': lon_avg,
-                        'lat': lat_avg,
-                        'lon': lon_avg,
-                        'height': height,
-                        'area_in_meters': area,
-                        'building_type': tags.get('building', 'yes'),
-                        'source': 'osm',
-                        'osm_id': element.get('id')
-                    })
-                    
-            except Exception as e:
-                logger.debug(f"Skipping element: {e}")
-                continue
-        
-        if not buildings:
-            logger.warning("Could not process any buildings from OSM data")
-            return None
-        
-        # Create DataFrame
-        df = pd.DataFrame(buildings)
+        df = buildings_from_rings(rings)
         
         # Save
         output_file = os.path.join(DATA_DIR, "hyderabad_clipped.csv")
@@ -280,34 +227,221 @@ def fetch_from_osm():
         return None
 
 
-def estimate_area_from_coords(coords):
-    """Estimate building area from coordinates (rough approximation)"""
-    try:
-        # Use shoelace formula for polygon area
-        n = len(coords)
-        if n < 3:
-            return 100.0
-        
-        area = 0.0
-        for i in range(n):
-            j = (i + 1) % n
-            area += coords[i][0] * coords[j][1]
-            area -= coords[j][0] * coords[i][1]
-        
-        area = abs(area) / 2.0
-        
-        # Convert from degrees² to m² (rough approximation at Hyderabad latitude)
-        # 1 degree ≈ 111km at equator, ~110km at Hyderabad's latitude
-        meters_per_deg_lat = 111000
-        meters_per_deg_lon = 111000 * 0.952  # cos(17.4°)
-        
-        area_m2 = area * meters_per_deg_lat * meters_per_deg_lon
-        
-        # Clamp to reasonable range
-        return max(20.0, min(area_m2, 5000.0))
+def _relation_rings(members):
+    """
+    Assemble a multipolygon relation (Overpass 'out geom') into rings
+
+    Args:
+        members (list): Relation members with inline geometry
+
+    Returns:
+        list: (coords array of (lon, lat), +1 for exterior / -1 for hole)
+    """
+    lines = {'outer': [], 'inner': []}
+    for member in members:
+        points = [p for p in member.get('geometry') or [] if p]
+        if member.get('type') != 'way' or len(points) < 2:
+            continue
+        role = 'inner' if member.get('role') == 'inner' else 'outer'
+        lines[role].append(shapely.linestrings([(p['lon'], p['lat']) for p in points]))
+    
+    if not lines['outer']:
+        return []
+    
+    area = shapely.union_all(shapely.get_parts(shapely.polygonize(lines['outer'])))
+    if lines['inner']:
+        area = area.difference(
+            shapely.union_all(shapely.get_parts(shapely.polygonize(lines['inner'])))
+        )
+    
+    rings = []
+    for polygon in shapely.get_parts(area):
+        if polygon.geom_type != 'Polygon' or polygon.is_empty:
+            continue
+        rings.append((np.asarray(polygon.exterior.coords), 1))
+        rings.extend((np.asarray(hole.coords), -1) for hole in polygon.interiors)
+    return rings
+
+
+def collect_building_rings(elements):
+    """
+    Collect building rings from Overpass elements into flat arrays
+    
+    Args:
+        elements: Iterable of Overpass elements ('out geom' format)
+    
+    Returns:
+        dict: Flat lon/lat arrays, ring lengths, ring → building index,
+        ring sign (+1 exterior, -1 hole), building tags and ids
+    """
+    lons, lats = [], []
+    ring_lengths, ring_building, ring_sign = [], [], []
+    tags_list, osm_ids = [], []
+    n_relations = 0
+    
+    for element in elements:
+        if element.get('type') == 'way':
+            points = element.get('geometry') or []
+            if len(points) < 3:
+                continue
+            rings = [(None, 1)]
+        elif element.get('type') == 'relation':
+            rings = _relation_rings(element.get('members', []))
+            if not rings:
+                continue
+            n_relations += 1
+        else:
+            continue
         
-    except:
-        return 100.0
+        building = len(osm_ids)
+        for coords, sign in rings:
+            if coords is None:
+                lons.extend(p['lon'] for p in points)
+                lats.extend(p['lat'] for p in points)
+                ring_lengths.append(len(points))
+            else:
+                lons.extend(coords[:, 0])
+                lats.extend(coords[:, 1])
+                ring_lengths.append(len(coords))
+            ring_building.append(building)
+            ring_sign.append(sign)
+        
+        tags_list.append(element.get('tags', {}))
+        osm_ids.append(element.get('id'))
+    
+    return {
+        'lon': np.asarray(lons, dtype=float),
+        'lat': np.asarray(lats, dtype=float),
+        'ring_lengths': np.asarray(ring_lengths, dtype=np.int64),
+        'ring_building': np.asarray(ring_building, dtype=np.int64),
+        'ring_sign': np.asarray(ring_sign, dtype=float),
+        'tags': tags_list,
+        'osm_ids': osm_ids,
+        'n_buildings': len(osm_ids),
+        'n_relations': n_relations
+    }
+
+
+def ring_area_centroid(x, y, ring_lengths, ring_building, ring_sign, n_buildings):
+    """
+    Area and centroid of every building at once (shoelace on flat ring arrays)
+    
+    Args:
+        x, y: Flat projected vertex coordinates (meters)
+        ring_lengths: Vertices per ring
+        ring_building: Building index of each ring
+        ring_sign: +1 for exterior rings, -1 for holes
+        n_buildings: Number of buildings
+    
+    Returns:
+        tuple: (area_m2, centroid_x, centroid_y) arrays per building
+    """
+    starts = np.concatenate([[0], np.cumsum(ring_lengths)[:-1]])
+    
+    # Next vertex within the same ring (wrapping to the ring start)
+    nxt = np.arange(len(x)) + 1
+    nxt[starts + ring_lengths - 1] = starts
+    
+    # Local origin for numerical stability
+    x0, y0 = x.mean(), y.mean()
+    xl, yl = x - x0, y - y0
+    cross = xl * yl[nxt] - xl[nxt] * yl
+    
+    ring_signed_area = 0.5 * np.add.reduceat(cross, starts)
+    ring_sx = np.add.reduceat((xl + xl[nxt]) * cross, starts) / 6.0
+    ring_sy = np.add.reduceat((yl + yl[nxt]) * cross, starts) / 6.0
+    
+    # Orientation-independent: exteriors add, holes subtract
+    weight = ring_sign * np.sign(ring_signed_area)
+    area = np.bincount(ring_building, weights=weight * ring_signed_area, minlength=n_buildings)
+    sx = np.bincount(ring_building, weights=weight * ring_sx, minlength=n_buildings)
+    sy = np.bincount(ring_building, weights=weight * ring_sy, minlength=n_buildings)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cx = np.where(area > 0, sx / area, np.nan) + x0
+        cy = np.where(area > 0, sy / area, np.nan) + y0
+    
+    return area, cx, cy
+
+
+def estimate_heights(tags):
+    """
+    Building heights from OSM tags (height, then building:levels, then type)
+    
+    Args:
+        tags (DataFrame): One row of tags per building
+    
+    Returns:
+        ndarray: Heights in meters
+    """
+    n = len(tags)
+    column = lambda name: tags[name] if name in tags.columns else pd.Series([None] * n, index=tags.index)
+    
+    height_tag = column('height')
+    levels_tag = column('building:levels').astype(str).str.strip()
+    building_type = column('building').fillna('yes')
+    
+    height = pd.to_numeric(height_tag.astype(str).str.replace('m', '').str.strip(),
+                           errors='coerce').to_numpy(dtype=float)
+    levels = pd.to_numeric(levels_tag.where(levels_tag.str.fullmatch(r'[-+]?\d+')),
+                           errors='coerce').to_numpy(dtype=float)
+    
+    # 'levels' only applies when no height tag is present
+    from_levels = np.where(height_tag.isna().to_numpy(), levels * 3.0, np.nan)
+    type_default = np.select(
+        [building_type.isin(['apartments', 'commercial', 'office']),
+         building_type.isin(['house', 'residential'])],
+        [15.0, 6.0],
+        default=10.0
+    )
+    
+    estimate = np.where(np.isnan(height), from_levels, height)
+    return np.where(np.isnan(estimate), type_default, estimate)
+
+
+def buildings_from_rings(rings):
+    """
+    Vectorized building table (centroid, projected area, height) from ring arrays
+    
+    Args:
+        rings (dict): Output of collect_building_rings
+    
+    Returns:
+        DataFrame: One row per building
+    """
+    n_buildings = rings['n_buildings']
+    
+    to_utm = Transformer.from_crs(CRS_WGS84, CRS_UTM, always_xy=True)
+    x, y = to_utm.transform(rings['lon'], rings['lat'])
+    
+    area, cx, cy = ring_area_centroid(
+        np.asarray(x), np.asarray(y), rings['ring_lengths'],
+        rings['ring_building'], rings['ring_sign'], n_buildings
+    )
+    
+    # Degenerate footprints: fall back to the vertex mean
+    vertex_building = np.repeat(rings['ring_building'], rings['ring_lengths'])
+    counts = np.bincount(vertex_building, minlength=n_buildings)
+    degenerate = ~np.isfinite(cx)
+    cx[degenerate] = (np.bincount(vertex_building, weights=x, minlength=n_buildings) / counts)[degenerate]
+    cy[degenerate] = (np.bincount(vertex_building, weights=y, minlength=n_buildings) / counts)[degenerate]
+    
+    lon, lat = Transformer.from_crs(CRS_UTM, CRS_WGS84, always_xy=True).transform(cx, cy)
+    
+    tags = pd.DataFrame.from_records(rings['tags']) if rings['tags'] else pd.DataFrame(index=range(n_buildings))
+    
+    return pd.DataFrame({
+        'latitude': lat,
+        'longitude': lon,
+        'lat': lat,
+        'lon': lon,
+        'height': estimate_heights(tags),
+        # Clamp to the range the frontend expects
+        'area_in_meters': np.clip(area, 20.0, 5000.0),
+        'building_type': tags['building'].fillna('yes').to_numpy() if 'building' in tags.columns else 'yes',
+        'source': 'osm',
+        'osm_id': rings['osm_ids']
+    })
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Offline Check for the Concurrent Fetch Stage
+Serves canned Overpass, Open-Meteo and WAQI responses from a local stub HTTP
+server and runs data_loader.fetch_all_data for all five sources against it:
+buildings, streets and green/blue spaces through osmnx and the tile loader,
+wind and air quality through their HTTP clients. Per-source slow endpoints
+exercise the deadlines and failure isolation of every source.
+
+The study area is centred on a tile corner, so features crossing tile edges
+are fetched with several tiles and must be deduplicated in the union.
+
+Exits non-zero when any check fails.
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from pyproj import Transformer
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import data_loader
+from src.config import (CITY_LAT, CITY_LON, CRS_UTM, CRS_WGS84, OSM_TILE_SIZE_METERS,
+                        DEFAULT_WIND_DIRECTION)
+
+WIND_RESPONSE = {
+    'hourly': {
+        'time': ['2023-01-01T00:00', '2023-01-01T01:00', '2023-01-01T02:00'],
+        'wind_direction_10m': [225.0, 225.0, 90.0],
+        'wind_speed_10m': [12.0, 14.0, 11.0],
+    }
+}
+
+AQI_RESPONSE = {
+    'status': 'ok',
+    'data': {
+        'aqi': 87,
+        'iaqi': {'pm25': {'v': 87}, 'pm10': {'v': 54}},
+        'city': {'name': 'Stub Station'},
+        'time': {'s': '2024-01-01 10:00:00'},
+    }
+}
+
+# Overpass /status body announcing a free slot (no rate-limit pause)
+OVERPASS_STATUS = (
+    "Connected as: 0\n"
+    "Current time: 2024-01-01T10:00:00Z\n"
+    "Announced endpoint: none\n"
+    "Rate limit: 2\n"
+    "2 slots available now.\n"
+)
+
+STUDY_RADIUS = 300  # meters
+ARM_LENGTH = 1200  # meters, each arm of the street cross (beyond the 500 m
+                   # buffer osmnx queries around a tile, so per-tile
+                   # simplification would end the arms at different nodes)
+NODE_SPACING = 100  # meters between street nodes
+CROSS_OFFSET = 25  # meters, keeps the crossing off the tile corner
+
+
+def study_centre():
+    """
+    Study area centre on the tile corner nearest the city centre
+
+    Returns:
+        tuple: ((lat, lon), (x, y) in CRS_UTM)
+    """
+    to_utm = Transformer.from_crs(CRS_WGS84, CRS_UTM, always_xy=True)
+    to_wgs = Transformer.from_crs(CRS_UTM, CRS_WGS84, always_xy=True)
+
+    x, y = to_utm.transform(CITY_LON, CITY_LAT)
+    x = round(x / OSM_TILE_SIZE_METERS) * OSM_TILE_SIZE_METERS
+    y = round(y / OSM_TILE_SIZE_METERS) * OSM_TILE_SIZE_METERS
+    lon, lat = to_wgs.transform(x, y)
+    return (lat, lon), (x, y)
+
+
+def build_overpass_responses(centre_xy):
+    """
+    Canned Overpass responses per layer around the study centre
+
+    Every layer has a feature crossing a tile edge: a building straddling
+    the vertical edge, a park straddling the horizontal one, and a street
+    cross whose four arms all leave the centre tile.
+
+    Args:
+        centre_xy (tuple): Study centre (a tile corner) in CRS_UTM
+
+    Returns:
+        dict: {layer: Overpass JSON response}
+    """
+    to_wgs = Transformer.from_crs(CRS_UTM, CRS_WGS84, always_xy=True)
+    cx, cy = centre_xy
+    next_node = iter(range(1, 10_000))
+
+    def nodes(points):
+        elements = []
+        for dx, dy in points:
+            lon, lat = to_wgs.transform(cx + dx, cy + dy)
+            elements.append({'type': 'node', 'id': next(next_node), 'lat': lat, 'lon': lon})
+        return elements
+
+    def area(way_id, minx, miny, maxx, maxy, tags):
+        ring = nodes([(minx, miny), (maxx, miny), (maxx, maxy), (minx, maxy)])
+        way = {'type': 'way', 'id': way_id, 'tags': tags,
+               'nodes': [node['id'] for node in ring] + [ring[0]['id']]}
+        return ring + [way]
+
+    buildings = (
+        area(101, -10, 70, 10, 90, {'building': 'yes', 'height': '12'})
+        + area(102, 60, -100, 90, -70, {'building': 'apartments', 'building:levels': '5'})
+        + area(103, -120, -120, -90, -90, {'building': 'house'})
+        + area(104, 100, 120, 130, 140, {'building': 'commercial'})
+    )
+    green_blue = area(201, -150, -30, -90, 30, {'leisure': 'park'})
+
+    steps = np.arange(-ARM_LENGTH, ARM_LENGTH + 1, NODE_SPACING) + CROSS_OFFSET
+    east_west = nodes([(x, CROSS_OFFSET) for x in steps])
+    north_south = nodes([(CROSS_OFFSET, y) for y in steps])
+    # Both ways share the crossing node
+    middle = len(steps) // 2
+    north_south[middle] = east_west[middle]
+    street_nodes = {node['id']: node for node in east_west + north_south}
+    streets = list(street_nodes.values()) + [
+        {'type': 'way', 'id': 301, 'nodes': [node['id'] for node in east_west],
+         'tags': {'highway': 'residential', 'name': 'Stub East Street'}},
+        {'type': 'way', 'id': 302, 'nodes': [node['id'] for node in north_south],
+         'tags': {'highway': 'residential', 'name': 'Stub North Street'}},
+    ]
+
+    def response(elements):
+        return {'version': 0.6, 'generator': 'fetch_stub_server', 'elements': elements}
+
+    return {
+        'buildings': response(buildings),
+        'green_blue': response(green_blue),
+        'streets': response(streets),
+    }
+
+
+def overpass_layer(query):
+    """Layer an osmnx Overpass query asks for"""
+    if 'highway' in query:
+        return 'streets'
+    if 'building' in query:
+        return 'buildings'
+    return 'green_blue'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Canned responses: /archive (wind), /feed/... (AQI), .../status and
+    .../interpreter (Overpass). Paths under /slow/<source>/ are delayed for
+    that source only ('buildings', 'streets', 'green_blue', 'wind' or
+    'air_quality'), and under /lag/<source>/ by a quarter of that; under
+    /fail-west/<layer>/ Overpass answers 500 for the tiles of that layer west
+    of the study centre.
+    """
+
+    delay = 10.0
+    overpass_responses = {}
+    centre_lon = None
+
+    def _delay_for(self, source):
+        parts = self.path.split('/')
+        if len(parts) > 2 and parts[1] == 'slow' and parts[2] == source:
+            time.sleep(self.delay)
+        elif len(parts) > 2 and parts[1] == 'lag' and parts[2] == source:
+            time.sleep(self.delay / 4)
+
+    def _fails_west(self, layer, query):
+        parts = self.path.split('/')
+        if len(parts) < 3 or parts[1] != 'fail-west' or parts[2] != layer:
+            return False
+        poly = re.search(r"poly:['\"]([^'\"]+)", query)
+        lons = [float(value) for value in poly.group(1).split()[1::2]]
+        return np.mean(lons) < self.centre_lon
+
+    def _send(self, body, content_type='application/json'):
+        payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.endswith('/status'):
+            self._send(OVERPASS_STATUS, 'text/plain')
+        elif '/archive' in self.path:
+            self._delay_for('wind')
+            self._send(WIND_RESPONSE)
+        elif '/feed/' in self.path:
+            self._delay_for('air_quality')
+            self._send(AQI_RESPONSE)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        if not self.path.endswith('/interpreter'):
+            self.send_error(404)
+            return
+
+        query = parse_qs(body).get('data', [''])[0]
+        layer = overpass_layer(query)
+        self._delay_for(layer)
+        if self._fails_west(layer, query):
+            self.send_error(500)
+            return
+        self._send(self.overpass_responses[layer])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    """
+    Start the stub server on a free local port
+
+    Returns:
+        tuple: (server, base_url)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class CheckFailed(Exception):
+    """A fetch check did not hold"""
+
+
+def expect(condition, message):
+    """Raise CheckFailed with message unless condition holds"""
+    if not condition:
+        raise CheckFailed(message)
+
+
+class FetchCheck:
+    """
+    fetch_all_data runs against the stub server, one method per check.
+
+    Each check returns a short description of what held and raises
+    CheckFailed otherwise.
+    """
+
+    def __init__(self, base_url, delay):
+        """
+        Args:
+            base_url (str): Stub server URL
+            delay (float): Delay of the slow endpoints in seconds
+        """
+        self.base_url = base_url
+        self.delay = delay
+        (self.lat, self.lon), _ = study_centre()
+
+    def endpoints(self, slow=None, failing=None, lagging=None):
+        """fetch_all_data endpoint arguments, with one source slowed down or
+        lagging, or one OSM layer failing for the western tiles"""
+        def prefix(*sources):
+            if slow in sources:
+                return f"{self.base_url}/slow/{slow}"
+            if lagging in sources:
+                return f"{self.base_url}/lag/{lagging}"
+            if failing in sources:
+                return f"{self.base_url}/fail-west/{failing}"
+            return self.base_url
+
+        return {
+            'wind_url': prefix('wind') + "/archive",
+            'aqi_url': prefix('air_quality') + "/feed/geo:{};{}/",
+            'overpass_url': prefix('buildings', 'streets', 'green_blue') + "/api",
+        }
+
+    def fetch(self, slow=None, failing=None, lagging=None, timeouts=None, provider='osmnx'):
+        """Fetch all five sources; returns (data, elapsed seconds)"""
+        start = time.perf_counter()
+        data = data_loader.fetch_all_data(
+            self.lat, self.lon, STUDY_RADIUS,
+            use_cache=False,
+            timeouts=timeouts,
+            provider=provider,
+            **self.endpoints(slow, failing, lagging)
+        )
+        return data, time.perf_counter() - start
+
+    def expect_healthy(self, data, skip=()):
+        """Every source except skip returned its canned result"""
+        if 'buildings' not in skip:
+            expect(len(data['buildings']) == 4,
+                   f"expected 4 buildings, got {len(data['buildings'])}")
+        if 'green_blue' not in skip:
+            expect(len(data['green_blue']) == 1,
+                   f"expected 1 green/blue feature, got {len(data['green_blue'])}")
+        if 'streets' not in skip:
+            # Two ways of 2 * ARM_LENGTH, both directions, each counted once
+            expected = 2 * 2 * (2 * ARM_LENGTH)
+            length = data['streets'].geometry.length.sum()
+            expect(abs(length - expected) < 0.01 * expected,
+                   f"street length {length:.0f} m, expected {expected} m "
+                   f"(edges duplicated across tiles?)")
+        if 'wind' not in skip:
+            expect(data['wind'] == 225.0, f"wind {data['wind']}, expected 225.0")
+        if 'air_quality' not in skip:
+            expect(data['air_quality']['aqi'] == 87, f"AQI {data['air_quality']}")
+
+    def all_sources(self):
+        timeouts = {source: 30 for source in data_loader.FETCH_SOURCES}
+        data, elapsed = self.fetch(timeouts=timeouts)
+        expect(not data['errors'], f"unexpected errors: {data['errors']}")
+        self.expect_healthy(data)
+        return (f"All five sources fetched ({len(data['streets'])} street edges "
+                f"unioned across tiles, {elapsed:.2f}s)")
+
+    def osm_tiles(self):
+        """Number of tiles covering the study area"""
+        bounds = data_loader.get_study_area(self.lat, self.lon, STUDY_RADIUS).bounds
+        return len(data_loader.tiles_for_bounds(bounds))
+
+    def slow_source(self, source):
+        # OSM layers share one osmnx request timeout (their longest deadline),
+        # so all three get the short deadline when one of them is slow; their
+        # deadlines are per tile, and every tile request times out in turn
+        deadline = self.delay / 2
+        if source in ('buildings', 'streets', 'green_blue'):
+            timeouts = {'buildings': deadline, 'streets': deadline, 'green_blue': deadline}
+            limit = deadline * self.osm_tiles() + 1
+        else:
+            timeouts = {source: deadline}
+            limit = self.delay
+
+        data, elapsed = self.fetch(slow=source, timeouts=timeouts)
+        # Wind and AQI clients time out on their own and return the default;
+        # OSM layers miss their deadline and get the empty fallback
+        if source == 'wind':
+            expect(data['wind'] == DEFAULT_WIND_DIRECTION, f"wind {data['wind']}, expected default")
+        elif source == 'air_quality':
+            expect(data['air_quality']['aqi'] == 'N/A', f"AQI {data['air_quality']}, expected N/A")
+        else:
+            expect(source in data['errors'], f"{source} did not time out: {data['errors']}")
+            expect(data[source].empty, f"{source} fallback is not empty")
+        expect(set(data['errors']) <= {source}, f"other sources failed: {data['errors']}")
+        expect(elapsed < limit, f"took {elapsed:.2f}s, limit {limit:.2f}s")
+        self.expect_healthy(data, skip=(source,))
+        return f"Slow {source} isolated ({elapsed:.2f}s < {limit:.2f}s)"
+
+    def slow_tiles(self):
+        # Each tile answers within the deadline but all of them together do not
+        deadline = self.delay / 2
+        timeouts = {'buildings': deadline, 'streets': deadline, 'green_blue': deadline}
+        data, elapsed = self.fetch(lagging='buildings', timeouts=timeouts)
+        expect(not data['errors'], f"unexpected errors: {data['errors']}")
+        expect(elapsed > deadline, f"took {elapsed:.2f}s, tiles were not slow enough")
+        self.expect_healthy(data)
+        return (f"Slow buildings tiles fetched in {elapsed:.2f}s "
+                f"({deadline:.2f}s deadline per tile, {self.osm_tiles()} tiles)")
+
+    def failing_layer(self):
+        class FailingLayerProvider(data_loader.OSMnxProvider):
+            def fetch_layer(self, layer, bounds, columns=None):
+                if layer == 'green_blue':
+                    raise RuntimeError("stub failure")
+                return super().fetch_layer(layer, bounds, columns=columns)
+
+        data, _ = self.fetch(provider=FailingLayerProvider())
+        expect(set(data['errors']) == {'green_blue'}, f"errors: {data['errors']}")
+        expect(data['green_blue'].empty, "green/blue fallback is not empty")
+        self.expect_healthy(data, skip=('green_blue',))
+        return "Failing green/blue layer falls back without affecting the other sources"
+
+    def failing_tiles(self):
+        timeouts = {source: 30 for source in data_loader.FETCH_SOURCES}
+        data, _ = self.fetch(failing='buildings', timeouts=timeouts)
+        # Half the tiles fail: the layer is reported, not returned partially
+        expect(set(data['errors']) == {'buildings'}, f"errors: {data['errors']}")
+        expect('tiles could not be fetched' in data['errors']['buildings'],
+               f"buildings error: {data['errors']['buildings']}")
+        expect(data['buildings'].empty, "a partial buildings layer was returned")
+        self.expect_healthy(data, skip=('buildings',))
+        return "Failed buildings tiles reported as an error instead of a partial layer"
+
+    def checks(self):
+        """Named checks in run order"""
+        return [
+            ('all sources', self.all_sources),
+            *[(f"slow {source}", lambda source=source: self.slow_source(source))
+              for source in data_loader.FETCH_SOURCES],
+            ('slow tiles', self.slow_tiles),
+            ('failing layer', self.failing_layer),
+            ('failing tiles', self.failing_tiles),
+        ]
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Run the concurrent fetch stage against a local stub server'
+    )
+    parser.add_argument('--delay', type=float, default=10.0,
+                        help='Delay of the slow endpoints in seconds (default: 10.0)')
+    args = parser.parse_args()
+
+    import osmnx as ox
+    # Stub responses must not land in (or come from) the osmnx response cache
+    ox.settings.use_cache = False
+
+    (lat, lon), centre_xy = study_centre()
+    StubHandler.delay = args.delay
+    StubHandler.overpass_responses = build_overpass_responses(centre_xy)
+    StubHandler.centre_lon = lon
+    server, base_url = start_stub_server()
+
+    print(f"\n{'='*70}")
+    print(f"CONCURRENT FETCH CHECK (stub server at {base_url})")
+    print(f"Study area: ({lat:.5f}, {lon:.5f}) radius {STUDY_RADIUS}m, on a tile corner")
+    print(f"{'='*70}\n")
+
+    failed = []
+    try:
+        for name, check in FetchCheck(base_url, args.delay).checks():
+            try:
+                print(f"✓ {check()}")
+            except CheckFailed as e:
+                failed.append(name)
+                print(f"✗ {name}: {e}")
+    finally:
+        server.shutdown()
+
+    if failed:
+        print(f"\n✗ {len(failed)} check(s) failed: {', '.join(failed)}")
+        return 1
+
+    print("\n✓ All checks passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.data_3d_generator import Data3DGenerator, generate_3d_data_for_project
 from src.spatialbound_integration import SpatialBoundClient
+from src.config import CITYJSON_PRECISION_M, CITYJSON_GZIP, CITYJSONSEQ_WORKERS
 import geopandas as gpd
 import pandas as pd
 import json
@@ -130,6 +131,18 @@ Examples:
   
   # Use specific API key
   python tools/generate_3d_data.py --api-key "your-api-key-here"
+  
+  # Gzipped CityJSON at centimetre precision
+  python tools/generate_3d_data.py --no-upload --gzip --precision 0.01
+  
+  # Stream city-scale exports as CityJSONSeq with 4 encoding processes
+  python tools/generate_3d_data.py --no-upload --stream --workers 4
+  
+  # Also write binary glTF meshes for the web frontend
+  python tools/generate_3d_data.py --no-upload --glb
+  
+  # Also write 3D Tiles tilesets for city-scale streaming viewers
+  python tools/generate_3d_data.py --no-upload --tiles
         """
     )
     
@@ -154,6 +167,24 @@ Examples:
     parser.add_argument('--location', type=str, default='17.3616,78.4747',
                        help='Location as "latitude,longitude" for project metadata')
     
+    parser.add_argument('--precision', type=float, default=CITYJSON_PRECISION_M,
+                       help='CityJSON vertex precision in metres (0 writes float vertices)')
+    
+    parser.add_argument('--gzip', action='store_true', default=CITYJSON_GZIP,
+                       help='Write gzipped CityJSON (*.json.gz)')
+    
+    parser.add_argument('--stream', action='store_true',
+                       help='Stream BEFORE/AFTER as CityJSONSeq (*.city.jsonl) in constant memory')
+    
+    parser.add_argument('--workers', type=int, default=CITYJSONSEQ_WORKERS,
+                       help='Encoding processes for --stream')
+    
+    parser.add_argument('--glb', action='store_true',
+                       help='Also write BEFORE/AFTER binary glTF meshes (*.glb)')
+    
+    parser.add_argument('--tiles', action='store_true',
+                       help='Also write BEFORE/AFTER 3D Tiles tilesets (*_tiles/tileset.json)')
+    
     args = parser.parse_args()
     
     # Setup logging
@@ -216,7 +247,13 @@ Examples:
             nbs_gdf=nbs_gdf,
             green_blue_gdf=green_blue_gdf,
             output_dir=data_dir,
-            project_name=args.project_name
+            project_name=args.project_name,
+            precision=args.precision or None,
+            compress=args.gzip,
+            stream=args.stream,
+            workers=args.workers,
+            glb=args.glb,
+            tiles=args.tiles
         )
         
         logger.info("\n✓ 3D data generation complete!")
@@ -226,7 +263,10 @@ Examples:
         return 1
     
     # Upload to SpatialBound (if not disabled)
-    if not args.no_upload:
+    if args.stream and not args.no_upload:
+        logger.warning("CityJSONSeq exports are not uploaded to SpatialBound; "
+                       "rerun without --stream to upload")
+    elif not args.no_upload:
         logger.info("\n" + "="*80)
         logger.info("STEP 2: UPLOADING TO SPATIALBOUND")
         logger.info("="*80)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Re-run NbS Planning from a Morphology Snapshot
+Applies an (edited) NbS rule table to the morphology grid saved by main.py,
+so threshold changes do not require re-fetching OSM data or re-running morphology.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import config, nbs_logic, reporting, utils
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Re-run NbS planning on a saved morphology snapshot'
+    )
+    parser.add_argument('--snapshot', type=str,
+                        default=str(Path(config.OUTPUT_DIR) / 'reports' / config.MORPHOLOGY_SNAPSHOT_NAME),
+                        help='Morphology snapshot written by main.py')
+    parser.add_argument('--rules', type=str, default=config.NBS_RULES_PATH,
+                        help=f'NbS rule table JSON/YAML (default: {config.NBS_RULES_PATH})')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output directory for CSV exports (default: <snapshot dir>/replan)')
+    args = parser.parse_args()
+
+    snapshot = utils.load_pickle(args.snapshot)
+    if snapshot is None:
+        print(f"✗ Snapshot not found: {args.snapshot}")
+        print("  Run main.py first to create it.")
+        return 1
+
+    output_dir = Path(args.output) if args.output else Path(args.snapshot).parent / 'replan'
+
+    print(f"\n{'='*70}")
+    print("NbS REPLANNING")
+    print(f"{'='*70}\n")
+    print(f"Snapshot: {args.snapshot} ({len(snapshot['grid'])} cells)")
+    print(f"Rules:    {args.rules}\n")
+
+    with utils.Timer("NbS planning"):
+        nbs_plan = nbs_logic.run_nbs_planning(
+            snapshot['grid'].copy(),
+            snapshot['wind_dir'],
+            calculate_benefits=True,
+            calculate_costs=True,
+            rules=args.rules
+        )
+        summary_df = nbs_logic.generate_intervention_summary(nbs_plan)
+
+    for _, row in summary_df.iterrows():
+        print(f"  {row['NbS_Type']:25s}: "
+              f"{row['Total_Area_hectares']:8.2f} ha, "
+              f"₹{row['Total_Cost_Crores']:.2f} Cr")
+
+    reporting.export_to_csv(summary_df, nbs_plan, output_dir)
+    print(f"\n✓ Replanned results saved to: {output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())